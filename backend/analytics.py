@@ -0,0 +1,199 @@
+"""Cohort aggregates for /api/admin/analytics.
+
+Each student's latest TestResult is kept in memory as one row of a pandas
+frame: the raw subject scores and the overall score. The same is done for
+their current recommendations. A refresh only reads rows with ids above
+the last high-water mark, in chunks, from the typed test_results columns
+(see subject_scores.py), so no JSON is parsed. A row an older worker
+wrote without them is scored from its breakdown in memory; this reader
+never writes. Histograms, averages and per-class means are then
+recomputed with vectorized pandas/NumPy over the in-memory frames. The
+stream distribution and subject percentiles are grouped and ranked in SQL
+instead, over scored rows only. Everything is cached until the next
+refresh.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+
+import numpy as np
+from sqlalchemy import case, func, select
+
+from lazy_imports import lazy_import
+from ml.engine import SUBJECTS, STREAMS
+from models import db, TestResult, Recommendation, StudentProfile
+from subject_scores import SUBJECT_COLUMNS, stream_counts, subject_percentiles
+
+# imported on the first refresh, so workers that never serve analytics skip it
+pd = lazy_import('pandas')
+
+HISTOGRAM_BINS = np.arange(0, 101, 10)
+SECTIONS = ('streams', 'subjects', 'classes', 'recommendations')
+
+
+def _empty_students() -> pd.DataFrame:
+    cols = {"result_id": pd.Series(dtype='int64'), "score": pd.Series(dtype='float64')}
+    cols.update({s: pd.Series(dtype='float64') for s in SUBJECTS})
+    return pd.DataFrame(cols, index=pd.Index([], name='user_id', dtype='int64'))
+
+
+def _empty_recs() -> pd.DataFrame:
+    return pd.DataFrame({"user_id": pd.Series(dtype='int64'), "title": pd.Series(dtype='object'),
+                         "suitability": pd.Series(dtype='float64')})
+
+
+def _num(v) -> Optional[float]:
+    return None if v is None or pd.isna(v) else round(float(v), 2)
+
+
+class CohortAnalytics:
+    def __init__(self, engine, chunk_size: int = 5000, refresh_interval: float = 60.0):
+        self.engine = engine
+        self.chunk_size = chunk_size
+        self.refresh_interval = refresh_interval
+        # reentrant: _refresh() resets under it, and so may a wipe watcher thread
+        self._lock = threading.RLock()
+        self.reset()
+
+    def reset(self):
+        """Forget everything; the next get() rebuilds from the database."""
+        with self._lock:
+            self._students = None
+            self._recs = None
+            self._result_hwm = 0
+            self._rec_hwm = 0
+            self._checked = None
+            self._payload = None
+
+    def get(self, force: bool = False) -> dict:
+        with self._lock:
+            now = time.monotonic()
+            if force or self._payload is None or now - self._checked >= self.refresh_interval:
+                self._refresh()
+                self._checked = now
+            return self._payload
+
+    def _refresh(self):
+        # Ids only go down after deletes (wipes); start over in that case
+        max_result = db.session.query(func.max(TestResult.id)).scalar() or 0
+        max_rec = db.session.query(func.max(Recommendation.id)).scalar() or 0
+        if max_result < self._result_hwm or max_rec < self._rec_hwm:
+            self.reset()
+        if self._students is None:
+            self._students = _empty_students()
+            self._recs = _empty_recs()
+        if max_result > self._result_hwm:
+            self._load_results()
+        if max_rec > self._rec_hwm:
+            self._load_recommendations()
+        self._payload = self._aggregate(self._load_classes(), stream_counts(), subject_percentiles())
+
+    def _chunks(self, stmt):
+        return pd.read_sql(stmt, db.session.connection(), chunksize=self.chunk_size)
+
+    def _load_results(self):
+        # the breakdown only comes along for rows without typed scores
+        unscored = case((TestResult.stream.is_(None), TestResult.breakdown)).label('unscored')
+        stmt = (select(TestResult.id, TestResult.user_id, TestResult.score,
+                       *(c.label(s) for s, c in SUBJECT_COLUMNS.items()), unscored)
+                .where(TestResult.id > self._result_hwm)
+                .order_by(TestResult.id))
+        frames = [self._students]
+        for chunk in self._chunks(stmt):
+            if chunk.empty:
+                continue
+            self._result_hwm = int(chunk['id'].iloc[-1])
+            # only each student's newest result in this chunk matters
+            chunk = chunk.drop_duplicates('user_id', keep='last')
+            pending = chunk['unscored'].notna()
+            if pending.any():
+                chunk.loc[pending, list(SUBJECTS)] = pd.DataFrame(
+                    [self.engine.observed_subjects(b) for b in chunk.loc[pending, 'unscored']],
+                    index=chunk.index[pending], columns=list(SUBJECTS))
+            frame = chunk[list(SUBJECTS)].astype('float64').set_index(chunk['user_id'].astype('int64'))
+            frame.insert(0, 'score', chunk['score'].astype('float64').to_numpy())
+            frame.insert(0, 'result_id', chunk['id'].astype('int64').to_numpy())
+            frames.append(frame)
+        students = pd.concat(frames)
+        self._students = students[~students.index.duplicated(keep='last')]
+
+    def _load_recommendations(self):
+        # A submit replaces a student's recommendations wholesale, so new rows
+        # for a student supersede all of their older ones.
+        stmt = (select(Recommendation.id, Recommendation.user_id, Recommendation.title, Recommendation.suitability)
+                .where(Recommendation.id > self._rec_hwm, Recommendation.is_active.is_(True))
+                .order_by(Recommendation.id))
+        fresh = []
+        for chunk in self._chunks(stmt):
+            if chunk.empty:
+                continue
+            self._rec_hwm = int(chunk['id'].iloc[-1])
+            fresh.append(chunk.drop(columns='id'))
+        if not fresh:
+            return
+        fresh = pd.concat(fresh, ignore_index=True)
+        kept = self._recs[~self._recs['user_id'].isin(fresh['user_id'].unique())]
+        self._recs = pd.concat([kept, fresh], ignore_index=True)
+
+    def _load_classes(self) -> pd.Series:
+        # Classes are edited in place by /api/register, so this map is re-read
+        # each refresh; it is two narrow columns.
+        stmt = select(StudentProfile.user_id, StudentProfile.student_class)
+        parts = [c for c in self._chunks(stmt) if not c.empty]
+        if not parts:
+            return pd.Series(dtype='object', name='student_class')
+        classes = pd.concat(parts, ignore_index=True).drop_duplicates('user_id', keep='last')
+        return classes.set_index('user_id')['student_class']
+
+    def _aggregate(self, classes: pd.Series, stream_totals: dict, percentiles: dict) -> dict:
+        df = self._students
+        subjects = df[list(SUBJECTS)]
+        streams = {s: int(stream_totals.get(s, 0)) for s in STREAMS}
+
+        histograms = {}
+        averages = subjects.mean()
+        for s in SUBJECTS:
+            values = subjects[s].dropna().clip(0, 100).to_numpy()
+            if values.size:
+                counts, _ = np.histogram(values, bins=HISTOGRAM_BINS)
+                histograms[s] = counts.tolist()
+
+        by_class = df.join(classes, how='left')
+        by_class['student_class'] = by_class['student_class'].fillna('unknown')
+        grouped = by_class.groupby('student_class')
+        means = grouped[['score', *SUBJECTS]].mean()
+        sizes = grouped.size()
+        class_rows = [
+            {
+                "class": cls,
+                "students": int(sizes[cls]),
+                "avg_score": _num(row['score']),
+                "subjects": {s: _num(row[s]) for s in SUBJECTS if not pd.isna(row[s])},
+            }
+            for cls, row in means.iterrows()
+        ]
+
+        recs = self._recs
+        top = (recs.sort_values(['user_id', 'suitability'], ascending=[True, False], kind='stable')
+               .drop_duplicates('user_id'))
+        mix = {
+            "top": {t: int(n) for t, n in top['title'].value_counts().items()},
+            "all": {t: int(n) for t, n in recs['title'].value_counts().items()},
+        }
+
+        return {
+            "generated_at": datetime.utcnow().isoformat(),
+            "students": int(len(df)),
+            "streams": streams,
+            "subjects": {
+                "bins": HISTOGRAM_BINS.tolist(),
+                "histograms": histograms,
+                "averages": {s: _num(averages[s]) for s in histograms},
+                "percentiles": percentiles,
+            },
+            "classes": class_rows,
+            "recommendations": mix,
+        }
@@ -1,206 +1,294 @@
-from flask import Flask, request, jsonify
+from flask import Flask, g, request, jsonify, stream_with_context
 from flask_cors import CORS
-from firebase_admin import auth as fb_auth, credentials, initialize_app
 from config import Config
-from models import db, User, StudentProfile, AptitudeTest, TestResult, Recommendation, PortfolioItem, LearningGoal, CareerBookmark
+from models import db, User, StudentProfile, AptitudeTest, AptitudeQuestion, TestResult, Recommendation, PortfolioItem, LearningGoal, CareerBookmark, WipeJob
 from ml.engine import Engine
+from ml import model as career_model
+from profile_cache import ProfileCache, DerivedProfile
+from auth_cache import (AuthUser, TTLCache, bearer_token, cached_user, demo_auth, demo_identity, remember_claims,
+                        token_key)
+from conditional import etag_for, is_fresh, validator_headers
+from rate_limit import make_limiter, throttle
+from db_routing import PIN_HEADER, ReplicaRouter, replica_reads
+import json_codec
+from metrics import Metrics, query_budget
+from reports import BUCKETS as REPORT_BUCKETS, portfolio_series, record_portfolio, record_scores, score_series
+from analytics import CohortAnalytics, SECTIONS as ANALYTICS_SECTIONS
+from simulations import SimulationRegistry
+from post_submit import PostSubmitQueue, recommendation_rows
+from wipe_jobs import SCOPES as WIPE_SCOPES, WipeRunner, WipeWatch, job_json
+from subject_scores import SUBJECT_COLUMNS, backfill as backfill_scores, latest_result_id, observed_from_row, result_subjects, score_fields
+from question_bank import QuestionIndex, import_questions, normalize_question, read_questions
+from migrations import run_migrations, current_version, latest_version
+from datetime import date, datetime, timedelta, timezone
+import click
+import csv
+import functools
+import hashlib
+import io
 import json
 import os
-from sqlalchemy import inspect, text
+import sys
+import threading
+import time
+from sqlalchemy import insert, or_
+from sqlalchemy.orm import defer
 
 engine = Engine()
+catalog = engine.catalog
+
+# The Firebase Admin SDK (and its credentials) load on the first token
+# check; create_app() only looks for the credentials file.
+firebase_enabled = False
+_firebase_credentials = None
+_firebase_auth = None
+_firebase_lock = threading.Lock()
+
+
+def verify_id_token(token: str) -> dict:
+    global _firebase_auth
+    if _firebase_auth is None:
+        with _firebase_lock:
+            if _firebase_auth is None:
+                from firebase_admin import auth, credentials, initialize_app
+                initialize_app(credentials.Certificate(_firebase_credentials))
+                _firebase_auth = auth
+    return _firebase_auth.verify_id_token(token)
+
+def parse_submission(data: dict):
+    """Accept either raw answers or a provided breakdown/score."""
+    if 'breakdown' in data:
+        breakdown = data.get('breakdown') or {}
+        try:
+            score = int(round(float(data.get('score', 0))))
+        except Exception:
+            score = 0
+    else:
+        score, breakdown = engine.analyze(data.get('answers', {}))
+    return score, breakdown
 
-firebase_initialized = False
 
 def create_app():
-    global firebase_initialized
+    global firebase_enabled, _firebase_credentials
     app = Flask(__name__)
     app.config.from_object(Config)
+    # orjson-backed JSON when installed (see json_codec.py)
+    json_codec.use(app.config['JSON_BACKEND'])
+    app.json = json_codec.JSONProvider(app)
 
-    CORS(app, resources={r"/*": {"origins": app.config['CORS_ORIGINS'].split(',')}})
+    CORS(app, resources={r"/*": {"origins": app.config['CORS_ORIGINS'].split(',')}}, expose_headers=['X-Next-Cursor', PIN_HEADER])
 
     db.init_app(app)
+    # A forked worker (gunicorn --preload) opens its own connections instead
+    # of reusing the parent's pooled ones
+    with app.app_context():
+        binds = list(db.engines.values())
 
-    # Simple per-IP rate limiter in production (120 req/min)
-    rate_store = {}
+    def _reset_pools_after_fork():
+        for bind in binds:
+            bind.dispose(close=False)
+    os.register_at_fork(after_in_child=_reset_pools_after_fork)
 
-    @app.before_request
-    def _rate_limit():
-        if os.environ.get('ENV', 'development') != 'production':
-            return None
-        try:
-            from time import time
-            ip = request.remote_addr or 'unknown'
-            now = int(time())
-            window = 60
-            limit = 120
-            bucket = rate_store.get(ip, [])
-            bucket = [t for t in bucket if now - t < window]
-            if len(bucket) >= limit:
-                return jsonify({"error": "rate_limited", "retry_after": window}), 429
-            bucket.append(now)
-            rate_store[ip] = bucket
-        except Exception:
-            return None
+    # Per-endpoint latency and SQL counters, served at /metrics (see metrics.py).
+    # Each view's @query_budget(n) caps its statements per request; run
+    # query_budget.py after touching a view's queries.
+    metrics = Metrics(app.config['SLOW_QUERY_MS'] / 1000.0, app.logger) if app.config['METRICS_ENABLED'] else None
+    if metrics is not None:
+        with app.app_context():
+            for bind in db.engines.values():
+                metrics.instrument_engine(bind)
+        app.extensions['metrics'] = metrics
 
-    # --- Helpers -----------------------------------------------------------
-    def compute_best_stream_from_breakdown(br: dict) -> str:
-        """Compute best-fit stream exactly once and reuse across endpoints.
-        Mirrors the dashboard logic, including the 'science' proxy.
-        Returns one of: 'engineering', 'biology', 'humanities', 'commerce'.
-        """
-        try:
-            maths = float(br.get('maths', br.get('mathematics', br.get('Maths', 50.0))))
-            physics = float(br.get('physics', br.get('Physics', maths)))
-            chemistry = float(br.get('chemistry', br.get('Chemistry', maths)))
-            biology = float(br.get('biology', br.get('Biology', 50.0)))
-            english = float(br.get('english', br.get('English', 50.0)))
-            economics = float(br.get('economics', br.get('Economics', 50.0)))
-            accounts = float(br.get('accountancy', br.get('accounts', 50.0)))
-            history = float(br.get('history', br.get('History', 50.0)))
-            science = float(br.get('science', br.get('Science', 50.0)))
-            social = float(br.get('social', br.get('Social', 50.0)))
-            # Use science as proxy for Physics & Chemistry when specific are absent
-            if physics == maths and chemistry == maths and science != 50.0:
-                physics = chemistry = science
-            pcm = (physics + chemistry + maths)/3.0
-            pcb = (physics + chemistry + biology)/3.0
-            # Include social in humanities calculation
-            hum = (history + english + economics + social)/4.0
-            com = (accounts + economics + maths)/3.0
-            stream_scores = {
-                'engineering': pcm,
-                'biology': pcb,
-                'humanities': hum,
-                'commerce': com,
-            }
-            return max(stream_scores, key=stream_scores.get)
-        except Exception:
-            return 'engineering'
+        @app.before_request
+        def _metrics_begin():
+            g.metrics = (metrics.begin(request.endpoint or 'unmatched'), time.perf_counter())
 
-    # Ensure critical schema parts exist (dev convenience)
-    with app.app_context():
-        inspector = inspect(db.engine)
-        if inspector.has_table('users'):
-            cols = [c['name'] for c in inspector.get_columns('users')]
-            # Ensure 'uid' exists and is NOT NULL UNIQUE
-            if 'uid' not in cols:
-                db.session.execute(text("ALTER TABLE users ADD COLUMN uid VARCHAR(128) NULL AFTER id"))
-                db.session.execute(text("UPDATE users SET uid = email WHERE uid IS NULL AND email IS NOT NULL"))
-                db.session.execute(text("ALTER TABLE users MODIFY COLUMN uid VARCHAR(128) NOT NULL"))
-                db.session.execute(text("ALTER TABLE users ADD UNIQUE (uid)"))
-                db.session.commit()
-
-        # Ensure at least one aptitude test exists for foreign key references
-        try:
-            if AptitudeTest.query.count() == 0:
-                db.session.add(AptitudeTest(name='General Aptitude'))
-                db.session.commit()
-        except Exception:
-            pass
-
-        # Ensure learning_goals table exists
-        if not inspector.has_table('learning_goals'):
-            db.session.execute(text(
-                """
-                CREATE TABLE learning_goals (
-                    id INT PRIMARY KEY AUTO_INCREMENT,
-                    user_id INT NOT NULL,
-                    skill VARCHAR(120) NOT NULL,
-                    task VARCHAR(255) NOT NULL,
-                    week INT DEFAULT 1,
-                    done BOOLEAN DEFAULT 0,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    CONSTRAINT fk_lg_user FOREIGN KEY (user_id) REFERENCES users(id)
-                )
-                """
-            ))
-            db.session.commit()
-            # Handle legacy 'firebase_uid' column that is NOT NULL
-            if 'firebase_uid' in cols:
-                # Backfill firebase_uid from uid (preferred) or email
-                db.session.execute(text("UPDATE users SET firebase_uid = COALESCE(uid, email) WHERE (firebase_uid IS NULL OR firebase_uid = '')"))
-                # Relax NOT NULL to allow inserts that don't set this legacy column
-                try:
-                    db.session.execute(text("ALTER TABLE users MODIFY COLUMN firebase_uid VARCHAR(128) NULL"))
-                except Exception:
-                    pass
-                db.session.commit()
-
-        # Ensure portfolio_items has expected columns
-        if inspector.has_table('portfolio_items'):
-            pcols = [c['name'] for c in inspector.get_columns('portfolio_items')]
-            if 'name' not in pcols:
-                db.session.execute(text("ALTER TABLE portfolio_items ADD COLUMN name VARCHAR(200) NULL AFTER user_id"))
-            if 'url' not in pcols:
-                db.session.execute(text("ALTER TABLE portfolio_items ADD COLUMN url TEXT NULL"))
-            if 'created_at' not in pcols:
-                db.session.execute(text("ALTER TABLE portfolio_items ADD COLUMN created_at DATETIME DEFAULT CURRENT_TIMESTAMP"))
-            if 'description' not in pcols:
-                db.session.execute(text("ALTER TABLE portfolio_items ADD COLUMN description VARCHAR(255) NULL"))
-            if 'tags' not in pcols:
-                db.session.execute(text("ALTER TABLE portfolio_items ADD COLUMN tags VARCHAR(255) NULL"))
-            db.session.commit()
+        @app.after_request
+        def _metrics_status(resp):
+            g.metrics_status = resp.status_code
+            return resp
 
-        # Ensure career_bookmarks table exists
-        if not inspector.has_table('career_bookmarks'):
-            db.session.execute(text(
-                """
-                CREATE TABLE career_bookmarks (
-                    id INT PRIMARY KEY AUTO_INCREMENT,
-                    user_id INT NOT NULL,
-                    title VARCHAR(200) NOT NULL,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    CONSTRAINT fk_cb_user FOREIGN KEY (user_id) REFERENCES users(id)
-                )
-                """
-            ))
-            db.session.commit()
+        @app.teardown_request
+        def _metrics_end(exc):
+            started = g.pop('metrics', None)
+            if started is not None:
+                token, t0 = started
+                metrics.end(token, request.method, g.pop('metrics_status', 500), time.perf_counter() - t0)
 
-    if not firebase_initialized:
+    # Derived profiles of each user's latest TestResult (see profile_cache.py)
+    profile_cache = ProfileCache(
+        max_entries=app.config['PROFILE_CACHE_MAX_ENTRIES'],
+        max_bytes=app.config['PROFILE_CACHE_MAX_BYTES'],
+        ttl=app.config['PROFILE_CACHE_TTL'],
+    )
+    app.extensions['profile_cache'] = profile_cache
+
+    # Trained career-affinity model, if one has been saved (`flask train-model`);
+    # profiles derived under the previous version are dropped on reload.
+    model_store = career_model.ModelStore(app.config['MODEL_DIR'], app.config['MODEL_CHECK_INTERVAL'], on_reload=profile_cache.clear)
+    engine.use_model(model_store, app.config['MODEL_BLEND'])
+    app.extensions['career_model'] = model_store
+
+    analytics = CohortAnalytics(engine, app.config['ANALYTICS_CHUNK_SIZE'], app.config['ANALYTICS_REFRESH_INTERVAL'])
+
+    # Work that follows each aptitude submission (see post_submit.py)
+    post_submit = PostSubmitQueue(
+        app, engine,
+        workers=app.config['POST_SUBMIT_WORKERS'],
+        sweep_after=app.config['POST_SUBMIT_SWEEP_SECONDS'],
+        on_processed=profile_cache.put,
+    )
+    app.extensions['post_submit'] = post_submit
+
+    # Verified Firebase tokens and user snapshots, so repeat callers skip
+    # token verification and the users lookup until the entry expires.
+    token_cache = TTLCache(app.config['AUTH_CACHE_TTL'], app.config['AUTH_CACHE_MAX_ENTRIES'])
+    user_cache = TTLCache(app.config['AUTH_CACHE_TTL'], app.config['AUTH_CACHE_MAX_ENTRIES'])
+    app.extensions['token_cache'] = token_cache
+    app.extensions['user_cache'] = user_cache
+
+    def _after_wipe_batch():
+        profile_cache.clear()
+        user_cache.clear()
+        token_cache.clear()
+        analytics.reset()
+
+    # Wipes run in one worker; the others notice through the wipe_jobs
+    # counter and drop their caches the same way (see wipe_jobs.py)
+    wipe_watch = WipeWatch(app, app.config['WIPE_WATCH_INTERVAL'], on_change=_after_wipe_batch)
+    app.extensions['wipe_watch'] = wipe_watch
+
+    # Data wipes run as resumable background jobs (see wipe_jobs.py)
+    wipe_runner = WipeRunner(
+        app,
+        batch_size=app.config['WIPE_BATCH_SIZE'],
+        chunk_size=app.config['WIPE_CHUNK_SIZE'],
+        archive_dir=app.config['WIPE_ARCHIVE_DIR'],
+        stale_after=app.config['WIPE_JOB_STALE_SECONDS'],
+        on_progress=_after_wipe_batch,
+    )
+    app.extensions['wipe_runner'] = wipe_runner
+
+    def queue_wipe(user, scope, value, archive):
+        """Record a wipe job and start it; 409 while another job is active."""
+        job = wipe_runner.create(scope, value, archive, requested_by=user.id)
+        if job is None:
+            holder = wipe_runner.holder()
+            return jsonify({"error": "wipe_in_progress", "job": job_json(holder) if holder else None}), 409
+        wipe_runner.start(job.id)
+        return jsonify({"job": job_json(job), "status_url": f"/api/admin/wipe-jobs/{job.id}"}), 202
+
+    # Read-only views may read from the replica bind (see db_routing.py)
+    replica_router = ReplicaRouter(bool(app.config['SQLALCHEMY_BINDS'].get('replica')),
+                                   app.config['REPLICA_PIN_SECONDS'], app.config['AUTH_CACHE_MAX_ENTRIES'])
+    app.after_request(replica_router.after_request)
+    app.extensions['replica_router'] = replica_router
+
+    # Per-IP rate limiter (see rate_limit.py); on by default in production only
+    limiter = make_limiter(app.config)
+    app.extensions['rate_limiter'] = limiter
+
+    @app.before_request
+    def _rate_limit():
+        limited = throttle(limiter, request.remote_addr)
+        if limited is not None:
+            body, headers = limited
+            return jsonify(body), 429, headers
+
+    # Schema changes and seed data live in migrations.py and run once per
+    # deploy (`flask migrate`); AUTO_MIGRATE=1 applies them here for dev.
+    if app.config['AUTO_MIGRATE']:
+        with app.app_context():
+            run_migrations()
+
+    if not firebase_enabled:
         cred_path = app.config['FIREBASE_CREDENTIALS_PATH']
         if os.path.exists(cred_path):
-            cred = credentials.Certificate(cred_path)
-            initialize_app(cred)
-            firebase_initialized = True
+            _firebase_credentials = cred_path
+            firebase_enabled = True
 
     @app.get("/health")
+    @query_budget(0)
     def health():
         return {"status": "ok"}
 
+    @app.get('/metrics')
+    @query_budget(0)
+    def metrics_export():
+        if metrics is None:
+            return jsonify({"error": "not found"}), 404
+        token = app.config['METRICS_TOKEN']
+        if token and request.headers.get('Authorization') != f"Bearer {token}":
+            return jsonify({"error": "forbidden"}), 403
+        return app.response_class(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+    # Conditional GET (see conditional.py). A view passes everything its body
+    # depends on to not_modified(); if the client's ETag (or Last-Modified)
+    # still matches it gets a bare 304 before any payload is built, otherwise
+    # the after_request hook stamps the same validators on the full response.
+    def not_modified(*parts, last_modified=None, max_age=0):
+        tag = etag_for(*parts)
+        g.validators = (tag, last_modified, max_age)
+        if is_fresh(tag, last_modified, request.headers.get('If-None-Match'), request.headers.get('If-Modified-Since')):
+            return app.response_class(status=304)
+        return None
+
+    @app.after_request
+    def _validators(resp):
+        v = g.pop('validators', None)
+        if v is not None and resp.status_code in (200, 304):
+            headers = validator_headers(*v)
+            resp.vary.add(headers.pop('Vary'))
+            resp.headers.update(headers)
+        return resp
+
+    def model_version():
+        model = model_store.get()
+        return model.version if model is not None else None
+
+    def load_user(uid, email, role=None):
+        """Cached snapshot of the user with this uid, creating the row on first sight.
+        A role is only written when it differs from the stored one.
+        """
+        snapshot = _load_user(uid, email, role)
+        replica_router.route(snapshot.id)
+        return snapshot
+
+    def _load_user(uid, email, role):
+        wipe_watch.ensure_running()
+        cached = cached_user(user_cache, uid, role)
+        if cached is not None:
+            return cached
+        user = User.query.filter_by(uid=uid).first()
+        if not user:
+            user = User(uid=uid, email=email, role=role or 'student')
+            db.session.add(user)
+            db.session.commit()
+        elif role is not None and user.role != role:
+            user.role = role
+            db.session.commit()
+        snapshot = AuthUser.from_model(user)
+        user_cache.set(uid, snapshot)
+        return snapshot
+
     # Auth middleware (verify Firebase token)
     def current_user():
-        token = request.headers.get('Authorization', '').replace('Bearer ', '')
-        # Development fallback if Firebase is not initialized OR ENV != production
-        if (not firebase_initialized) or (os.environ.get('ENV', 'development') != 'production'):
-            demo_uid = request.headers.get('X-Demo-UID', 'demo-user')
-            demo_email = request.headers.get('X-Demo-Email', 'demo@example.com')
-            role = 'admin' if request.headers.get('X-Admin') == 'true' else 'student'
-            user = User.query.filter_by(uid=demo_uid).first()
-            if not user:
-                user = User(uid=demo_uid, email=demo_email, role=role)
-                db.session.add(user)
-                db.session.commit()
-            else:
-                user.role = role
-                db.session.commit()
-            return user
+        if demo_auth(firebase_enabled):
+            return load_user(*demo_identity(request.headers))
+        token = bearer_token(request.headers)
         if not token:
             return None
         try:
-            decoded = fb_auth.verify_id_token(token)
-            uid = decoded['uid']
-            email = decoded.get('email', '')
-            user = User.query.filter_by(uid=uid).first()
-            if not user:
-                user = User(uid=uid, email=email, role='student')
-                db.session.add(user)
-                db.session.commit()
-            return user
+            key = token_key(token)
+            decoded = token_cache.get(key)
+            if decoded is None:
+                decoded = remember_claims(token_cache, key, verify_id_token(token))
+            return load_user(decoded['uid'], decoded.get('email', ''))
         except Exception:
             return None
 
     @app.post('/api/register')
+    @query_budget(3)
     def register_profile():
         user = current_user()
         if not user:
@@ -218,6 +306,7 @@ def create_app():
         return {"message": "profile saved"}
 
     @app.get('/api/profile')
+    @query_budget(2)
     def get_profile():
         user = current_user()
         if not user:
@@ -234,6 +323,7 @@ def create_app():
 
     # Career bookmarks
     @app.get('/api/bookmarks')
+    @query_budget(2)
     def bookmarks_list():
         user = current_user()
         if not user:
@@ -242,6 +332,7 @@ def create_app():
         return [{"id": b.id, "title": b.title, "created_at": b.created_at.isoformat()} for b in items]
 
     @app.post('/api/bookmarks')
+    @query_budget(3)
     def bookmarks_add():
         user = current_user()
         if not user:
@@ -256,6 +347,7 @@ def create_app():
         return {"id": b.id}
 
     @app.delete('/api/bookmarks/<int:bid>')
+    @query_budget(2)
     def bookmarks_delete(bid):
         user = current_user()
         if not user:
@@ -267,48 +359,44 @@ def create_app():
         db.session.commit()
         return {"message": "deleted"}
 
-    # Reports
+    # Reports: score and portfolio history from the daily rollups (see reports.py)
     @app.get('/api/reports')
+    @query_budget(3)
+    @replica_reads
     def reports():
         user = current_user()
         if not user:
             return jsonify({"error": "unauthorized"}), 401
-        # score history
-        results = TestResult.query.filter_by(user_id=user.id).order_by(TestResult.created_at.asc()).all()
-        history = [{"t": r.created_at.isoformat(), "score": r.score} for r in results]
-        # portfolio growth by day
-        counts = db.session.execute(text(
-            """
-            SELECT DATE(created_at) d, COUNT(*) c
-            FROM portfolio_items WHERE user_id = :uid
-            GROUP BY DATE(created_at) ORDER BY DATE(created_at)
-            """
-        ), {"uid": user.id}).mappings().all()
-        growth = [{"t": str(row['d']), "count": int(row['c'])} for row in counts]
-        return {"scores": history, "portfolio": growth}
+        bucket = request.args.get('bucket', 'day')
+        if bucket not in REPORT_BUCKETS:
+            return jsonify({"error": "bucket must be one of day, week, month"}), 400
+        try:
+            end = date.fromisoformat(request.args['to']) if request.args.get('to') else datetime.utcnow().date()
+            start = date.fromisoformat(request.args['from']) if request.args.get('from') else end - timedelta(days=app.config['REPORTS_DEFAULT_DAYS'])
+        except ValueError:
+            return jsonify({"error": "from/to must be YYYY-MM-DD dates"}), 400
+        if start > end:
+            return jsonify({"error": "from is after to"}), 400
+        return {
+            "from": start.isoformat(),
+            "to": end.isoformat(),
+            "bucket": bucket,
+            "scores": score_series(user.id, start, end, bucket),
+            "portfolio": portfolio_series(user.id, start, end, bucket),
+        }
 
     # Admin endpoint to clear all user data for fresh system
     @app.post('/api/admin/clear-all-data')
+    @query_budget(6)
     def clear_all_data():
         user = current_user()
         if not user:
             return jsonify({"error": "unauthorized"}), 401
-        try:
-            # Clear all user data tables
-            TestResult.query.delete()
-            Recommendation.query.delete()
-            PortfolioItem.query.delete()
-            LearningGoal.query.delete()
-            CareerBookmark.query.delete()
-            StudentProfile.query.delete()
-            User.query.delete()
-            db.session.commit()
-            return {"message": "All user data cleared"}
-        except Exception as e:
-            db.session.rollback()
-            return jsonify({"error": str(e)}), 500
+        return queue_wipe(user, 'all', None, False)
 
     @app.get('/api/dashboard')
+    @query_budget(6)
+    @replica_reads
     def dashboard():
         user = current_user()
         if not user:
@@ -320,7 +408,11 @@ def create_app():
         # Latest aptitude test result
         prof = StudentProfile.query.filter_by(user_id=user.id).first()
         student_class = str(getattr(prof, 'student_class', '10') or '10')
-        latest = TestResult.query.filter_by(user_id=user.id).order_by(TestResult.id.desc()).first()
+        latest = latest_profile(user)
+        cached = not_modified('dashboard', user.id, latest.result_id if latest else None, pcount,
+                              student_class, catalog.version, model_version())
+        if cached:
+            return cached
         if not latest:
             return {
                 "requires_test": True,
@@ -330,149 +422,32 @@ def create_app():
                 "skills": {},
                 "student_class": student_class,
             }
-        overall = 0
-        logical = 0
-        creative = 0
-        try:
-            br = json.loads(latest.breakdown) if isinstance(latest.breakdown, str) else latest.breakdown
-        except Exception:
-            br = {}
         overall = int(round(latest.score)) if latest.score is not None else 0
-        logical = int(round(br.get('logical', 0)))
-        creative = int(round(br.get('creative', 0)))
-        # If subject-based breakdown provided, derive logical/creative proxies
-        if (logical == 0 and creative == 0) and isinstance(br, dict) and br:
-            try:
-                m = float(br.get('maths', br.get('mathematics', 0)))
-                p = float(br.get('physics', br.get('Physics', 0)))
-                c = float(br.get('chemistry', br.get('Chemistry', 0)))
-                eng = float(br.get('english', br.get('English', 0)))
-                soc = float(br.get('social', br.get('Social', 0)))
-                bio = float(br.get('biology', br.get('Biology', 0)))
-                # Logical ~ PCM average (or math+science when PCM not present)
-                lp = [x for x in [m, p, c] if x > 0]
-                if not lp:
-                    sci = float(br.get('science', br.get('Science', 0)))
-                    lp = [v for v in [m, sci] if v > 0]
-                logical = int(round(sum(lp)/len(lp))) if lp else 0
-                # Creative ~ language/social average
-                cp = [x for x in [eng, soc] if x > 0]
-                if not cp and bio > 0:
-                    cp = [eng, bio]
-                creative = int(round(sum(cp)/len(cp))) if cp else 0
-            except Exception:
-                pass
-
-        # Recommendations created at submission time
-        recs = Recommendation.query.filter_by(user_id=user.id).order_by(Recommendation.id.desc()).limit(4).all()
-        recs_payload = [{"title": r.title, "suitability": r.suitability} for r in recs]
+        # Stream, role and skill-fit scores are derived once per result
+        prof_scores = latest.scores
+        logical = int(round(prof_scores.subjects['logical']))
+        creative = int(round(prof_scores.subjects['creative']))
+
+        # Recommendations stored for the latest result (see post_submit.py)
+        recs = user_recommendations(user, latest)[::-1][:4]
+        recs_payload = [{"title": title, "suitability": suitability} for title, suitability in recs]
         # If engine didn't persist any, compute top roles from latest breakdown to avoid fixed placeholders
         if not recs_payload:
-            # Subject proxies from breakdown (defaults mid if missing)
-            maths = float(br.get('maths', br.get('mathematics', br.get('Maths', 50.0))))
-            physics = float(br.get('physics', br.get('Physics', maths)))
-            chemistry = float(br.get('chemistry', br.get('Chemistry', maths)))
-            biology = float(br.get('biology', br.get('Biology', 50.0)))
-            english = float(br.get('english', br.get('English', 50.0)))
-            economics = float(br.get('economics', br.get('Economics', 50.0)))
-            accounts = float(br.get('accountancy', br.get('accounts', 50.0)))
-            history = float(br.get('history', br.get('History', 50.0)))
-            pcm = (physics + chemistry + maths)/3.0
-            pcb = (physics + chemistry + biology)/3.0
-            hum = (history + english + economics)/3.0
-            com = (accounts + economics + maths)/3.0
-            role_pool = [
-                ("Software Engineer", 'engineering', 0.6*pcm + 0.2*english),
-                ("Data Scientist", 'engineering', 0.55*pcm + 0.15*english),
-                ("Doctor (MBBS)", 'biology', 0.6*pcb + 0.1*english),
-                ("Biotechnologist", 'biology', 0.5*pcb + 0.1*english),
-                ("Journalist", 'humanities', 0.6*hum),
-                ("Historian", 'humanities', 0.55*hum),
-                ("Chartered Accountant", 'commerce', 0.6*com),
-                ("Investment Analyst", 'commerce', 0.65*com),
-            ]
-            scored = sorted(({"title": t, "suitability": int(round(min(100.0, s))) , "domain": d} for (t,d,s) in role_pool), key=lambda x: x['suitability'], reverse=True)
-            recs_payload = [{"title": x['title'], "suitability": x['suitability']} for x in scored[:4]]
+            recs_payload = [{"title": r.title, "suitability": int(r.suitability)} for r in prof_scores.roles[:4]]
 
         # Stream-aware skill gaps derived from aptitude and subjects
-        # Use the shared helper to compute best stream
-        best_stream = compute_best_stream_from_breakdown(br)
-        # Extract individual subjects for skill gap calculations
-        maths = float(br.get('maths', br.get('mathematics', 50.0)))
-        physics = float(br.get('physics', 50.0))
-        chemistry = float(br.get('chemistry', 50.0))
-        biology = float(br.get('biology', 50.0))
-        english = float(br.get('english', 50.0))
-        economics = float(br.get('economics', 50.0))
-        accounts = float(br.get('accountancy', br.get('accounts', 50.0)))
-        history = float(br.get('history', 50.0))
-        social = float(br.get('social', br.get('Social', 50.0)))
-        # Recompute aggregates used in fit formulas below
-        pcm = (physics + chemistry + maths) / 3.0
-        pcb = (physics + chemistry + biology) / 3.0
-        # Fit proxies per stream
-        if best_stream == 'engineering':
-            fit_prog = int(round((0.7*pcm + 0.3*logical)))
-            fit_da = int(round((0.6*pcm + 0.4*logical)))
-            fit_ps = int(round((0.5*logical + 0.3*english + 0.2*creative)))
-            skills = {
-                "Programming": max(0, 100 - fit_prog),
-                "Data Analysis": max(0, 100 - fit_da),
-                "Problem Solving": max(0, 100 - fit_ps),
-            }
-        elif best_stream == 'biology':
-            fit_lab = int(round((0.7*pcb + 0.3*logical)))
-            fit_chem = int(round(chemistry))
-            fit_comm = int(round((0.6*english + 0.4*creative)))
-            skills = {
-                "Biology Lab": max(0, 100 - fit_lab),
-                "Chemistry Basics": max(0, 100 - fit_chem),
-                "Scientific Communication": max(0, 100 - fit_comm),
-            }
-        elif best_stream == 'humanities':
-            fit_w = int(round((0.7*english + 0.3*creative)))
-            fit_r = int(round((0.5*history + 0.3*social + 0.2*economics)))
-            fit_ct = int(round((0.5*logical + 0.5*creative)))
-            skills = {
-                "Writing": max(0, 100 - fit_w),
-                "Research": max(0, 100 - fit_r),
-                "Critical Thinking": max(0, 100 - fit_ct),
-            }
-        else:  # commerce
-            fit_acc = int(round((0.7*accounts + 0.3*maths)))
-            fit_ba = int(round((0.6*economics + 0.4*logical)))
-            fit_quant = int(round((0.7*maths + 0.3*logical)))
-            skills = {
-                "Accounting": max(0, 100 - fit_acc),
-                "Business Analysis": max(0, 100 - fit_ba),
-                "Quantitative Aptitude": max(0, 100 - fit_quant),
-            }
+        best_stream = prof_scores.best_stream
+        skills = {k: max(0, 100 - int(round(v))) for k, v in prof_scores.skill_fit.items()}
 
         # Stream guidance for class 9-10 students to choose 11-12 stream
         guidance = None
         if student_class in ['9','10']:
-            reasons = []
-            if best_stream == 'engineering':
-                reasons.append('Strong PCM (Physics, Chemistry, Maths) fundamentals observed')
-                suggested = ['Physics','Chemistry','Mathematics']
-            elif best_stream == 'biology':
-                reasons.append('Higher Biology and Science aptitude indicated')
-                suggested = ['Biology','Chemistry','Physics']
-            elif best_stream == 'humanities':
-                reasons.append('Strength in languages and social sciences')
-                suggested = ['History','Economics','English']
-            else:
-                reasons.append('Commerce-oriented aptitude with numbers and business')
-                suggested = ['Accountancy','Economics','Mathematics']
+            stream = catalog.streams[best_stream]
             guidance = {
                 'recommended_stream': best_stream,
-                'why': reasons,
-                'suggested_subjects_in_11_12': suggested,
-                'next_steps': [
-                    'Discuss stream choice with parents/teachers',
-                    'Explore the detailed careers for this stream in Explore Careers',
-                    'Start foundational courses and projects for the suggested subjects'
-                ]
+                'why': list(stream.why),
+                'suggested_subjects_in_11_12': list(stream.suggested_subjects),
+                'next_steps': list(catalog.guidance_next_steps),
             }
 
         return {
@@ -484,78 +459,162 @@ def create_app():
             "stream_guidance": guidance,
         }
 
-    @app.post('/api/aptitude/submit')
-    def submit_aptitude():
-        user = current_user()
-        if not user:
-            return jsonify({"error": "unauthorized"}), 401
-        data = request.json or {}
-        # Accept either raw answers or a provided breakdown/score
-        if 'breakdown' in data:
-            breakdown = data.get('breakdown') or {}
-            try:
-                score = int(round(float(data.get('score', 0))))
-            except Exception:
-                score = 0
-        else:
-            score, breakdown = engine.analyze(data.get('answers', {}))
-        # record test result
+    def derive_profile(tr: TestResult) -> DerivedProfile:
+        subjects = result_subjects(engine, tr)
+        return DerivedProfile(tr.user_id, tr.id, tr.score, subjects, engine.profile(subjects))
+
+    def latest_profile(user):
+        """Derived profile of the user's latest TestResult, or None before any test."""
+        # picks up a newly trained model version, which clears this cache
+        model_store.get()
+        cached = profile_cache.lookup(user.id)
+        if cached is not None:
+            prof, fresh = cached
+            if fresh:
+                return prof
+            latest_id = db.session.query(TestResult.id).filter_by(user_id=user.id).order_by(TestResult.id.desc()).limit(1).scalar()
+            # results only go away in wipes, which clear this cache (see
+            # wipe_jobs.py); an older id means a replica without it yet
+            if latest_id is None or latest_id <= prof.result_id:
+                profile_cache.touch(user.id)
+                return prof
+        # breakdown is only loaded for rows without typed scores (see subject_scores.py)
+        latest = (TestResult.query.options(defer(TestResult.breakdown))
+                  .filter_by(user_id=user.id).order_by(TestResult.id.desc()).first())
+        if not latest:
+            profile_cache.invalidate(user.id)
+            return None
+        prof = derive_profile(latest)
+        profile_cache.put(prof)
+        return prof
+
+    def user_recommendations(user, latest):
+        """(title, suitability) pairs in insert order. Until post_submit has
+        processed the latest result, the rows it is about to store stand in
+        for the previous result's rows."""
+        processed = db.session.query(TestResult.processed_at).filter_by(id=latest.result_id).scalar()
+        if processed is None:
+            return [(r["title"], r["suitability"]) for r in recommendation_rows(latest.scores)]
+        return db.session.query(Recommendation.title, Recommendation.suitability).filter_by(user_id=user.id).order_by(Recommendation.id).all()
+
+    def default_test():
         # Use the first available aptitude test (created at startup if none existed)
         t = AptitudeTest.query.order_by(AptitudeTest.id.asc()).first()
         if not t:
             t = AptitudeTest(name='General Aptitude')
             db.session.add(t)
             db.session.commit()
-        tr = TestResult(user_id=user.id, test_id=t.id, score=score, breakdown=json.dumps(breakdown))
+        return t
+
+    @app.post('/api/aptitude/submit')
+    @query_budget(5)
+    def submit_aptitude():
+        user = current_user()
+        if not user:
+            return jsonify({"error": "unauthorized"}), 401
+        data = request.json or {}
+        score, breakdown = parse_submission(data)
+        # The result row is the only write before responding; rollups,
+        # recommendations and the warmed profile follow in post_submit.
+        t = default_test()
+        tr = TestResult(user_id=user.id, test_id=t.id, score=score, breakdown=json.dumps(breakdown), created_at=datetime.utcnow(),
+                        **score_fields(engine, [breakdown])[0])
         db.session.add(tr)
-        # refresh recommendations (clear old to keep dashboard clean)
-        Recommendation.query.filter_by(user_id=user.id).delete()
-        # generate fresh recommendations based on subject breakdown
-        maths = float(breakdown.get('maths', breakdown.get('mathematics', breakdown.get('Maths', 50.0))))
-        physics = float(breakdown.get('physics', breakdown.get('Physics', maths)))
-        chemistry = float(breakdown.get('chemistry', breakdown.get('Chemistry', maths)))
-        biology = float(breakdown.get('biology', breakdown.get('Biology', 50.0)))
-        english = float(breakdown.get('english', breakdown.get('English', 50.0)))
-        economics = float(breakdown.get('economics', breakdown.get('Economics', 50.0)))
-        accounts = float(breakdown.get('accountancy', breakdown.get('accounts', 50.0)))
-        history = float(breakdown.get('history', breakdown.get('History', 50.0)))
-        science = float(breakdown.get('science', breakdown.get('Science', 50.0)))
-        social = float(breakdown.get('social', breakdown.get('Social', 50.0)))
-        # Use science as proxy for PCB when individual subjects not present
-        if physics == maths and chemistry == maths and science != 50.0:
-            physics = chemistry = science
-        pcm = (physics + chemistry + maths)/3.0
-        pcb = (physics + chemistry + biology)/3.0
-        hum = (history + english + economics)/3.0
-        com = (accounts + economics + maths)/3.0
-        role_pool = [
-            ("Software Engineer", 'engineering', 0.6*pcm + 0.2*english),
-            ("Data Scientist", 'engineering', 0.55*pcm + 0.15*english),
-            ("Mechanical Engineer", 'engineering', 0.65*pcm),
-            ("Doctor (MBBS)", 'biology', 0.6*pcb + 0.1*english),
-            ("Biotechnologist", 'biology', 0.5*pcb + 0.1*english),
-            ("Pharmacist", 'biology', 0.55*pcb),
-            ("Journalist", 'humanities', 0.6*hum),
-            ("Historian", 'humanities', 0.55*hum),
-            ("Psychologist", 'humanities', 0.5*hum + 0.2*english),
-            ("Chartered Accountant", 'commerce', 0.6*com),
-            ("Investment Analyst", 'commerce', 0.65*com),
-            ("Business Analyst", 'commerce', 0.5*com + 0.2*maths),
-        ]
-        scored = sorted(({"title": t, "suitability": int(round(min(100.0, s))), "domain": d} for (t,d,s) in role_pool), key=lambda x: x['suitability'], reverse=True)
-        # Store top 6 as recommendations
-        for item in scored[:6]:
-            db.session.add(Recommendation(
-                user_id=user.id,
-                title=item['title'],
-                suitability=item['suitability'],
-                details=item['domain'],
-                is_active=True
-            ))
         db.session.commit()
-        return {"score": score, "breakdown": breakdown}
+        profile_cache.invalidate(user.id)
+        post_submit.submit(tr.id)
+        return {"score": score, "breakdown": breakdown, "result_id": tr.id}
+
+    # Bulk import of answer sheets (e.g. a whole school): one auth lookup,
+    # one vectorized scoring pass and bulk inserts in a single transaction.
+    @app.post('/api/aptitude/submit-batch')
+    @query_budget(7)
+    def submit_aptitude_batch():
+        user = current_user()
+        if not user or user.role != 'admin':
+            return jsonify({"error": "forbidden"}), 403
+        data = request.json or {}
+        sheets = data.get('results')
+        if not isinstance(sheets, list) or not sheets:
+            return jsonify({"error": "results required"}), 400
+        limit = app.config['BATCH_SUBMIT_MAX']
+        if len(sheets) > limit:
+            return jsonify({"error": "batch_too_large", "max": limit}), 413
+
+        # Students are addressed by uid, falling back to email
+        errors = []
+        sheets_ok = []
+        for i, sheet in enumerate(sheets):
+            if not isinstance(sheet, dict):
+                errors.append({"index": i, "error": "invalid entry"})
+                continue
+            uid = sheet.get('uid') or sheet.get('email')
+            if not uid:
+                errors.append({"index": i, "error": "uid or email required"})
+                continue
+            try:
+                score, breakdown = parse_submission(sheet)
+            except (AttributeError, TypeError, ValueError) as e:
+                errors.append({"index": i, "error": f"invalid submission: {e}"})
+                continue
+            sheets_ok.append((i, uid, sheet.get('email') or uid, bool(sheet.get('uid')), score, breakdown))
+        if not sheets_ok:
+            return jsonify({"error": "no valid results", "errors": errors}), 400
+
+        # One lookup by uid or email: a sheet without a uid belongs to the
+        # student holding its email, whatever uid Firebase gave them
+        known = User.query.filter(or_(User.uid.in_({e[1] for e in sheets_ok}), User.email.in_({e[2] for e in sheets_ok}))).all()
+        users = {u.uid: u.id for u in known}
+        owners = {u.email: u.uid for u in known}
+        entries = []
+        missing = {}
+        for i, uid, email, explicit, score, breakdown in sheets_ok:
+            if uid not in users:
+                owner = owners.get(email, uid)
+                if owner != uid and (explicit or owner not in users):
+                    errors.append({"index": i, "error": "email belongs to another uid"})
+                    continue
+                if owner in users:
+                    uid = owner
+                else:
+                    owners[email] = uid
+                    missing.setdefault(uid, email)
+            entries.append((uid, email, score, breakdown))
+        if not entries:
+            return jsonify({"error": "no valid results", "errors": errors}), 400
+        if missing:
+            db.session.execute(insert(User), [
+                {"uid": uid, "email": email, "role": 'student'} for uid, email in missing.items()
+            ])
+            users.update({u.uid: u.id for u in User.query.filter(User.uid.in_(list(missing))).all()})
+
+        t = default_test()
+        now = datetime.utcnow()
+        user_ids = [users[e[0]] for e in entries]
+        breakdowns = [e[3] for e in entries]
+        db.session.execute(insert(TestResult), [
+            {"user_id": uid, "test_id": t.id, "score": score, "breakdown": json.dumps(breakdown), "created_at": now, "processed_at": now, **fields}
+            for uid, (_, _, score, breakdown), fields in zip(user_ids, entries, score_fields(engine, breakdowns))
+        ])
+        record_scores((uid, now, e[2]) for uid, e in zip(user_ids, entries))
+
+        # Only a student's last sheet in the batch drives their recommendations
+        last = {uid: i for i, uid in enumerate(user_ids)}
+        order = sorted(last.values())
+        top = engine.recommend_many([breakdowns[i] for i in order], k=6)
+        Recommendation.query.filter(Recommendation.user_id.in_(list(last))).delete(synchronize_session=False)
+        db.session.execute(insert(Recommendation), [
+            {"user_id": user_ids[i], "title": rec.title, "suitability": int(rec.suitability), "details": rec.details, "is_active": True}
+            for i, recs in zip(order, top) for rec in recs
+        ])
+        db.session.commit()
+        for uid in last:
+            profile_cache.invalidate(uid)
+        errors.sort(key=lambda e: e["index"])
+        return {"imported": len(entries), "students": len(last), "created_users": len(missing), "errors": errors}
 
     @app.get('/api/skill-gap')
+    @query_budget(3)
     def skill_gap():
         user = current_user()
         if not user:
@@ -563,83 +622,22 @@ def create_app():
         # Dynamically derive target by class and "have" from latest aptitude
         # Baseline from engine
         sg = engine.skill_gap()
-        latest = TestResult.query.filter_by(user_id=user.id).order_by(TestResult.id.desc()).first()
+        latest = latest_profile(user)
         if not latest:
             return {"requires_test": True}
-        logical = 50.0
-        creative = 50.0
-        if latest:
-            try:
-                br = json.loads(latest.breakdown) if isinstance(latest.breakdown, str) else latest.breakdown
-            except Exception:
-                br = {}
-            logical = float(br.get('logical', br.get('Logical', 50.0)))
-            creative = float(br.get('creative', br.get('Creative', 50.0)))
         prof = StudentProfile.query.filter_by(user_id=user.id).first()
         student_class = str(getattr(prof, 'student_class', '10') or '10')
-        # Extract subjects from breakdown for stream-aware skills
-        maths = float(br.get('maths', br.get('mathematics', br.get('Maths', 50.0))))
-        physics = float(br.get('physics', br.get('Physics', maths)))
-        chemistry = float(br.get('chemistry', br.get('Chemistry', maths)))
-        biology = float(br.get('biology', br.get('Biology', 50.0)))
-        english = float(br.get('english', br.get('English', 50.0)))
-        economics = float(br.get('economics', br.get('Economics', 50.0)))
-        accounts = float(br.get('accountancy', br.get('accounts', 50.0)))
-        history = float(br.get('history', br.get('History', 50.0)))
-        social = float(br.get('social', br.get('Social', 50.0)))
-        science = float(br.get('science', br.get('Science', 50.0)))
-        # Align with dashboard: if only 'science' is present, use it as proxy for Physics & Chemistry
-        if physics == maths and chemistry == maths and science != 50.0:
-            physics = chemistry = science
-
-        # Infer stream strengths using the shared helper (keeps parity with dashboard)
-        best_stream = compute_best_stream_from_breakdown(br)
+        # Stream and skill estimates come from the shared engine score matrix (keeps parity with dashboard)
+        prof_scores = latest.scores
+        best_stream = prof_scores.best_stream
 
         # Label uses stream; do not override stream with recommendation to avoid mismatches
-        top_rec = Recommendation.query.filter_by(user_id=user.id).order_by(Recommendation.suitability.desc()).first()
         target_label = f"Required for {best_stream.title()}"
 
-        # Build stream-specific skills and current estimates (0-10)
-        if best_stream == 'engineering':
-            skills = ['Programming', 'Data Analysis', 'Problem Solving', 'Physics Fundamentals', 'Communication']
-            est = {
-                'Programming': (0.5*maths + 0.3*logical + 0.2*creative)/10.0,
-                'Data Analysis': (0.45*maths + 0.2*physics + 0.15*logical + 0.2*english)/10.0,
-                'Problem Solving': (0.5*logical + 0.2*maths + 0.3*creative)/10.0,
-                'Physics Fundamentals': (0.7*physics + 0.3*maths)/10.0,
-                'Communication': (0.5*creative + 0.2*english + 0.1*logical)/10.0,
-            }
-            target_base = {'Programming': 8.5, 'Data Analysis': 8.0, 'Problem Solving': 8.0, 'Physics Fundamentals': 7.5, 'Communication': 7.0}
-        elif best_stream == 'biology':
-            skills = ['Biology Lab', 'Chemistry Basics', 'Scientific Reasoning', 'Data Recording', 'Communication']
-            est = {
-                'Biology Lab': (0.7*biology + 0.2*chemistry + 0.1*english)/10.0,
-                'Chemistry Basics': (0.6*chemistry + 0.2*physics + 0.2*maths)/10.0,
-                'Scientific Reasoning': (0.45*logical + 0.25*biology + 0.15*chemistry + 0.15*english)/10.0,
-                'Data Recording': (0.4*maths + 0.3*biology + 0.2*english + 0.1*logical)/10.0,
-                'Communication': (0.5*english + 0.3*creative + 0.2*logical)/10.0,
-            }
-            target_base = {'Biology Lab': 8.5, 'Chemistry Basics': 8.0, 'Scientific Reasoning': 8.0, 'Data Recording': 7.5, 'Communication': 7.0}
-        elif best_stream == 'humanities':
-            skills = ['Writing', 'Research', 'Critical Thinking', 'Economics Basics', 'Communication']
-            est = {
-                'Writing': (0.6*english + 0.3*creative + 0.1*logical)/10.0,
-                'Research': (0.35*history + 0.25*social + 0.2*english + 0.15*economics + 0.05*logical)/10.0,
-                'Critical Thinking': (0.5*logical + 0.2*english + 0.15*history + 0.15*social)/10.0,
-                'Economics Basics': (0.6*economics + 0.2*maths + 0.2*english)/10.0,
-                'Communication': (0.5*english + 0.2*creative + 0.15*social + 0.15*logical)/10.0,
-            }
-            target_base = {'Writing': 8.5, 'Research': 8.0, 'Critical Thinking': 8.0, 'Economics Basics': 7.5, 'Communication': 7.5}
-        else:  # commerce
-            skills = ['Accounting', 'Business Analysis', 'Quantitative Aptitude', 'Excel/Spreadsheets', 'Communication']
-            est = {
-                'Accounting': (0.6*accounts + 0.3*maths + 0.1*english)/10.0,
-                'Business Analysis': (0.5*economics + 0.2*english + 0.3*logical)/10.0,
-                'Quantitative Aptitude': (0.7*maths + 0.3*logical)/10.0,
-                'Excel/Spreadsheets': (0.5*maths + 0.2*economics + 0.3*logical)/10.0,
-                'Communication': (0.5*english + 0.2*creative + 0.3*logical)/10.0,
-            }
-            target_base = {'Accounting': 8.5, 'Business Analysis': 8.0, 'Quantitative Aptitude': 8.0, 'Excel/Spreadsheets': 7.5, 'Communication': 7.0}
+        # Stream-specific skills and current estimates (0-10)
+        skills = list(prof_scores.skill_estimate)
+        est = prof_scores.skill_estimate
+        target_base = prof_scores.skill_target_base
 
         # Targets scale by class (higher for 11-12)
         class_bonus = 1.5 if student_class in ['11','12'] else (1.2 if student_class in ['10'] else 1.0)
@@ -757,6 +755,7 @@ def create_app():
         return jsonify({"message": "Planner functionality has been removed"})
 
     @app.delete('/api/goals/<int:gid>')
+    @query_budget(3)
     def goal_delete(gid):
         user = current_user()
         if not user:
@@ -769,25 +768,85 @@ def create_app():
         return {"message": "deleted"}
 
     @app.get('/api/admin/students')
+    @query_budget(2)
+    @replica_reads
     def admin_students():
         user = current_user()
         if not user or user.role != 'admin':
             return jsonify({"error": "forbidden"}), 403
-        profiles = StudentProfile.query.all()
-        out = []
-        for p in profiles:
-            u = User.query.get(p.user_id)
-            out.append({
-                "id": p.id,
-                "name": f"{p.first_name} {p.last_name}",
-                "email": u.email,
-                "class": p.student_class,
-                "status": "Pending",
-            })
-        return out
+        # Keyset pagination over student_profiles.id: ?after=<last id>&limit=N,
+        # optional ?class= and ?status=pending|completed filters, and cohort
+        # filters on the latest result: ?stream=, ?<subject>_min=, ?<subject>_max=
+        after = request.args.get('after', 0, type=int)
+        limit = request.args.get('limit', app.config['ADMIN_STUDENTS_PAGE_SIZE'], type=int)
+        limit = max(1, min(limit, app.config['ADMIN_STUDENTS_MAX_PAGE_SIZE']))
+        student_class = request.args.get('class')
+        status = (request.args.get('status') or '').lower()
+        tested = db.session.query(TestResult.id).filter(TestResult.user_id == StudentProfile.user_id).exists()
+        filters = [StudentProfile.id > after]
+        if student_class:
+            filters.append(StudentProfile.student_class == student_class)
+        if status == 'completed':
+            filters.append(tested)
+        elif status == 'pending':
+            filters.append(~tested)
+        cohort = [TestResult.stream == request.args['stream']] if request.args.get('stream') else []
+        for subject, column in SUBJECT_COLUMNS.items():
+            low = request.args.get(f'{subject}_min', type=float)
+            high = request.args.get(f'{subject}_max', type=float)
+            if low is not None:
+                cohort.append(column >= low)
+            if high is not None:
+                cohort.append(column <= high)
+        if cohort:
+            filters.append(db.session.query(TestResult.id)
+                           .filter(TestResult.id == latest_result_id(StudentProfile.user_id), *cohort).exists())
+        # First id of the next page, if any; ?after=<that id - 1> resumes exactly there
+        next_id = db.session.query(StudentProfile.id).filter(*filters).order_by(StudentProfile.id).offset(limit).limit(1).scalar()
+        rows = (db.session.query(StudentProfile.id, StudentProfile.first_name, StudentProfile.last_name,
+                                 StudentProfile.student_class, User.email, tested.label('tested'))
+                .join(User, User.id == StudentProfile.user_id)
+                .filter(*filters)
+                .order_by(StudentProfile.id)
+                .limit(limit)
+                .execution_options(yield_per=500))
+
+        def generate():
+            yield '['
+            for i, (pid, first, last, cls, email, has_result) in enumerate(rows):
+                item = {
+                    "id": pid,
+                    "name": f"{first} {last}",
+                    "email": email,
+                    "class": cls,
+                    "status": "Completed" if has_result else "Pending",
+                }
+                yield (',' if i else '') + app.json.dumps(item)
+            yield ']'
+
+        resp = app.response_class(stream_with_context(generate()), mimetype='application/json')
+        if next_id is not None:
+            resp.headers['X-Next-Cursor'] = str(next_id - 1)
+        return resp
+
+    # Cohort analytics (see analytics.py); ?refresh=1 skips the cache interval
+    @app.get('/api/admin/analytics')
+    @app.get('/api/admin/analytics/<section>')
+    @query_budget(8)
+    def admin_analytics(section=None):
+        user = current_user()
+        if not user or user.role != 'admin':
+            return jsonify({"error": "forbidden"}), 403
+        if section is not None and section not in ANALYTICS_SECTIONS:
+            return jsonify({"error": "unknown section", "sections": list(ANALYTICS_SECTIONS)}), 404
+        data = analytics.get(force=request.args.get('refresh') in ('1', 'true'))
+        if section is None:
+            return data
+        return {"generated_at": data["generated_at"], "students": data["students"], section: data[section]}
 
     # Portfolio metadata endpoints (client uploads files to Supabase Storage)
     @app.get('/api/portfolio')
+    @query_budget(2)
     def portfolio_list():
         user = current_user()
         if not user:
@@ -798,6 +857,7 @@ def create_app():
         ]
 
     @app.post('/api/portfolio')
+    @query_budget(4)
     def portfolio_add():
         user = current_user()
         if not user:
@@ -809,16 +869,18 @@ def create_app():
         tags = data.get('tags')
         if not name or not url:
             return jsonify({"error": "name and url required"}), 400
-        item = PortfolioItem(user_id=user.id, name=name, url=url)
+        item = PortfolioItem(user_id=user.id, name=name, url=url, created_at=datetime.utcnow())
         if description:
             setattr(item, 'description', description)
         if tags:
             setattr(item, 'tags', tags)
         db.session.add(item)
+        record_portfolio(user.id, item.created_at)
         db.session.commit()
         return {"id": item.id, "name": item.name, "url": item.url, "description": getattr(item, 'description', None), "tags": getattr(item, 'tags', None), "created_at": item.created_at.isoformat()}
 
     @app.patch('/api/portfolio/<int:pid>')
+    @query_budget(3)
     def portfolio_update(pid):
         user = current_user()
         if not user:
@@ -834,6 +896,7 @@ def create_app():
         return {"message": "updated"}
 
     @app.delete('/api/portfolio/<int:pid>')
+    @query_budget(3)
     def portfolio_delete(pid):
         user = current_user()
         if not user:
@@ -841,162 +904,82 @@ def create_app():
         item = PortfolioItem.query.get(pid)
         if not item or item.user_id != user.id:
             return jsonify({"error": "not found"}), 404
+        if item.created_at:
+            record_portfolio(user.id, item.created_at, delta=-1)
         db.session.delete(item)
         db.session.commit()
         return {"message": "deleted"}
 
     @app.get('/api/careers')
+    @query_budget(4)
+    @replica_reads
     def careers():
         user = current_user()
         if not user:
             return jsonify({"error": "unauthorized"}), 401
-        # Build a class/stream-aware career set weighted by latest subject breakdown and recommendations
-        prof = StudentProfile.query.filter_by(user_id=user.id).first()
-        student_class = str(getattr(prof, 'student_class', '10') or '10')
-        latest = TestResult.query.filter_by(user_id=user.id).order_by(TestResult.id.desc()).first()
+        # Build a stream-aware career set weighted by latest subject breakdown and recommendations
+        latest = latest_profile(user)
         if not latest:
             return {"requires_test": True}
-        try:
-            br = json.loads(latest.breakdown) if isinstance(latest.breakdown, str) else latest.breakdown
-        except Exception:
-            br = {}
-        # Subject scores if available
-        maths = float(br.get('maths', br.get('mathematics', br.get('Maths', 50.0))))
-        science = float(br.get('science', br.get('Science', 50.0)))
-        social = float(br.get('social', br.get('Social', 50.0)))
-        english = float(br.get('english', br.get('English', 50.0)))
-        physics = float(br.get('physics', br.get('Physics', science)))
-        chemistry = float(br.get('chemistry', br.get('Chemistry', science)))
-        biology = float(br.get('biology', br.get('Biology', science)))
-        history = float(br.get('history', br.get('History', social)))
-        economics = float(br.get('economics', br.get('Economics', social)))
-        accounts = float(br.get('accountancy', br.get('accounts', 50.0)))
-        business = float(br.get('business', br.get('Business', 50.0)))
-        recs = Recommendation.query.filter_by(user_id=user.id).all()
-        boost = {r.title: min(25.0, (r.suitability or 0)/5.0) for r in recs}
-        # Catalogs per broad stream
-        eng_roles = [
-            ("Software Engineer", 0.5, 0.3, 0.2, 14.0, "engineering"),
-            ("Data Scientist", 0.4, 0.4, 0.2, 18.5, "engineering"),
-            ("Mechanical Engineer", 0.6, 0.25, 0.15, 12.0, "engineering"),
-            ("Electrical Engineer", 0.55, 0.3, 0.15, 12.8, "engineering"),
-            ("Civil Engineer", 0.5, 0.3, 0.2, 11.5, "engineering"),
-        ]
-        bio_roles = [
-            ("Doctor (MBBS)", 0.1, 0.45, 0.45, 25.0, "biology"),
-            ("Biotechnologist", 0.25, 0.35, 0.4, 14.5, "biology"),
-            ("Pharmacist", 0.2, 0.5, 0.3, 12.0, "biology"),
-            ("Microbiologist", 0.15, 0.35, 0.5, 11.0, "biology"),
-        ]
-        hum_roles = [
-            ("Historian", 0.0, 0.4, 0.6, 9.0, "humanities"),
-            ("Journalist", 0.1, 0.3, 0.6, 10.5, "humanities"),
-            ("Psychologist", 0.1, 0.4, 0.5, 11.0, "humanities"),
-            ("Sociologist", 0.05, 0.35, 0.6, 9.5, "humanities"),
-        ]
-        com_roles = [
-            ("Chartered Accountant", 0.5, 0.4, 0.1, 15.0, "commerce"),
-            ("Investment Analyst", 0.45, 0.4, 0.15, 18.0, "commerce"),
-            ("Business Analyst", 0.4, 0.3, 0.3, 12.0, "commerce"),
-            ("Economist", 0.3, 0.2, 0.5, 13.0, "commerce"),
-        ]
-        # Steps/resources per stream
-        steps_by_stream = {
-            "engineering": ["Master PCM fundamentals", "Build projects (coding/robotics)", "Prepare for JEE/entrance", "Apply for internships"],
-            "biology": ["Strengthen PCB fundamentals", "Lab work and projects", "Prepare for NEET/entrance", "Shadow professionals"],
-            "humanities": ["Deepen core subjects", "Develop writing/research", "Contribute to school publications", "Apply to internships"],
-            "commerce": ["Learn accounting & finance", "Practice case studies", "Certifications (e.g., Excel)", "Internships at firms"],
-        }
-        resources_by_stream = {
-            "engineering": [{"name":"NPTEL PCM","url":"https://nptel.ac.in/"}],
-            "biology": [{"name":"Khan Academy Biology","url":"https://www.khanacademy.org/science/biology"}],
-            "humanities": [{"name":"The Economist – Espresso","url":"https://www.economist.com/espresso"}],
-            "commerce": [{"name":"AccountingCoach","url":"https://www.accountingcoach.com/"}],
-        }
-        # Select stream by best-fit or class default
-        # For 11-12, infer stream by best of (PCM -> eng), (PCB -> bio), (humanities -> hist+eng), (commerce -> accounts+economics)
-        pcm = (physics + chemistry + maths)/3.0
-        pcb = (physics + chemistry + biology)/3.0
-        hum = (history + english + economics)/3.0
-        com = (accounts + business + economics)/3.0
-        stream_scores = {
-            'engineering': pcm,
-            'biology': pcb,
-            'humanities': hum,
-            'commerce': com,
-        }
-        best_stream = max(stream_scores, key=stream_scores.get)
-        role_pool = eng_roles + bio_roles + hum_roles + com_roles
-        out = []
-        for title, w_pcm, w_econ, w_hum, salary, domain in role_pool:
-            fit = 0.0
-            if domain == 'engineering':
-                fit = w_pcm*pcm + 0.2*english
-            elif domain == 'biology':
-                fit = w_pcm*pcb + 0.1*english
-            elif domain == 'humanities':
-                fit = w_hum*hum + 0.15*english
-            elif domain == 'commerce':
-                fit = 0.5*com + 0.3*economics + 0.2*maths
-            fit += boost.get(title, 0.0)
-            item = {
-                "title": title,
-                "suitability": int(round(min(100.0, fit))),
-                "median_salary": salary,
-                "steps": steps_by_stream[domain],
-                "resources": resources_by_stream[domain],
-                "domain": domain,
-            }
-            out.append(item)
+        # recommendations are rewritten with every new result, so the result id covers them
+        cached = not_modified('careers', user.id, latest.result_id, catalog.version, model_version())
+        if cached:
+            return cached
+        prof_scores = latest.scores
+        boost = {title: min(25.0, (suitability or 0)/5.0) for title, suitability in user_recommendations(user, latest)}
+        # Select stream by best-fit; fits come from the engine's career block.
+        # Steps/resources are pre-serialized per career in the catalog.
+        best_stream = prof_scores.best_stream
+        scored = []
+        for career in catalog.careers:
+            fit = prof_scores.career_fit[career.title] + boost.get(career.title, 0.0)
+            scored.append((career.domain == best_stream, int(round(min(100.0, fit))), career))
         # Bias show-casing by best stream and class maturity
-        out.sort(key=lambda x: (x['domain']==best_stream, x['suitability']), reverse=True)
-        return {"careers": out[:12]}
+        scored.sort(key=lambda x: (x[0], x[1]), reverse=True)
+        body = ','.join(catalog.career_json(career, suit) for _, suit, career in scored[:12])
+        return app.response_class('{"careers":[' + body + ']}\n', mimetype='application/json')
 
     # Career trends (salaries, demand index, emerging fields)
     @app.get('/api/trends')
+    @query_budget(4)
     def trends():
         user = current_user()
         if not user:
             return jsonify({"error": "unauthorized"}), 401
         # Weight roles based on latest subject breakdown and existing recommendations
-        latest = TestResult.query.filter_by(user_id=user.id).order_by(TestResult.id.desc()).first()
+        latest = latest_profile(user)
         if not latest:
             return {"requires_test": True}
-        try:
-            br = json.loads(latest.breakdown) if isinstance(latest.breakdown, str) else latest.breakdown
-        except Exception:
-            br = {}
-        maths = float(br.get('maths', 50))
-        physics = float(br.get('physics', 50))
-        chemistry = float(br.get('chemistry', 50))
-        biology = float(br.get('biology', 50))
-        english = float(br.get('english', 50))
-        economics = float(br.get('economics', 50))
-        accounts = float(br.get('accountancy', br.get('accounts', 50)))
-        history = float(br.get('history', 50))
-        recs = Recommendation.query.filter_by(user_id=user.id).all()
-        rec_boost = {r.title: min(15, (r.suitability or 0)/10.0) for r in recs}
-        roles_catalog = [
-            ("Software Engineer", (physics+maths)/2.0, 14.0),
-            ("Data Scientist", (maths+physics+chemistry)/3.0, 18.5),
-            ("Doctor (MBBS)", (biology+chemistry)/2.0, 25.0),
-            ("Biotechnologist", (biology+chemistry+physics)/3.0, 14.5),
-            ("Journalist", (english+history)/2.0, 10.5),
-            ("Economist", (economics+maths)/2.0, 13.0),
-            ("Chartered Accountant", (accounts+economics)/2.0, 15.0),
-        ]
+        cached = not_modified('trends', user.id, latest.result_id, catalog.version, model_version())
+        if cached:
+            return cached
+        prof_scores = latest.scores
+        rec_boost = {title: min(15, (suitability or 0)/10.0) for title, suitability in user_recommendations(user, latest)}
         roles = []
-        for title, base_score, salary in roles_catalog:
+        for title, salary in zip(catalog.trend_titles, catalog.trend_salaries):
+            base_score = prof_scores.trend_base[title]
             demand = int(round(min(100, base_score + 20 + rec_boost.get(title, 0))))
             roles.append({"title": title, "demand": demand, "median_salary": salary})
         roles.sort(key=lambda r: r['demand'], reverse=True)
         return {
             "updated": "today",
             "roles": roles[:20],
-            "emerging": ["AI Safety", "Prompt Engineering", "Biotech QA", "Sustainable Finance"],
+            "emerging": list(catalog.emerging),
         }
 
+    # Serialized question payloads per bank and (grade, stream, n, seed);
+    # bounded since seeds are client-supplied
+    @functools.lru_cache(maxsize=app.config['QUESTION_PAYLOAD_CACHE_SIZE'])
+    def question_payload(bank, grade, stream, n, seed) -> bytes:
+        return json_codec.dumps_bytes({"class": grade, "questions": bank.sample(grade, stream, n, seed)})
+
+    # Warm question index, reloaded after admin writes (see question_bank.py)
+    question_index = QuestionIndex(app.config['QUESTION_BANK_CHECK_INTERVAL'], on_reload=question_payload.cache_clear)
+    app.extensions['question_index'] = question_index
+    app.extensions['question_payload'] = question_payload
+
     @app.get('/api/questions')
+    @query_budget(3)
     def questions():
         user = current_user()
         if not user:
@@ -1004,346 +987,105 @@ def create_app():
         grade = request.args.get('class', '10')
         stream = request.args.get('stream')  # for 11-12: engineering, biology, humanities, commerce
         try:
-            n = int(request.args.get('n', '50'))
+            n = int(request.args.get('n', '50'))  # questions per subject
         except Exception:
             n = 50
-        import random
-
-        def mcq(qid, text, subject, options, answer):
-            return {"id": qid, "text": text, "domain": subject, "options": options, "answer": answer}
-
-        bank = []
-        qid = 1
-        rng = random.Random(str(grade) + ':' + str(stream or ''))
-
-        if grade in ['9','10']:
-            subjects = ['maths','science','social','english']
-            samples = {
-                'maths': [
-                    ("What is the value of 3x when x=7?", ["10","14","21","28"], 2),
-                    ("The HCF of 24 and 36 is", ["6","12","18","24"], 1),
-                    ("Solve: 2x + 5 = 15", ["x = 5","x = 10","x = 7.5","x = 20"], 0),
-                    ("What is 25% of 80?", ["20","15","25","30"], 0),
-                    ("Simplify: (x + 3)(x + 4)", ["x² + 7x + 12","x² + 7x + 7","x² + 12","x² + 7"], 0),
-                    ("If a² + b² = 100 and ab = 48, what is (a + b)?", ["12","14","10","16"], 1),
-                    ("The area of a circle with radius 7 cm is (π = 22/7)", ["154 cm²","144 cm²","176 cm²","196 cm²"], 0),
-                    ("Square root of 625 is", ["20","25","30","35"], 1),
-                    ("What is 15% of 200?", ["25","30","35","40"], 1),
-                    ("Factorize: x² - 9", ["(x - 3)(x + 3)","(x - 3)²","(x + 3)²","(x - 9)(x + 1)"], 0),
-                    ("If 3x = 12, then x equals", ["3","4","5","6"], 1),
-                    ("The LCM of 12 and 18 is", ["36","54","72","90"], 0),
-                    ("The sum of interior angles of a triangle is", ["90°","180°","270°","360°"], 1),
-                    ("Which is a prime number?", ["15","17","21","25"], 1),
-                    ("The value of (2³) × (2²) is", ["32","64","128","256"], 0),
-                ],
-                'science': [
-                    ("Which gas is essential for photosynthesis?", ["CO2","O2","N2","H2"], 0),
-                    ("Force is measured in", ["Joule","Newton","Pascal","Watt"], 1),
-                    ("What is the SI unit of force?", ["Newton","Joule","Watt","Pascal"], 0),
-                    ("What is the chemical formula of water?", ["H2O","CO2","O2","H2O2"], 0),
-                    ("Which organelle is known as the powerhouse of the cell?", ["Mitochondria","Nucleus","Ribosome","Chloroplast"], 0),
-                    ("The process by which plants make food is called", ["Respiration","Photosynthesis","Transpiration","Digestion"], 1),
-                    ("What is the speed of light?", ["3 × 10⁸ m/s","3 × 10⁶ m/s","3 × 10⁵ m/s","3 × 10⁷ m/s"], 0),
-                    ("Which planet is known as the Red Planet?", ["Venus","Mars","Jupiter","Saturn"], 1),
-                    ("The pH value of pure water is", ["5","7","9","11"], 1),
-                    ("Which gas is most abundant in Earth's atmosphere?", ["Oxygen","Nitrogen","Carbon dioxide","Hydrogen"], 1),
-                    ("The smallest unit of life is", ["Atom","Cell","Tissue","Organ"], 1),
-                    ("What type of energy does a moving car possess?", ["Potential","Kinetic","Chemical","Nuclear"], 1),
-                    ("The boiling point of water is", ["90°C","95°C","100°C","105°C"], 2),
-                    ("Which vitamin is produced by the skin in sunlight?", ["Vitamin A","Vitamin B","Vitamin C","Vitamin D"], 3),
-                    ("The process of conversion of solid to gas is called", ["Melting","Evaporation","Sublimation","Condensation"], 2),
-                ],
-                'social': [
-                    ("The Indus Valley Civilization is known for", ["Vedas","Urban planning","Gunpowder","Pyramids"], 1),
-                    ("Panchayati Raj relates to", ["Rural governance","National defense","Foreign policy","Banking"], 0),
-                    ("Who was the first Prime Minister of India?", ["Jawaharlal Nehru","Mahatma Gandhi","Sardar Patel","Dr. Rajendra Prasad"], 0),
-                    ("What is GDP?", ["Gross Domestic Product","General Domestic Product","Gross Development Product","Global Domestic Product"], 0),
-                    ("When did India gain independence?", ["1947","1950","1945","1942"], 0),
-                    ("The capital of India is", ["Mumbai","Delhi","Kolkata","Chennai"], 1),
-                    ("Who wrote the Indian National Anthem?", ["Rabindranath Tagore","Bankim Chandra","Sarojini Naidu","Subhash Chandra Bose"], 0),
-                    ("The longest river in India is", ["Yamuna","Ganga","Brahmaputra","Godavari"], 1),
-                    ("Which movement was started by Mahatma Gandhi in 1942?", ["Non-Cooperation","Civil Disobedience","Quit India","Khilafat"], 2),
-                    ("The Battle of Plassey was fought in", ["1757","1764","1857","1947"], 0),
-                    ("The first Indian to go to space was", ["Rakesh Sharma","Kalpana Chawla","Sunita Williams","APJ Abdul Kalam"], 0),
-                    ("Which is the largest state in India by area?", ["Maharashtra","Rajasthan","Madhya Pradesh","Uttar Pradesh"], 1),
-                    ("The Indian Constitution was adopted on", ["15 Aug 1947","26 Jan 1950","26 Nov 1949","2 Oct 1950"], 2),
-                    ("Which ocean lies to the south of India?", ["Atlantic","Pacific","Indian","Arctic"], 2),
-                    ("Who is known as the Iron Man of India?", ["Nehru","Patel","Gandhi","Bose"], 1),
-                ],
-                'english': [
-                    ("Choose the correct synonym of 'Rapid'", ["Slow","Quick","Dull","Calm"], 1),
-                    ("Identify the adjective: 'She wore a beautiful dress'", ["She","wore","beautiful","dress"], 2),
-                    ("Choose the correct antonym for 'Abundant'", ["Plenty","Scarce","Sufficient","Excess"], 1),
-                    ("Correct passive: 'She writes a letter'", ["A letter is written by her","A letter was written by her","A letter is being written","She is writing a letter"], 0),
-                    ("Figure of speech: 'The stars danced in the sky'", ["Simile","Metaphor","Personification","Alliteration"], 2),
-                    ("Choose the correct form: 'He ___ to school every day'", ["go","goes","going","gone"], 1),
-                    ("Which word is a noun?", ["Run","Quickly","Happiness","Beautiful"], 2),
-                    ("The plural of 'child' is", ["Childs","Childes","Children","Childer"], 2),
-                    ("Identify the verb: 'They play cricket'", ["They","play","cricket","None"], 1),
-                    ("A sentence that asks a question is called", ["Declarative","Interrogative","Imperative","Exclamatory"], 1),
-                    ("Choose the correct spelling", ["Recieve","Receive","Recive","Receeve"], 1),
-                    ("The past tense of 'go' is", ["Goed","Gone","Went","Going"], 2),
-                    ("An antonym of 'ancient' is", ["Old","Modern","Historical","Traditional"], 1),
-                    ("Which punctuation mark ends a statement?", ["Question mark","Period","Exclamation","Comma"], 1),
-                    ("'The cat sat on the mat' - what is 'on'?", ["Noun","Verb","Preposition","Adjective"], 2),
-                ],
-            }
-            for s in subjects:
-                for text_q, opts, ans in samples[s]:
-                    bank.append(mcq(qid, text_q, s, opts, ans)); qid += 1
-        else:
-            stream = (stream or 'engineering').lower()
-            if stream not in ['engineering','biology','humanities','commerce']:
-                stream = 'engineering'
-            stream_subjects = {
-                'engineering': ['physics','chemistry','maths','english'],
-                'biology': ['biology','chemistry','physics','english'],
-                'humanities': ['history','economics','english','social'],
-                'commerce': ['accountancy','business','economics','maths'],
-            }
-            subjects = stream_subjects[stream]
-            samples = {
-                'physics': [
-                    ("Unit of electric current is", ["Volt","Ampere","Ohm","Tesla"], 1),
-                    ("What is the unit of magnetic flux?", ["Weber","Tesla","Henry","Gauss"], 0),
-                    ("Escape velocity from Earth is", ["11.2 km/s","7.9 km/s","15.0 km/s","9.8 km/s"], 0),
-                    ("Newton's second law relates force to", ["Mass","Acceleration","Mass × Acceleration","Velocity"], 2),
-                    ("The SI unit of work is", ["Newton","Joule","Watt","Pascal"], 1),
-                    ("Ohm's law states V =", ["I/R","IR","R/I","I + R"], 1),
-                    ("The frequency of AC supply in India is", ["50 Hz","60 Hz","100 Hz","120 Hz"], 0),
-                    ("An object in motion continues in motion due to", ["Inertia","Force","Acceleration","Momentum"], 0),
-                    ("The universal gravitational constant G is approximately", ["6.67 × 10⁻¹¹","9.8","3 × 10⁸","1.6 × 10⁻¹⁹"], 0),
-                    ("Which lens is used to correct myopia?", ["Convex","Concave","Bifocal","Cylindrical"], 1),
-                    ("The unit of electric charge is", ["Ampere","Coulomb","Volt","Ohm"], 1),
-                    ("Kinetic energy formula is", ["mv","½mv²","mv²","m²v"], 1),
-                    ("The refractive index of glass is approximately", ["1.0","1.5","2.0","2.5"], 1),
-                    ("What does LED stand for?", ["Light Emitting Diode","Low Energy Device","Large Electronic Display","None"], 0),
-                    ("The phenomenon of light bending is called", ["Reflection","Refraction","Diffraction","Polarization"], 1),
-                ],
-                'chemistry': [
-                    ("Atomic number represents", ["Neutrons","Electrons","Protons","Mass number"], 2),
-                    ("pH of pure water is", ["7","0","14","10"], 0),
-                    ("Common salt formula is", ["NaCl","H2O","CO2","O2"], 0),
-                    ("The noble gas with atomic number 10 is", ["Helium","Neon","Argon","Krypton"], 1),
-                    ("Avogadro's number is approximately", ["6.02 × 10²³","3 × 10⁸","9.8","1.6 × 10⁻¹⁹"], 0),
-                    ("The process of rusting is an example of", ["Reduction","Oxidation","Neutralization","Sublimation"], 1),
-                    ("Which element has the symbol Fe?", ["Fluorine","Iron","Francium","Fermium"], 1),
-                    ("The pH scale ranges from", ["0 to 7","0 to 14","1 to 10","1 to 14"], 1),
-                    ("An acid turns blue litmus paper", ["Blue","Red","Green","Yellow"], 1),
-                    ("The molecular formula of glucose is", ["C₆H₁₂O₆","C₁₂H₂₂O₁₁","CH₄","H₂O"], 0),
-                    ("Which gas is released during photosynthesis?", ["CO₂","O₂","N₂","H₂"], 1),
-                    ("The periodic table was created by", ["Dalton","Mendeleev","Bohr","Rutherford"], 1),
-                    ("Diamond and graphite are allotropes of", ["Oxygen","Carbon","Silicon","Phosphorus"], 1),
-                    ("The bond between two hydrogen atoms is", ["Ionic","Covalent","Metallic","Hydrogen"], 1),
-                    ("Catalyst changes the", ["Product","Reactant","Rate of reaction","Equilibrium"], 2),
-                ],
-                'maths': [
-                    ("Derivative of x^2 is", ["2x","x","x^2","1"], 0),
-                    ("What is sin 45°?", ["1/√2","√3/2","1/2","1"], 0),
-                    ("∫ 1/x dx =", ["ln|x| + C","x + C","1/x^2 + C","x^2 + C"], 0),
-                    ("The value of cos 60° is", ["½","1","√3/2","1/√2"], 0),
-                    ("Determinant of a 2×2 identity matrix is", ["0","1","2","-1"], 1),
-                    ("The slope of line 2x + 3y = 6 is", ["-2/3","2/3","3/2","-3/2"], 0),
-                    ("If f(x) = 3x + 2, then f(5) is", ["15","17","13","19"], 1),
-                    ("The sum of first n natural numbers is", ["n(n+1)","n(n+1)/2","n²","(n+1)/2"], 1),
-                    ("A quadratic equation has at most how many real roots?", ["1","2","3","4"], 1),
-                    ("tan 90° is", ["0","1","Undefined","∞"], 2),
-                    ("The distance formula is", ["√[(x₂-x₁)² + (y₂-y₁)²]","(x₂-x₁) + (y₂-y₁)","x₂+y₂","None"], 0),
-                    ("If log₁₀(100) = x, then x is", ["1","2","10","100"], 1),
-                    ("The graph of y = x² is a", ["Line","Circle","Parabola","Hyperbola"], 2),
-                    ("The area under a curve is found by", ["Differentiation","Integration","Substitution","Addition"], 1),
-                    ("Factorial of 5 (5!) is", ["20","60","120","150"], 2),
-                ],
-                'english': [
-                    ("Choose antonym of 'Transparent'", ["Clear","Opaque","Lucid","Sheer"], 1),
-                    ("A synonym for 'Benevolent' is", ["Kind","Cruel","Neutral","Angry"], 0),
-                    ("Identify the tense: 'She has been working'", ["Simple present","Present continuous","Present perfect continuous","Past perfect"], 2),
-                    ("'To break the ice' means", ["To start conversation","To freeze water","To be cold","To stop talking"], 0),
-                    ("Shakespeare wrote", ["War and Peace","Hamlet","1984","Great Expectations"], 1),
-                    ("The plural of 'criterion' is", ["Criterions","Criteria","Criterias","Criteries"], 1),
-                    ("An autobiography is written by", ["Someone else","The subject themselves","A historian","A journalist"], 1),
-                    ("The opposite of 'expand' is", ["Contract","Increase","Grow","Inflate"], 0),
-                    ("Which is a collective noun?", ["Dog","Team","Run","Happy"], 1),
-                    ("'As brave as a lion' is an example of", ["Metaphor","Simile","Personification","Hyperbole"], 1),
-                    ("The correct spelling is", ["Occassion","Occasion","Ocasion","Occation"], 1),
-                    ("An oxymoron is", ["Same meaning words","Opposite meaning words together","Exaggeration","Sound repetition"], 1),
-                    ("The prefix 'un-' means", ["Not","Very","Again","Before"], 0),
-                    ("'The wind howled' is an example of", ["Simile","Personification","Alliteration","Onomatopoeia"], 1),
-                    ("A haiku is a form of", ["Novel","Drama","Poetry","Essay"], 2),
-                ],
-                'biology': [
-                    ("Site of photosynthesis is", ["Ribosome","Chloroplast","Mitochondria","Nucleus"], 1),
-                    ("Which blood group is universal donor?", ["O negative","AB positive","A positive","B positive"], 0),
-                    ("DNA stands for", ["Deoxyribonucleic acid","Dinitrogen acid","Double nitrogen acid","Deoxyribonitric acid"], 0),
-                    ("The human heart has how many chambers?", ["2","3","4","5"], 2),
-                    ("Insulin is produced by", ["Liver","Pancreas","Kidney","Heart"], 1),
-                    ("The basic unit of nervous system is", ["Neuron","Nephron","Axon","Dendrite"], 0),
-                    ("Mendel is known as the father of", ["Biology","Genetics","Botany","Zoology"], 1),
-                    ("The process of cell division is called", ["Osmosis","Mitosis","Photosynthesis","Respiration"], 1),
-                    ("Which organ filters blood?", ["Heart","Liver","Kidney","Lung"], 2),
-                    ("The molecule that carries genetic information is", ["RNA","DNA","Protein","Lipid"], 1),
-                    ("Hemoglobin is found in", ["White blood cells","Red blood cells","Platelets","Plasma"], 1),
-                    ("Plants take in CO₂ through", ["Roots","Stem","Stomata","Flowers"], 2),
-                    ("The study of birds is called", ["Ornithology","Entomology","Herpetology","Ichthyology"], 0),
-                    ("Humans belong to the class", ["Reptilia","Aves","Mammalia","Amphibia"], 2),
-                    ("The smallest bone in human body is in the", ["Hand","Foot","Ear","Nose"], 2),
-                ],
-                'history': [
-                    ("Father of Indian Constitution", ["Gandhi","Nehru","Ambedkar","Patel"], 2),
-                    ("The Quit India Movement was launched in", ["1942","1947","1930","1920"], 0),
-                    ("The First World War started in", ["1914","1918","1939","1945"], 0),
-                    ("Who founded the Maurya Empire?", ["Ashoka","Chandragupta Maurya","Bindusara","Samudragupta"], 1),
-                    ("The French Revolution began in", ["1789","1776","1804","1815"], 0),
-                    ("The Battle of Waterloo was fought in", ["1805","1815","1825","1835"], 1),
-                    ("Who was the first Mughal emperor?", ["Akbar","Humayun","Babur","Aurangzeb"], 2),
-                    ("The Russian Revolution occurred in", ["1905","1917","1920","1930"], 1),
-                    ("The Treaty of Versailles ended which war?", ["World War I","World War II","Cold War","Vietnam War"], 0),
-                    ("The ancient civilization of Mesopotamia was in modern-day", ["Egypt","Iraq","India","China"], 1),
-                    ("Martin Luther King Jr. fought for", ["Women's rights","Civil rights","Labor rights","Animal rights"], 1),
-                    ("The Berlin Wall fell in", ["1985","1989","1991","1995"], 1),
-                    ("Who discovered America?", ["Magellan","Columbus","Vasco da Gama","Marco Polo"], 1),
-                    ("The Renaissance began in", ["France","England","Italy","Spain"], 2),
-                    ("The Industrial Revolution started in", ["France","Germany","Britain","USA"], 2),
-                ],
-                'economics': [
-                    ("Demand law states", ["Price↓ ⇒ Demand↓","Price↑ ⇒ Demand↑","Price↑ ⇒ Demand↓","No relation"], 2),
-                    ("GDP stands for", ["Gross Domestic Product","General Domestic Product","Gross Development Product","Global Domestic Product"], 0),
-                    ("A market with a single seller is called", ["Monopoly","Oligopoly","Perfect competition","Duopoly"], 0),
-                    ("Inflation means", ["Rise in prices","Fall in prices","Stable prices","Zero prices"], 0),
-                    ("The central bank of India is", ["SBI","RBI","ICICI","HDFC"], 1),
-                    ("Supply curve generally slopes", ["Upward","Downward","Horizontal","Vertical"], 0),
-                    ("Opportunity cost is", ["Monetary cost","Next best alternative","Total cost","Fixed cost"], 1),
-                    ("Fiscal policy deals with", ["Money supply","Government spending and tax","Interest rates","Exchange rates"], 1),
-                    ("Elasticity of demand measures", ["Quantity change","Price change","Responsiveness to price change","Income"], 2),
-                    ("An indirect tax is", ["Income tax","GST","Corporate tax","Wealth tax"], 1),
-                    ("In perfect competition, firms are", ["Price makers","Price takers","Price fixers","Price leaders"], 1),
-                    ("The WTO stands for", ["World Trade Organization","World Tax Organization","World Transfer Organization","None"], 0),
-                    ("Recession means", ["Economic growth","Economic decline","Stable economy","High inflation"], 1),
-                    ("Budget deficit occurs when", ["Revenue > Expenditure","Revenue < Expenditure","Revenue = Expenditure","None"], 1),
-                    ("Human capital refers to", ["Money","Skills and knowledge","Machines","Buildings"], 1),
-                ],
-                'accountancy': [
-                    ("Assets =", ["Liabilities","Capital","Liabilities + Capital","Income"], 2),
-                    ("Double entry system means", ["One entry","Two entries per transaction","Three entries","Multiple entries"], 1),
-                    ("Debit is on which side?", ["Left","Right","Top","Bottom"], 0),
-                    ("Depreciation is charged on", ["Current assets","Fixed assets","Liabilities","Capital"], 1),
-                    ("Which is a current asset?", ["Machinery","Building","Cash","Goodwill"], 2),
-                    ("The trial balance checks", ["Profit","Loss","Arithmetical accuracy","Cash balance"], 2),
-                    ("Revenue expenditure is", ["Capital nature","Recurring nature","One-time","None"], 1),
-                    ("Goodwill is", ["Tangible asset","Intangible asset","Liability","Expense"], 1),
-                    ("Closing stock appears in", ["Trading account","Profit & loss","Balance sheet","Both A and C"], 3),
-                    ("A journal is also called", ["Ledger","Book of original entry","Trial balance","Cash book"], 1),
-                    ("Accrual basis recognizes", ["Cash transactions","Credit transactions","When earned/incurred","When cash moves"], 2),
-                    ("Provision for bad debts is", ["Asset","Liability","Expense","Revenue"], 2),
-                    ("Retained earnings are", ["Distributed","Kept in business","Given to creditors","Paid as tax"], 1),
-                    ("The accounting equation is", ["A = L + E","A + L = E","A = L - E","A - L = E"], 0),
-                    ("Going concern concept assumes", ["Business will close","Business will continue","Business sold","None"], 1),
-                ],
-                'business': [
-                    ("Marketing mix includes", ["4Ps","5Ps","6Ps","7Ps"], 0),
-                    ("The 4Ps are Product, Price, Place and", ["People","Promotion","Packaging","Process"], 1),
-                    ("SWOT analysis includes Strengths, Weaknesses, Opportunities and", ["Threats","Tactics","Trends","Targets"], 0),
-                    ("A business plan is", ["Financial statement","Blueprint for business","Marketing tool","Legal document"], 1),
-                    ("Sole proprietorship is owned by", ["One person","Two persons","Many persons","Government"], 0),
-                    ("A stakeholder is", ["Owner","Interested party","Employee","Customer"], 1),
-                    ("CSR stands for", ["Corporate Social Responsibility","Corporate Sales Report","Company Security Rules","None"], 0),
-                    ("Break-even point is where", ["Profit = Loss","Revenue = Cost","Sales = Production","None"], 1),
-                    ("E-commerce means", ["Electronic commerce","Easy commerce","European commerce","None"], 0),
-                    ("Branding helps in", ["Cost reduction","Differentiation","Production","None"], 1),
-                    ("A franchise is", ["Full ownership","License to use brand","Partnership","Sole proprietorship"], 1),
-                    ("Market segmentation divides market by", ["Geography","Demography","Behavior","All of these"], 3),
-                    ("IPO stands for", ["Initial Public Offering","Internal Private Offering","International Public Offering","None"], 0),
-                    ("Working capital is", ["Fixed assets","Current assets - Current liabilities","Total assets","Capital + Reserves"], 1),
-                    ("Blue ocean strategy focuses on", ["Competition","Creating new demand","Cost cutting","Market share"], 1),
-                ],
-                'social': [
-                    ("GDP measures", ["Total income","Population","Exports","Inflation"], 0),
-                    ("Democracy means", ["Rule by one","Rule by few","Rule by people","Rule by military"], 2),
-                    ("The UN headquarters is in", ["Geneva","Paris","New York","London"], 2),
-                    ("Human rights are", ["Universal","Regional","National","Local"], 0),
-                    ("Sustainable development focuses on", ["Present needs","Future needs","Both present and future","None"], 2),
-                    ("Globalization means", ["Isolation","Integration of economies","Local trade","None"], 1),
-                    ("Gender equality means", ["Men superior","Women superior","Equal rights","None"], 2),
-                    ("The Right to Education is a", ["Fundamental right","Legal right","Directive principle","None"], 0),
-                    ("Climate change is caused primarily by", ["Deforestation","Greenhouse gases","Pollution","All of these"], 3),
-                    ("Poverty line measures", ["Minimum income","Maximum income","Average income","None"], 0),
-                    ("Urbanization means", ["Moving to cities","Moving to villages","No movement","Migration"], 0),
-                    ("A federal system has", ["One government","Two levels of government","Three levels","No government"], 1),
-                    ("The judiciary is", ["Legislative","Executive","Judicial","None"], 2),
-                    ("Secularism means", ["One religion","No religion","All religions equal","None"], 2),
-                    ("Public goods are", ["Rival and excludable","Non-rival and non-excludable","Rival only","Excludable only"], 1),
-                ],
-            }
-            for s in subjects:
-                for text_q, opts, ans in samples[s]:
-                    bank.append(mcq(qid, text_q, s, opts, ans)); qid += 1
-        rng.shuffle(bank)
-        return {"class": grade, "questions": bank}
+        n = max(1, min(n, 200))
+        seed = request.args.get('seed') or (str(grade) + ':' + str(stream or ''))
+        bank = question_index.get()
+        cached = not_modified('questions', bank.etag, grade, stream, n, seed,
+                              last_modified=bank.loaded_at, max_age=app.config['STATIC_CACHE_MAX_AGE'])
+        if cached:
+            return cached
+        return app.response_class(question_payload(bank, grade, stream, n, seed), mimetype='application/json')
+
+    # Career simulations with precompiled answer keys (see simulations.py)
+    simulation_registry = SimulationRegistry()
+    simulations_body = json_codec.dumps_bytes({"scenarios": simulation_registry.scenarios})
+    simulations_etag = hashlib.sha1(simulations_body).hexdigest()
+    simulations_loaded = datetime.now(timezone.utc)
 
-    # Career simulations: simple scenario-based tasks
     @app.get('/api/simulations')
+    @query_budget(1)
     def simulations():
         user = current_user()
         if not user:
             return jsonify({"error": "unauthorized"}), 401
-        scenarios = [
-            {
-                "id": "ux_wireframe",
-                "title": "Design a login screen wireframe",
-                "career": "UX Designer",
-                "questions": [
-                    {"id": "a", "text": "Best first step?", "options": ["Pick a font","Sketch user flow","Choose colors","Write code"], "answer": 1},
-                    {"id": "b", "text": "Essential element?", "options": ["Logo","Forgot Password","Ads","Auto-video"], "answer": 1},
-                ]
-            },
-            {
-                "id": "pm_prioritize",
-                "title": "Prioritize product backlog",
-                "career": "Product Manager",
-                "questions": [
-                    {"id": "a", "text": "Prioritization framework?", "options": ["RICE","RGB","CRUD","DNS"], "answer": 0},
-                    {"id": "b", "text": "Valuable first?", "options": ["Low impact/High effort","High impact/Low effort","Low/Low","High/High"], "answer": 1},
-                ]
-            },
-            {
-                "id": "ds_choose_model",
-                "title": "Choose a model for classification",
-                "career": "Data Scientist",
-                "questions": [
-                    {"id": "a", "text": "Imbalanced classes technique?", "options": ["SMOTE","RGB","CDN","CORS"], "answer": 0},
-                    {"id": "b", "text": "Baseline model?", "options": ["Random Forest","Neural Net","Logistic Regression","GAN"], "answer": 2},
-                ]
-            },
-        ]
-        return {"scenarios": scenarios}
+        cached = not_modified('simulations', simulations_etag, last_modified=simulations_loaded,
+                              max_age=app.config['STATIC_CACHE_MAX_AGE'])
+        if cached:
+            return cached
+        return app.response_class(simulations_body, mimetype='application/json')
 
     @app.post('/api/simulations/score')
+    @query_budget(1)
     def simulations_score():
         user = current_user()
         if not user:
             return jsonify({"error": "unauthorized"}), 401
         payload = request.json or {}
-        sim_id = payload.get('id')
-        answers = payload.get('answers', {})
-        sims = {s['id']: s for s in simulations().get_json()['scenarios']}
-        if sim_id not in sims:
+        sim = simulation_registry.get(payload.get('id'))
+        if sim is None:
             return jsonify({"error": "invalid simulation"}), 400
-        sim = sims[sim_id]
-        total = len(sim['questions'])
-        correct = 0
-        for q in sim['questions']:
-            sel = answers.get(q['id'])
-            if isinstance(sel, int) and sel == q['answer']:
-                correct += 1
-        score = int(round((correct/total)*100)) if total else 0
-        # Recommend roles weighted by simulation's primary career
-        recommendations = [
-            {"title": sim['career'], "suitability": min(100, score + 20)},
-        ]
-        return {"score": score, "recommendations": recommendations}
+        scores, _ = simulation_registry.grade(sim, [payload.get('answers', {})])
+        score = int(scores[0])
+        return {"score": score, "recommendations": simulation_registry.recommendations(sim, score)}
+
+    # Classroom sessions: grade a whole class in one call, one vectorized pass per scenario
+    @app.post('/api/simulations/score-batch')
+    @query_budget(1)
+    def simulations_score_batch():
+        user = current_user()
+        if not user or user.role != 'admin':
+            return jsonify({"error": "forbidden"}), 403
+        data = request.json or {}
+        submissions = data.get('submissions')
+        if not isinstance(submissions, list) or not submissions:
+            return jsonify({"error": "submissions required"}), 400
+        limit = app.config['BATCH_SUBMIT_MAX']
+        if len(submissions) > limit:
+            return jsonify({"error": "batch_too_large", "max": limit}), 413
+        # a top-level id applies to submissions that do not name their own
+        default_id = data.get('id')
+        groups = {}
+        errors = []
+        for i, sub in enumerate(submissions):
+            if not isinstance(sub, dict):
+                errors.append({"index": i, "error": "invalid entry"})
+                continue
+            sim = simulation_registry.get(sub.get('id', default_id))
+            if sim is None:
+                errors.append({"index": i, "error": "invalid simulation"})
+                continue
+            groups.setdefault(sim.id, (sim, []))[1].append(i)
+        results = [None] * len(submissions)
+        summary = {}
+        for sim, idx in groups.values():
+            scores, correct = simulation_registry.grade(sim, [submissions[i].get('answers', {}) for i in idx])
+            for i, score in zip(idx, scores.tolist()):
+                results[i] = {
+                    "index": i,
+                    "student": submissions[i].get('student'),
+                    "id": sim.id,
+                    "score": score,
+                    "recommendations": simulation_registry.recommendations(sim, score),
+                }
+            summary[sim.id] = {
+                "submissions": len(idx),
+                "average": round(float(scores.mean()), 2),
+                "question_accuracy": {q: round(float(r), 4) for q, r in zip(sim.question_ids, correct.mean(axis=0))},
+            }
+        return {"results": [r for r in results if r is not None], "summary": summary, "errors": errors}
 
     # Admin CRUD for tests and questions
+    def question_json(x):
+        return {
+            "id": x.id, "test_id": x.test_id, "text": x.text, "topic": x.topic, "correct": x.correct,
+            "level": x.level, "options": json.loads(x.options) if x.options else None, "answer": x.answer,
+        }
+
     @app.get('/api/admin/tests')
+    @query_budget(2)
     def admin_tests_list():
         user = current_user()
         if not user or user.role != 'admin':
@@ -1352,6 +1094,7 @@ def create_app():
         return [{"id": t.id, "name": t.name, "created_at": t.created_at.isoformat()} for t in tests]
 
     @app.post('/api/admin/tests')
+    @query_budget(3)
     def admin_tests_add():
         user = current_user()
         if not user or user.role != 'admin':
@@ -1366,6 +1109,7 @@ def create_app():
         return {"id": t.id, "name": t.name, "created_at": t.created_at.isoformat()}
 
     @app.delete('/api/admin/tests/<int:tid>')
+    @query_budget(2)
     def admin_tests_delete(tid):
         user = current_user()
         if not user or user.role != 'admin':
@@ -1375,9 +1119,11 @@ def create_app():
             return jsonify({"error": "not found"}), 404
         db.session.delete(t)
         db.session.commit()
+        question_index.mark_dirty()
         return {"message": "deleted"}
 
     @app.get('/api/admin/questions')
+    @query_budget(2)
     def admin_questions_list():
         user = current_user()
         if not user or user.role != 'admin':
@@ -1387,9 +1133,10 @@ def create_app():
         if test_id:
             q = q.filter_by(test_id=test_id)
         questions = q.order_by(AptitudeQuestion.id.desc()).all()
-        return [{"id": x.id, "test_id": x.test_id, "text": x.text, "topic": x.topic, "correct": x.correct} for x in questions]
+        return [question_json(x) for x in questions]
 
     @app.post('/api/admin/questions')
+    @query_budget(3)
     def admin_questions_add():
         user = current_user()
         if not user or user.role != 'admin':
@@ -1402,11 +1149,46 @@ def create_app():
         if not test_id or not textv:
             return jsonify({"error": "test_id and text required"}), 400
         q = AptitudeQuestion(test_id=test_id, text=textv, topic=topic, correct=correct)
+        # Optional multiple-choice fields make the question servable by /api/questions
+        if data.get('options') is not None:
+            try:
+                mcq = normalize_question({**data, "subject": topic})
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            q.topic, q.level, q.answer = mcq['subject'], mcq['level'], mcq['answer']
+            q.options = json.dumps(mcq['options'])
+            q.correct = correct or mcq['options'][mcq['answer']][:40]
         db.session.add(q)
         db.session.commit()
-        return {"id": q.id, "test_id": q.test_id, "text": q.text, "topic": q.topic, "correct": q.correct}
+        question_index.mark_dirty()
+        return question_json(q)
+
+    # Bulk import from an uploaded CSV/JSONL file, streamed in batches
+    @app.post('/api/admin/questions/import')
+    @query_budget(3)
+    def admin_questions_import():
+        user = current_user()
+        if not user or user.role != 'admin':
+            return jsonify({"error": "forbidden"}), 403
+        upload = request.files.get('file')
+        test_id = request.form.get('test_id', type=int)
+        if not upload or not test_id:
+            return jsonify({"error": "file and test_id required"}), 400
+        if not AptitudeTest.query.get(test_id):
+            return jsonify({"error": "test not found"}), 404
+        fmt = request.form.get('format') or ('jsonl' if (upload.filename or '').endswith(('.jsonl', '.ndjson')) else 'csv')
+        try:
+            stream = io.TextIOWrapper(upload.stream, encoding='utf-8', newline='')
+            inserted, errors = import_questions(read_questions(stream, fmt), test_id, app.config['QUESTION_IMPORT_BATCH_SIZE'])
+        except (ValueError, UnicodeDecodeError, csv.Error) as e:
+            db.session.rollback()
+            return jsonify({"error": "import_failed", "detail": str(e)}), 400
+        finally:
+            question_index.mark_dirty()
+        return {"inserted": inserted, "errors": errors[:100], "error_count": len(errors)}
 
     @app.delete('/api/admin/questions/<int:qid>')
+    @query_budget(2)
     def admin_questions_delete(qid):
         user = current_user()
         if not user or user.role != 'admin':
@@ -1416,10 +1198,12 @@ def create_app():
             return jsonify({"error": "not found"}), 404
         db.session.delete(q)
         db.session.commit()
+        question_index.mark_dirty()
         return {"message": "deleted"}
 
     # DANGEROUS: wipe all users and user-owned data. Admin-only, requires confirm token.
     @app.post('/api/admin/wipe-all')
+    @query_budget(6)
     def admin_wipe_all():
         user = current_user()
         if not user or user.role != 'admin':
@@ -1427,26 +1211,173 @@ def create_app():
         data = request.json or {}
         if data.get('confirm') != 'WIPE_CONFIRM':
             return jsonify({"error": "confirmation_required", "hint": "send {confirm: 'WIPE_CONFIRM'}"}), 400
-        # Delete in order of FKs to users
+        return queue_wipe(user, 'all', None, bool(data.get('archive')))
+
+    @app.post('/api/admin/wipe-jobs')
+    @query_budget(6)
+    def create_wipe_job():
+        user = current_user()
+        if not user or user.role != 'admin':
+            return jsonify({"error": "forbidden"}), 403
+        data = request.json or {}
+        if data.get('confirm') != 'WIPE_CONFIRM':
+            return jsonify({"error": "confirmation_required", "hint": "send {confirm: 'WIPE_CONFIRM'}"}), 400
+        scope = data.get('scope', 'all')
+        value = data.get('value')
+        if scope not in WIPE_SCOPES:
+            return jsonify({"error": "invalid scope", "scopes": list(WIPE_SCOPES)}), 400
+        if scope != 'all' and not (isinstance(value, str) and value.strip()):
+            return jsonify({"error": "value required", "hint": "class name or school email domain"}), 400
+        return queue_wipe(user, scope, value.strip() if scope != 'all' else None, bool(data.get('archive')))
+
+    @app.get('/api/admin/wipe-jobs')
+    @query_budget(2)
+    def list_wipe_jobs():
+        user = current_user()
+        if not user or user.role != 'admin':
+            return jsonify({"error": "forbidden"}), 403
+        jobs = WipeJob.query.order_by(WipeJob.id.desc()).limit(50).all()
+        return {"jobs": [job_json(j) for j in jobs]}
+
+    @app.get('/api/admin/wipe-jobs/<int:job_id>')
+    @query_budget(2)
+    def get_wipe_job(job_id):
+        user = current_user()
+        if not user or user.role != 'admin':
+            return jsonify({"error": "forbidden"}), 403
+        job = db.session.get(WipeJob, job_id)
+        if not job:
+            return jsonify({"error": "not found"}), 404
+        return job_json(job)
+
+    @app.post('/api/admin/wipe-jobs/<int:job_id>/resume')
+    @query_budget(4)
+    def resume_wipe_job(job_id):
+        user = current_user()
+        if not user or user.role != 'admin':
+            return jsonify({"error": "forbidden"}), 403
+        job = db.session.get(WipeJob, job_id)
+        if not job:
+            return jsonify({"error": "not found"}), 404
+        if job.status == 'done' or wipe_runner.is_active(job) or not wipe_runner.claim(job):
+            return jsonify({"error": "not_resumable", "job": job_json(job)}), 409
+        wipe_runner.start(job.id)
+        return jsonify({"job": job_json(job), "status_url": f"/api/admin/wipe-jobs/{job.id}"}), 202
+
+    @app.cli.command('migrate')
+    @click.option('--status', is_flag=True, help='Only print the current and latest schema version.')
+    def migrate_command(status):
+        """Apply pending schema migrations (see migrations.py)."""
+        if not status:
+            run_migrations(echo=click.echo)
+        click.echo(f"schema at version {current_version()} of {latest_version()}")
+
+    @app.cli.command('wipe')
+    @click.option('--scope', type=click.Choice(WIPE_SCOPES), default='all')
+    @click.option('--value', help='Class name for --scope class, email domain for --scope school.')
+    @click.option('--archive', is_flag=True, help='Write deleted rows to WIPE_ARCHIVE_DIR first.')
+    @click.option('--resume', 'resume_id', type=int, help='Continue an interrupted job instead of starting one.')
+    def wipe_command(scope, value, archive, resume_id):
+        """Delete user data in batches, in the foreground."""
+        if resume_id is None:
+            if scope != 'all' and not value:
+                raise click.BadParameter('required unless --scope all', param_hint='--value')
+            job = wipe_runner.create(scope, value, archive)
+            if job is None:
+                raise click.ClickException(f"wipe job {wipe_runner.holder().id} is active")
+            resume_id = job.id
+        else:
+            job = db.session.get(WipeJob, resume_id)
+            if job is None:
+                raise click.ClickException(f"no wipe job {resume_id}")
+            if job.status == 'done' or wipe_runner.is_active(job) or not wipe_runner.claim(job):
+                raise click.ClickException(f"wipe job {resume_id} is not resumable ({job.status})")
+        wipe_runner.run(resume_id)
+        job = db.session.get(WipeJob, resume_id)
+        click.echo(json.dumps(job_json(job), indent=2))
+        if job.status != 'done':
+            raise click.ClickException(job.error or job.status)
+
+    @app.cli.command('process-submissions')
+    def process_submissions_command():
+        """Run the post-submit pipeline for every result still pending."""
+        done = 0
+        while True:
+            ids = post_submit.pending()
+            if not ids:
+                break
+            done += sum(1 for rid in ids if post_submit.process(rid))
+        click.echo(f"processed {done} results")
+
+    @app.cli.command('backfill-scores')
+    def backfill_scores_command():
+        """Fill the typed subject columns of results stored without them."""
+        click.echo(f"scored {backfill_scores(engine)} results")
+
+    @app.cli.command('train-model')
+    @click.option('--min-samples', type=int, default=None, help='Refuse to train on fewer bookmarks than this.')
+    @click.option('--C', 'c', type=float, default=1.0, help='Inverse regularization strength.')
+    def train_model_command(min_samples, c):
+        """Fit the career-affinity model on test results and bookmarks."""
+        # each bookmark is one sample: the student's latest subject vector -> title
+        latest = (db.session.query(TestResult.user_id, db.func.max(TestResult.id).label('rid'))
+                  .group_by(TestResult.user_id).subquery())
+        rows = (db.session.query(*SUBJECT_COLUMNS.values(), CareerBookmark.title)
+                .join(latest, TestResult.id == latest.c.rid)
+                .join(CareerBookmark, CareerBookmark.user_id == latest.c.user_id)
+                .execution_options(yield_per=2000))
+        breakdowns, titles = [], []
+        for row in rows:
+            breakdowns.append(observed_from_row(row))
+            titles.append(row.title)
+        min_samples = min_samples or app.config['MODEL_MIN_SAMPLES']
+        if len(titles) < min_samples or len(set(titles)) < 2:
+            raise click.ClickException(f"not enough data: {len(titles)} samples, {len(set(titles))} careers")
+        params = career_model.train(engine.subject_matrix(breakdowns), titles, C=c)
+        version = career_model.save(params, app.config['MODEL_DIR'])
+        click.echo(f"saved career model {version} ({len(titles)} samples, {len(params['classes'])} careers)")
+
+    @app.cli.command('import-questions')
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False, allow_dash=True))
+    @click.option('--test-id', type=int, help='Aptitude test to attach questions to (default: first test).')
+    @click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), help='Defaults from the file extension.')
+    @click.option('--batch-size', type=int, default=None)
+    def import_questions_command(path, test_id, fmt, batch_size):
+        """Bulk-load questions from a CSV or JSONL file ('-' reads stdin)."""
+        fmt = fmt or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+        test_id = test_id or default_test().id
+        src = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8', newline='') if path == '-' else open(path, encoding='utf-8', newline='')
         try:
-            Recommendation.query.delete()
-            TestResult.query.delete()
-            LearningGoal.query.delete()
-            PortfolioItem.query.delete()
-            CareerBookmark.query.delete()
-            StudentProfile.query.delete()
-            # Finally users
-            User.query.delete()
-            db.session.commit()
-            return {"message": "all users and related data deleted"}
-        except Exception as e:
-            db.session.rollback()
-            return jsonify({"error": "wipe_failed", "detail": str(e)}), 500
+            with src as fh:
+                inserted, errors = import_questions(read_questions(fh, fmt), test_id, batch_size or app.config['QUESTION_IMPORT_BATCH_SIZE'])
+        except (ValueError, UnicodeDecodeError, csv.Error) as e:
+            raise click.ClickException(f"import failed, nothing inserted: {e}")
+        for e in errors[:20]:
+            click.echo(f"record {e['record']}: {e['error']}", err=True)
+        click.echo(f"inserted {inserted} questions ({len(errors)} rejected)")
 
     return app
 
+
+def warm_up(app):
+    """Load what create_app() leaves for first use.
+
+    gunicorn.conf.py calls this in the master before forking, so workers
+    start with it loaded and share the pages.
+    """
+    with app.app_context():
+        app.extensions['question_index'].get()
+        app.extensions['career_model'].get()
+        engine.profile({})
+        for bind in db.engines.values():
+            bind.dispose()
+    import analytics
+    analytics.pd.DataFrame  # runs the deferred pandas import
+    if firebase_enabled:
+        import firebase_admin.auth  # noqa: F401
+
 if __name__ == '__main__':
     app = create_app()
     with app.app_context():
-        db.create_all()
+        run_migrations()
     app.run(host='0.0.0.0', port=5000, debug=True)
@@ -0,0 +1,232 @@
+"""ASGI entry point: async exam-session endpoints in front of the Flask app.
+
+    uvicorn --factory asgi:create_asgi_app --workers 4
+    gunicorn -k uvicorn.workers.UvicornWorker 'asgi:create_asgi_app()'
+
+Every student calls GET /api/questions when an exam starts and POST
+/api/aptitude/submit when it ends. These two routes are served natively on
+the event loop:
+- database access goes through SQLAlchemy's asyncio engine (aiomysql, or
+  aiosqlite in development);
+- Firebase token verification runs on a small executor;
+- the post-submit queue is handed the result id exactly as in WSGI mode.
+
+A process can therefore hold many in-flight exam requests without a
+thread each. Every other route is the unchanged Flask app, run on
+asgiref's thread pool, and shares the same caches, limiter, replica pins
+and background queues. Responses, ETags and caches are identical in both
+modes.
+
+Authentication, rate limiting and conditional GET use the same helpers
+as the Flask views (auth_cache.py, rate_limit.py, conditional.py).
+"""
+import asyncio
+import contextlib
+import functools
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from asgiref.wsgi import WsgiToAsgi
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import create_async_engine
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import Response
+from starlette.routing import Route
+
+import app as wsgi
+import json_codec
+from auth_cache import AuthUser, bearer_token, cached_user, demo_auth, demo_identity, remember_claims, token_key
+from conditional import etag_for, is_fresh, validator_headers
+from db_routing import PIN_HEADER
+from config import engine_options
+from models import User, AptitudeTest, TestResult
+from rate_limit import throttle
+from subject_scores import score_fields
+
+# sync driver -> asyncio driver for the same database
+ASYNC_DRIVERS = {
+    'mysql': 'mysql+aiomysql',
+    'mysql+pymysql': 'mysql+aiomysql',
+    'sqlite': 'sqlite+aiosqlite',
+    'postgresql': 'postgresql+asyncpg',
+    'postgresql+psycopg2': 'postgresql+asyncpg',
+}
+
+
+def async_url(uri: str) -> str:
+    scheme, sep, rest = uri.partition('://')
+    return ASYNC_DRIVERS.get(scheme, scheme) + sep + rest
+
+
+def create_asgi_app(flask_app=None):
+    flask_app = flask_app or wsgi.create_app()
+    config = flask_app.config
+    ext = flask_app.extensions
+    token_cache, user_cache = ext['token_cache'], ext['user_cache']
+    profile_cache, post_submit = ext['profile_cache'], ext['post_submit']
+    question_index, question_payload = ext['question_index'], ext['question_payload']
+    limiter, replica_router = ext['rate_limiter'], ext['replica_router']
+    wipe_watch = ext['wipe_watch']
+    metrics = ext.get('metrics')
+
+    url = config['ASYNC_DATABASE_URI'] or async_url(config['SQLALCHEMY_DATABASE_URI'])
+    db_engine = create_async_engine(url, **engine_options(url))
+    executor = ThreadPoolExecutor(config['ASGI_EXECUTOR_THREADS'], thread_name_prefix='asgi-sync')
+    if metrics is not None:
+        metrics.instrument_engine(db_engine.sync_engine)
+
+    def instrumented(handler):
+        """Record a native route under the same endpoint name as its Flask view."""
+        if metrics is None:
+            return handler
+
+        @functools.wraps(handler)
+        async def wrapper(request):
+            token, t0, status = metrics.begin(handler.__name__), time.perf_counter(), 500
+            try:
+                resp = await handler(request)
+                status = resp.status_code
+                return resp
+            finally:
+                metrics.end(token, request.method, status, time.perf_counter() - t0)
+        return wrapper
+
+    async def run_sync(fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(executor, functools.partial(fn, *args))
+
+    def in_app_context(fn, *args):
+        with flask_app.app_context():
+            return fn(*args)
+
+    def json_response(obj, status=200, headers=None) -> Response:
+        # same encoder, hence the same bytes, as the Flask views
+        return Response(json_codec.dumps_bytes(obj) + b'\n', status_code=status, headers=headers, media_type='application/json')
+
+    def rate_limited(request):
+        limited = throttle(limiter, request.client.host if request.client else None)
+        if limited is None:
+            return None
+        body, headers = limited
+        return json_response(body, 429, headers)
+
+    async def load_user(uid, email, role=None):
+        """Async twin of load_user() in app.py, sharing its cache."""
+        wipe_watch.ensure_running()
+        cached = cached_user(user_cache, uid, role)
+        if cached is not None:
+            return cached
+        by_uid = select(User.id, User.uid, User.email, User.role).where(User.uid == uid)
+        async with db_engine.connect() as conn:
+            row = (await conn.execute(by_uid)).first()
+        if row is None:
+            try:
+                async with db_engine.begin() as conn:
+                    await conn.execute(insert(User).values(uid=uid, email=email, role=role or 'student'))
+            except IntegrityError:
+                pass  # created by a concurrent first request
+            async with db_engine.connect() as conn:
+                row = (await conn.execute(by_uid)).first()
+        elif role is not None and row.role != role:
+            async with db_engine.begin() as conn:
+                await conn.execute(User.__table__.update().where(User.__table__.c.id == row.id).values(role=role))
+        snapshot = AuthUser(row.id, row.uid, row.email, role or row.role)
+        user_cache.set(uid, snapshot)
+        return snapshot
+
+    async def current_user(request):
+        if demo_auth(wsgi.firebase_enabled):
+            return await load_user(*demo_identity(request.headers))
+        token = bearer_token(request.headers)
+        if not token:
+            return None
+        try:
+            key = token_key(token)
+            decoded = token_cache.get(key)
+            if decoded is None:
+                decoded = remember_claims(token_cache, key, await run_sync(wsgi.verify_id_token, token))
+            return await load_user(decoded['uid'], decoded.get('email', ''))
+        except Exception:
+            return None
+
+    async def default_test_id() -> int:
+        first = select(AptitudeTest.id).order_by(AptitudeTest.id.asc()).limit(1)
+        async with db_engine.begin() as conn:
+            test_id = (await conn.execute(first)).scalar()
+            if test_id is None:
+                test_id = (await conn.execute(insert(AptitudeTest).values(name='General Aptitude'))).inserted_primary_key[0]
+        return test_id
+
+    async def questions(request):
+        limited = rate_limited(request)
+        if limited:
+            return limited
+        user = await current_user(request)
+        if not user:
+            return json_response({"error": "unauthorized"}, 401)
+        args = request.query_params
+        grade = args.get('class', '10')
+        stream = args.get('stream')
+        try:
+            n = int(args.get('n', '50'))
+        except Exception:
+            n = 50
+        n = max(1, min(n, 200))
+        seed = args.get('seed') or (str(grade) + ':' + str(stream or ''))
+        # the index may probe the question table; keep that off the loop
+        bank = await run_sync(in_app_context, question_index.get)
+        tag = etag_for('questions', bank.etag, grade, stream, n, seed)
+        headers = validator_headers(tag, bank.loaded_at, config['STATIC_CACHE_MAX_AGE'])
+        if is_fresh(tag, bank.loaded_at, request.headers.get('If-None-Match'), request.headers.get('If-Modified-Since')):
+            return Response(status_code=304, headers=headers)
+        return Response(question_payload(bank, grade, stream, n, seed), headers=headers, media_type='application/json')
+
+    async def submit_aptitude(request):
+        limited = rate_limited(request)
+        if limited:
+            return limited
+        user = await current_user(request)
+        if not user:
+            return json_response({"error": "unauthorized"}, 401)
+        try:
+            data = await request.json()
+        except ValueError:
+            return json_response({"error": "invalid JSON"}, 400)
+        score, breakdown = wsgi.parse_submission(data if isinstance(data, dict) else {})
+        test_id = await default_test_id()
+        row = dict(user_id=user.id, test_id=test_id, score=score, breakdown=json.dumps(breakdown), created_at=datetime.utcnow(),
+                   **score_fields(wsgi.engine, [breakdown])[0])
+        async with db_engine.begin() as conn:
+            result_id = (await conn.execute(insert(TestResult).values(**row))).inserted_primary_key[0]
+        profile_cache.invalidate(user.id)
+        await run_sync(in_app_context, post_submit.submit, result_id)
+        resp = json_response({"score": score, "breakdown": breakdown, "result_id": result_id})
+        replica_router.pin(user.id, resp)
+        return resp
+
+    @contextlib.asynccontextmanager
+    async def lifespan(_):
+        yield
+        await db_engine.dispose()
+        executor.shutdown(wait=False)
+
+    cors = Middleware(CORSMiddleware, allow_origins=config['CORS_ORIGINS'].split(','), allow_methods=['*'], allow_headers=['*'],
+                      expose_headers=[PIN_HEADER])
+    native = Starlette(routes=[
+        Route('/api/questions', instrumented(questions), methods=['GET']),
+        Route('/api/aptitude/submit', instrumented(submit_aptitude), methods=['POST']),
+    ], middleware=[cors], lifespan=lifespan)
+    native_paths = {r.path for r in native.routes}
+    fallback = WsgiToAsgi(flask_app)
+
+    async def application(scope, receive, send):
+        if scope['type'] == 'lifespan' or scope.get('path') in native_paths:
+            await native(scope, receive, send)
+        else:
+            await fallback(scope, receive, send)
+
+    return application
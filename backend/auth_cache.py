@@ -0,0 +1,104 @@
+"""TTL caches for verified tokens and authenticated users.
+
+current_user() runs on every request; these caches let repeat callers skip
+Firebase verification and the users lookup until the entry expires. The
+helpers below are the parts of current_user() that app.py and asgi.py
+share; each keeps only its own database access.
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class AuthUser:
+    """Read-only snapshot of a User row, safe to share across requests."""
+    id: int
+    uid: str
+    email: str
+    role: str
+
+    @classmethod
+    def from_model(cls, user) -> "AuthUser":
+        return cls(user.id, user.uid, user.email, user.role)
+
+
+class TTLCache:
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # key -> (expires_at, value), oldest insertion first
+        self._data = OrderedDict()
+
+    def get(self, key) -> Optional[Any]:
+        now = time.monotonic()
+        with self._lock:
+            hit = self._data.get(key)
+            if hit is None:
+                return None
+            if hit[0] <= now:
+                del self._data[key]
+                return None
+            return hit[1]
+
+    def set(self, key, value, ttl: Optional[float] = None):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = (now + ttl, value)
+            # expired entries go lazily on get(); the cap drops oldest insertions
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+def demo_auth(firebase_enabled: bool) -> bool:
+    """Development fallback: trust the demo headers if Firebase is not
+    configured OR ENV != production."""
+    return (not firebase_enabled) or os.environ.get('ENV', 'development') != 'production'
+
+
+def demo_identity(headers) -> Tuple[str, str, str]:
+    """(uid, email, role) claimed by the X-Demo-* headers."""
+    role = 'admin' if headers.get('X-Admin') == 'true' else 'student'
+    return headers.get('X-Demo-UID', 'demo-user'), headers.get('X-Demo-Email', 'demo@example.com'), role
+
+
+def bearer_token(headers) -> str:
+    return headers.get('Authorization', '').replace('Bearer ', '')
+
+
+def token_key(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def remember_claims(token_cache: TTLCache, key: str, claims: dict) -> dict:
+    # never trust a cached token past its own expiry
+    token_cache.set(key, claims, ttl=claims.get('exp', 0) - time.time())
+    return claims
+
+
+def cached_user(user_cache: TTLCache, uid: str, role: Optional[str]) -> Optional[AuthUser]:
+    """The cached snapshot for ``uid``, unless a different role is asked for."""
+    cached = user_cache.get(uid)
+    if cached is not None and (role is None or cached.role == role):
+        return cached
+    return None
@@ -0,0 +1,388 @@
+"""Endpoint benchmark against a local SQLite stand-in.
+
+    python benchmark.py --users 2000 --concurrency 16 --requests 200 --out bench.json
+    python benchmark.py --baseline bench.json --out bench-new.json   # exits 1 on regression
+
+Builds create_app() on a fresh SQLite file and seeds it directly with
+synthetic students: a profile, test results, recommendations, portfolio
+items, bookmarks and goals each, plus report rollups. Every route in the
+URL map is then driven on its own by --concurrency threads for --requests
+calls, spread across random students (admin routes use one admin).
+
+For each endpoint the JSON report holds:
+- p50/p95/p99/mean latency in ms and throughput in req/s;
+- the status codes seen;
+- queries and DB time per request, taken from the app's /metrics
+  counters (see metrics.py).
+
+Routes without a scenario, and the destructive ones in SKIP, are listed in
+the report and never called.
+
+With --baseline, endpoints whose p95 grew by more than --tolerance (and by
+more than --min-delta-ms), or that issue more queries per request than
+before (beyond --query-slack), are listed under "regressions" and the
+exit status is 1.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+# routes that delete data they did not create
+SKIP = {
+    'admin_wipe_all': 'deletes every user',
+    'clear_all_data': 'deletes every user',
+    'static': 'no static files are served',
+}
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    p.add_argument('--users', type=int, default=500, help='synthetic students to seed')
+    p.add_argument('--results', type=int, default=5, help='test results per student')
+    p.add_argument('--portfolio', type=int, default=4, help='portfolio items per student')
+    p.add_argument('--bookmarks', type=int, default=3, help='career bookmarks per student')
+    p.add_argument('--goals', type=int, default=3, help='learning goals per student')
+    p.add_argument('--concurrency', type=int, default=8)
+    p.add_argument('--requests', type=int, default=100, help='measured calls per route')
+    p.add_argument('--warmup', type=int, default=5, help='unmeasured calls per route first')
+    p.add_argument('--routes', help='comma-separated endpoint names to run (default: all)')
+    p.add_argument('--db', help='SQLite file to build (default: a temporary file)')
+    p.add_argument('--seed', type=int, default=1)
+    p.add_argument('--out', help='write the JSON report here (default: stdout)')
+    p.add_argument('--baseline', help='earlier report to compare against')
+    p.add_argument('--tolerance', type=float, default=0.25, help='allowed relative p95 growth')
+    p.add_argument('--min-delta-ms', type=float, default=2.0, help='ignore p95 changes smaller than this')
+    p.add_argument('--query-slack', type=float, default=0.5,
+                   help='allowed growth in queries per request (cache hits vary between runs)')
+    return p.parse_args(argv)
+
+
+def configure_env(args) -> str:
+    """Point Config at the stand-in database; must run before app is imported."""
+    path = args.db or os.path.join(tempfile.mkdtemp(prefix='nextstep-bench-'), 'bench.sqlite')
+    if os.path.exists(path):
+        os.remove(path)
+    os.environ.update(
+        SQLALCHEMY_DATABASE_URI='sqlite:///' + os.path.abspath(path),
+        AUTO_MIGRATE='1',
+        ENV='development',
+        RATE_LIMIT_BACKEND='off',
+        METRICS_ENABLED='1',
+        WIPE_ARCHIVE_DIR=os.path.join(os.path.dirname(os.path.abspath(path)), 'archive'),
+    )
+    return path
+
+
+def seed(app, args, rng, first=0):
+    """Bulk-insert students bench-<first>.. onwards; returns the ids the scenarios draw from.
+
+    The admin is created with the first batch, so later calls (first > 0)
+    only add students.
+    """
+    from sqlalchemy import insert
+    from app import engine
+    from ml.engine import SUBJECTS
+    from models import (db, User, StudentProfile, TestResult, Recommendation, PortfolioItem, CareerBookmark,
+                        LearningGoal, AptitudeTest)
+    from reports import backfill
+    from subject_scores import score_fields
+
+    titles = [c.title for c in engine.catalog.careers]
+    now = datetime.utcnow()
+    batch = range(first, first + args.users)
+    with app.app_context():
+        test_id = db.session.query(AptitudeTest.id).order_by(AptitudeTest.id).limit(1).scalar()
+        db.session.execute(insert(User), [
+            {"uid": f"bench-{i}", "email": f"bench-{i}@school{i % 20}.edu", "role": "student"} for i in batch
+        ] + ([{"uid": "bench-admin", "email": "admin@bench.edu", "role": "admin"}] if first == 0 else []))
+        ids = dict(db.session.query(User.uid, User.id))
+        students = [ids[f"bench-{i}"] for i in batch]
+        db.session.execute(insert(StudentProfile), [
+            {"user_id": uid, "first_name": "Bench", "last_name": str(uid), "student_class": str(rng.choice((9, 10, 11, 12)))}
+            for uid in students
+        ])
+        results, latest = [], {}
+        for uid in students:
+            for k in range(args.results):
+                breakdown = {s: rng.randint(20, 100) for s in rng.sample(SUBJECTS, 5)}
+                ts = now - timedelta(days=rng.randint(0, 300), minutes=k)
+                results.append({"user_id": uid, "test_id": test_id, "score": rng.randint(20, 100),
+                                "breakdown": json.dumps(breakdown), "created_at": ts, "processed_at": ts})
+                latest[uid] = breakdown
+        for row, fields in zip(results, score_fields(engine, [json.loads(r["breakdown"]) for r in results])):
+            row.update(fields)
+        db.session.execute(insert(TestResult), results)
+        top = engine.recommend_many([latest[uid] for uid in students], k=6)
+        db.session.execute(insert(Recommendation), [
+            {"user_id": uid, "title": r.title, "suitability": int(r.suitability), "details": r.details, "is_active": True}
+            for uid, recs in zip(students, top) for r in recs
+        ])
+        db.session.execute(insert(PortfolioItem), [
+            {"user_id": uid, "name": f"Project {k}", "url": f"https://example.com/{uid}/{k}", "description": "bench",
+             "tags": "bench", "created_at": now - timedelta(days=rng.randint(0, 300))}
+            for uid in students for k in range(args.portfolio)
+        ])
+        db.session.execute(insert(CareerBookmark), [
+            {"user_id": uid, "title": t} for uid in students for t in rng.sample(titles, min(args.bookmarks, len(titles)))
+        ])
+        db.session.execute(insert(LearningGoal), [
+            {"user_id": uid, "skill": "Python", "task": f"Week {k} exercises", "week": k + 1} for uid in students for k in range(args.goals)
+        ])
+        db.session.commit()
+        backfill()
+        pool = {
+            "students": students,
+            "uids": {v: k for k, v in ids.items()},
+            "portfolio": [tuple(r) for r in db.session.query(PortfolioItem.user_id, PortfolioItem.id)
+                          .filter(PortfolioItem.user_id.between(min(students), max(students)))],
+            "goals": [tuple(r) for r in db.session.query(LearningGoal.user_id, LearningGoal.id)
+                      .filter(LearningGoal.user_id.between(min(students), max(students)))],
+            "test_id": test_id,
+        }
+    return pool
+
+
+class Session:
+    """One scenario run: picks a student and issues requests as them."""
+
+    def __init__(self, client, pool, rng, admin=False):
+        self.client = client
+        self.pool = pool
+        self.rng = rng
+        self.user_id = rng.choice(pool["students"])
+        uid = 'bench-admin' if admin else pool["uids"][self.user_id]
+        self.headers = {'X-Demo-UID': uid, 'X-Demo-Email': f'{uid}@bench.edu'}
+        if admin:
+            self.headers['X-Admin'] = 'true'
+        self.measured = None
+
+    def call(self, method, path, measure=True, **kwargs):
+        t0 = time.perf_counter()
+        resp = self.client.open(path, method=method, headers=self.headers, **kwargs)
+        if measure:
+            self.measured = (time.perf_counter() - t0, resp.status_code)
+        return resp
+
+
+def _submit_body(rng):
+    return {"breakdown": {"maths": rng.randint(40, 100), "physics": rng.randint(40, 100), "english": rng.randint(40, 100)},
+            "score": rng.randint(40, 100)}
+
+
+def _take(items, rng):
+    """Remove and return a random seeded row, or None once they run out."""
+    with _take.lock:
+        if not items:
+            return None
+        i = rng.randrange(len(items))
+        items[i], items[-1] = items[-1], items[i]
+        return items.pop()
+
+
+_take.lock = threading.Lock()
+
+
+def _csv_upload(test_id):
+    body = "level,subject,text,options,answer\nsecondary,maths,Bench question?,a|b|c,0\n"
+    return {"data": {"file": (io.BytesIO(body.encode()), "bench.csv"), "test_id": str(test_id)},
+            "content_type": "multipart/form-data"}
+
+
+def _delete_goal(s):
+    row = _take(s.pool["goals"], s.rng)
+    if row is not None:
+        s.headers['X-Demo-UID'] = s.pool["uids"][row[0]]
+    s.call('DELETE', f'/api/goals/{row[1] if row else 0}')
+
+
+def _update_portfolio(s):
+    uid, pid = s.rng.choice(s.pool["portfolio"])
+    s.headers['X-Demo-UID'] = s.pool["uids"][uid]
+    s.call('PATCH', f'/api/portfolio/{pid}', json={"description": "updated by bench"})
+
+
+def _wipe_job(s):
+    """A finished job: it targets a class no student is in, so it deletes nothing."""
+    job = s.call('POST', '/api/admin/wipe-jobs', measure=False,
+                 json={"scope": "class", "value": "bench-none", "confirm": "WIPE_CONFIRM"}).get_json()["job"]
+    s.client.application.extensions['wipe_runner'].join()
+    return job["id"]
+
+
+# endpoint -> (admin?, scenario); a scenario measures exactly one call
+SCENARIOS = {
+    'health': (False, lambda s: s.call('GET', '/health')),
+    'metrics_export': (False, lambda s: s.call('GET', '/metrics')),
+    'register_profile': (False, lambda s: s.call('POST', '/api/register', json={"first_name": "Bench", "last_name": "User", "student_class": "10"})),
+    'get_profile': (False, lambda s: s.call('GET', '/api/profile')),
+    'bookmarks_list': (False, lambda s: s.call('GET', '/api/bookmarks')),
+    'bookmarks_add': (False, lambda s: s.call('POST', '/api/bookmarks', json={"title": "Data Scientist"})),
+    'bookmarks_delete': (False, lambda s: s.call('DELETE', f"/api/bookmarks/{s.call('POST', '/api/bookmarks', measure=False, json={'title': 'Doctor (MBBS)'}).get_json()['id']}")),
+    'reports': (False, lambda s: s.call('GET', '/api/reports?bucket=' + s.rng.choice(('day', 'week', 'month')))),
+    'dashboard': (False, lambda s: s.call('GET', '/api/dashboard')),
+    'skill_gap': (False, lambda s: s.call('GET', '/api/skill-gap')),
+    'careers': (False, lambda s: s.call('GET', '/api/careers')),
+    'trends': (False, lambda s: s.call('GET', '/api/trends')),
+    'questions': (False, lambda s: s.call('GET', f"/api/questions?class={s.rng.choice(('9', '10', '11', '12'))}")),
+    'simulations': (False, lambda s: s.call('GET', '/api/simulations')),
+    'simulations_score': (False, lambda s: s.call('POST', '/api/simulations/score', json={"id": "ux_wireframe", "answers": {"a": s.rng.randint(0, 3), "b": 1}})),
+    'submit_aptitude': (False, lambda s: s.call('POST', '/api/aptitude/submit', json=_submit_body(s.rng))),
+    'portfolio_list': (False, lambda s: s.call('GET', '/api/portfolio')),
+    'portfolio_add': (False, lambda s: s.call('POST', '/api/portfolio', json={"name": "Bench", "url": "https://example.com/b"})),
+    'portfolio_update': (False, _update_portfolio),
+    'portfolio_delete': (False, lambda s: s.call('DELETE', f"/api/portfolio/{s.call('POST', '/api/portfolio', measure=False, json={'name': 'Tmp', 'url': 'https://example.com/t'}).get_json()['id']}")),
+    'goal_delete': (False, _delete_goal),
+    'submit_aptitude_batch': (True, lambda s: s.call('POST', '/api/aptitude/submit-batch', json={"results": [
+        dict(_submit_body(s.rng), uid=s.pool["uids"][s.rng.choice(s.pool["students"])]) for _ in range(50)]})),
+    'simulations_score_batch': (True, lambda s: s.call('POST', '/api/simulations/score-batch', json={"id": "pm_prioritize", "submissions": [
+        {"answers": {"a": s.rng.randint(0, 3), "b": s.rng.randint(0, 3)}} for _ in range(200)]})),
+    'admin_students': (True, lambda s: s.call('GET', '/api/admin/students?limit=500')),
+    'admin_analytics': (True, lambda s: s.call('GET', '/api/admin/analytics')),
+    'admin_tests_list': (True, lambda s: s.call('GET', '/api/admin/tests')),
+    'admin_tests_add': (True, lambda s: s.call('POST', '/api/admin/tests', json={"name": "Bench test"})),
+    'admin_tests_delete': (True, lambda s: s.call('DELETE', f"/api/admin/tests/{s.call('POST', '/api/admin/tests', measure=False, json={'name': 'Tmp'}).get_json()['id']}")),
+    'admin_questions_list': (True, lambda s: s.call('GET', f"/api/admin/questions?test_id={s.pool['test_id']}")),
+    'admin_questions_add': (True, lambda s: s.call('POST', '/api/admin/questions', json={"test_id": s.pool['test_id'], "text": "Bench?", "topic": "maths"})),
+    'admin_questions_delete': (True, lambda s: s.call('DELETE', f"/api/admin/questions/{s.call('POST', '/api/admin/questions', measure=False, json={'test_id': s.pool['test_id'], 'text': 'Tmp'}).get_json()['id']}")),
+    'admin_questions_import': (True, lambda s: s.call('POST', '/api/admin/questions/import', **_csv_upload(s.pool['test_id']))),
+    # only one job runs at a time, so most of these measure the 409 path
+    'create_wipe_job': (True, lambda s: s.call('POST', '/api/admin/wipe-jobs', json={"scope": "class", "value": "bench-none", "confirm": "WIPE_CONFIRM"})),
+    'list_wipe_jobs': (True, lambda s: s.call('GET', '/api/admin/wipe-jobs')),
+    'get_wipe_job': (True, lambda s: s.call('GET', f"/api/admin/wipe-jobs/{_wipe_job(s)}")),
+    'resume_wipe_job': (True, lambda s: s.call('POST', f"/api/admin/wipe-jobs/{_wipe_job(s)}/resume")),
+}
+
+
+def percentile(sorted_ms, q):
+    if not sorted_ms:
+        return None
+    k = (len(sorted_ms) - 1) * q
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_ms) - 1)
+    return round(sorted_ms[lo] + (sorted_ms[hi] - sorted_ms[lo]) * (k - lo), 3)
+
+
+def drive(app, endpoint, admin, scenario, pool, args, rng_seed):
+    metrics = app.extensions['metrics']
+    lock = threading.Lock()
+    timings, statuses = [], Counter()
+
+    def worker(i, measured):
+        client = app.test_client()
+        s = Session(client, pool, random.Random(rng_seed * 100003 + i), admin)
+        scenario(s)
+        if measured and s.measured is not None:
+            with lock:
+                timings.append(s.measured[0] * 1000)
+                statuses[s.measured[1]] += 1
+
+    with ThreadPoolExecutor(args.concurrency) as ex:
+        list(ex.map(lambda i: worker(i, False), range(args.warmup)))
+        before = metrics.snapshot().get(endpoint, {})
+        t0 = time.perf_counter()
+        list(ex.map(lambda i: worker(i, True), range(args.warmup, args.warmup + args.requests)))
+        wall = time.perf_counter() - t0
+    after = metrics.snapshot().get(endpoint, {})
+    served = after.get("requests", 0) - before.get("requests", 0)
+    timings.sort()
+    return {
+        "requests": len(timings),
+        "status": {str(k): v for k, v in sorted(statuses.items())},
+        "p50_ms": percentile(timings, 0.50),
+        "p95_ms": percentile(timings, 0.95),
+        "p99_ms": percentile(timings, 0.99),
+        "mean_ms": round(sum(timings) / len(timings), 3) if timings else None,
+        "throughput_rps": round(len(timings) / wall, 1) if wall > 0 else None,
+        # setup calls of the same endpoint (none today) would be included here
+        "queries_per_request": round((after.get("queries", 0) - before.get("queries", 0)) / served, 2) if served else None,
+        "db_ms_per_request": round((after.get("db_seconds", 0) - before.get("db_seconds", 0)) * 1000 / served, 3) if served else None,
+    }
+
+
+def compare(report, baseline, tolerance, min_delta_ms, query_slack):
+    regressions = []
+    for ep, new in report["endpoints"].items():
+        old = baseline.get("endpoints", {}).get(ep)
+        if not old:
+            continue
+        if old.get("p95_ms") and new.get("p95_ms"):
+            delta = new["p95_ms"] - old["p95_ms"]
+            if delta > min_delta_ms and delta > old["p95_ms"] * tolerance:
+                regressions.append({"endpoint": ep, "metric": "p95_ms", "baseline": old["p95_ms"], "current": new["p95_ms"]})
+        if old.get("queries_per_request") is not None and (new.get("queries_per_request") or 0) > old["queries_per_request"] + query_slack:
+            regressions.append({"endpoint": ep, "metric": "queries_per_request",
+                                "baseline": old["queries_per_request"], "current": new["queries_per_request"]})
+    return regressions
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    db_path = configure_env(args)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from app import create_app
+
+    rng = random.Random(args.seed)
+    app = create_app()
+    t0 = time.perf_counter()
+    pool = seed(app, args, rng)
+    seed_seconds = time.perf_counter() - t0
+
+    endpoints = sorted({r.endpoint for r in app.url_map.iter_rules()})
+    wanted = set(args.routes.split(',')) if args.routes else None
+    report = {
+        "meta": {
+            "started_at": datetime.utcnow().isoformat(),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "database": db_path,
+            "seed_seconds": round(seed_seconds, 2),
+            **{k: getattr(args, k) for k in ('users', 'results', 'portfolio', 'bookmarks', 'goals', 'concurrency', 'requests', 'warmup', 'seed')},
+        },
+        "endpoints": {},
+        "skipped": {ep: SKIP[ep] for ep in endpoints if ep in SKIP},
+        "uncovered": [ep for ep in endpoints if ep not in SCENARIOS and ep not in SKIP],
+    }
+    for i, ep in enumerate(endpoints):
+        if ep not in SCENARIOS or (wanted and ep not in wanted):
+            continue
+        admin, scenario = SCENARIOS[ep]
+        report["endpoints"][ep] = drive(app, ep, admin, scenario, pool, args, args.seed + i)
+        print(f"{ep:26s} p50={report['endpoints'][ep]['p50_ms']}ms p95={report['endpoints'][ep]['p95_ms']}ms "
+              f"q/req={report['endpoints'][ep]['queries_per_request']}", file=sys.stderr)
+    app.extensions['post_submit'].shutdown()
+
+    status = 0
+    if args.baseline:
+        with open(args.baseline) as fh:
+            report["regressions"] = compare(report, json.load(fh), args.tolerance, args.min_delta_ms, args.query_slack)
+        status = 1 if report["regressions"] else 0
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.out:
+        with open(args.out, 'w') as fh:
+            fh.write(text + '\n')
+    else:
+        print(text)
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
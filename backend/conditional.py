@@ -0,0 +1,38 @@
+"""Conditional GET for per-user JSON, shared by app.py and asgi.py.
+
+A view computes its ETag from everything the body depends on, asks
+is_fresh() before building the payload, and stamps validator_headers() on
+the 200 or 304 it returns. Both servers parse the request headers with
+werkzeug, so a client gets the same answer from either.
+"""
+import hashlib
+from datetime import datetime
+from typing import Optional
+
+from werkzeug.http import http_date, parse_date, parse_etags
+
+
+def etag_for(*parts) -> str:
+    """Strong validator for a response built from ``parts``."""
+    return hashlib.sha1(repr(parts).encode()).hexdigest()[:24]
+
+
+def is_fresh(tag: str, last_modified: Optional[datetime], if_none_match: Optional[str],
+             if_modified_since: Optional[str]) -> bool:
+    """True if the client's copy still matches: by ETag when it sent one, else by date."""
+    if if_none_match:
+        return parse_etags(if_none_match).contains(tag)
+    since = parse_date(if_modified_since)
+    return last_modified is not None and since is not None and last_modified.replace(microsecond=0) <= since
+
+
+def validator_headers(tag: str, last_modified: Optional[datetime], max_age: int = 0) -> dict:
+    # bodies are per user (auth required), so only the browser may keep them
+    headers = {
+        'ETag': f'"{tag}"',
+        'Cache-Control': f'private, max-age={max_age}' if max_age else 'private, no-cache',
+        'Vary': 'Authorization',
+    }
+    if last_modified is not None:
+        headers['Last-Modified'] = http_date(last_modified)
+    return headers
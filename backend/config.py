@@ -3,9 +3,90 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+
+def engine_options(uri):
+    """Connection pool settings for one database URL."""
+    options = {"pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "1").lower() in ("1", "true", "yes")}
+    # in-memory SQLite runs on a single static connection
+    if uri and not (uri.startswith("sqlite") and (":memory:" in uri or uri.rstrip("/") in ("sqlite:", "sqlite"))):
+        options.update(
+            pool_size=int(os.getenv("DB_POOL_SIZE", "10")),
+            max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "20")),
+            pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", "30")),
+            # recycle before the ~300s idle timeout common to MySQL proxies
+            pool_recycle=int(os.getenv("DB_POOL_RECYCLE", "280")),
+        )
+    return options
+
+
 class Config:
     SECRET_KEY = os.getenv("SECRET_KEY", "dev")
     SQLALCHEMY_DATABASE_URI = os.getenv("SQLALCHEMY_DATABASE_URI")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Pool per process; size it to at least the worker's thread count
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
+    # Optional read replica for the read-only views (see db_routing.py); a
+    # user's reads stay on the primary for REPLICA_PIN_SECONDS after a write
+    SQLALCHEMY_REPLICA_URI = os.getenv("SQLALCHEMY_REPLICA_URI")
+    SQLALCHEMY_BINDS = {"replica": {"url": SQLALCHEMY_REPLICA_URI, **engine_options(SQLALCHEMY_REPLICA_URI)}} if SQLALCHEMY_REPLICA_URI else {}
+    REPLICA_PIN_SECONDS = float(os.getenv("REPLICA_PIN_SECONDS", "10"))
+    # Request/SQL instrumentation at /metrics (see metrics.py); set a token to
+    # require "Authorization: Bearer <token>", and SLOW_QUERY_MS > 0 to log
+    # statements at or above it
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1").lower() in ("1", "true", "yes")
+    METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+    SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "0"))
+    # ASGI mode (asgi.py): async driver URL, derived from SQLALCHEMY_DATABASE_URI
+    # when unset, and threads for blocking calls such as token verification
+    ASYNC_DATABASE_URI = os.getenv("ASYNC_DATABASE_URI")
+    ASGI_EXECUTOR_THREADS = int(os.getenv("ASGI_EXECUTOR_THREADS", "8"))
     CORS_ORIGINS = os.getenv("CORS_ORIGINS", "*")
+    # JSON encoder (see json_codec.py): auto uses orjson when installed
+    JSON_BACKEND = os.getenv("JSON_BACKEND", "auto")
     FIREBASE_CREDENTIALS_PATH = os.getenv("FIREBASE_CREDENTIALS_PATH", "serviceAccountKey.json")
+    BATCH_SUBMIT_MAX = int(os.getenv("BATCH_SUBMIT_MAX", "5000"))
+    PROFILE_CACHE_MAX_ENTRIES = int(os.getenv("PROFILE_CACHE_MAX_ENTRIES", "10000"))
+    PROFILE_CACHE_MAX_BYTES = int(os.getenv("PROFILE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+    PROFILE_CACHE_TTL = float(os.getenv("PROFILE_CACHE_TTL", "10"))
+    AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "60"))
+    AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "50000"))
+    QUESTION_PAYLOAD_CACHE_SIZE = int(os.getenv("QUESTION_PAYLOAD_CACHE_SIZE", "256"))
+    QUESTION_BANK_CHECK_INTERVAL = float(os.getenv("QUESTION_BANK_CHECK_INTERVAL", "30"))
+    QUESTION_IMPORT_BATCH_SIZE = int(os.getenv("QUESTION_IMPORT_BATCH_SIZE", "1000"))
+    ADMIN_STUDENTS_PAGE_SIZE = int(os.getenv("ADMIN_STUDENTS_PAGE_SIZE", "500"))
+    ADMIN_STUDENTS_MAX_PAGE_SIZE = int(os.getenv("ADMIN_STUDENTS_MAX_PAGE_SIZE", "2000"))
+    # Run pending migrations inside create_app(); leave off for multi-worker deploys
+    AUTO_MIGRATE = os.getenv("AUTO_MIGRATE", "0").lower() in ("1", "true", "yes")
+    # Per-client request limit: "memory" (per worker), "sqlite" (shared by all
+    # workers on the host) or "off". Defaults to memory in production only.
+    RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory" if os.getenv("ENV", "development") == "production" else "off")
+    RATE_LIMIT_PER_WINDOW = int(os.getenv("RATE_LIMIT_PER_WINDOW", "120"))
+    RATE_LIMIT_WINDOW = float(os.getenv("RATE_LIMIT_WINDOW", "60"))
+    RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+    RATE_LIMIT_SQLITE_PATH = os.getenv("RATE_LIMIT_SQLITE_PATH", "instance/rate_limit.sqlite")
+    # /api/reports range when no ?from= is given
+    REPORTS_DEFAULT_DAYS = int(os.getenv("REPORTS_DEFAULT_DAYS", "365"))
+    ANALYTICS_CHUNK_SIZE = int(os.getenv("ANALYTICS_CHUNK_SIZE", "5000"))
+    ANALYTICS_REFRESH_INTERVAL = float(os.getenv("ANALYTICS_REFRESH_INTERVAL", "60"))
+    # Trained career model (flask train-model): where versions are saved, how
+    # often workers look for a new one, and its weight against the rule scores
+    MODEL_DIR = os.getenv("MODEL_DIR", "instance/models")
+    MODEL_CHECK_INTERVAL = float(os.getenv("MODEL_CHECK_INTERVAL", "30"))
+    MODEL_BLEND = float(os.getenv("MODEL_BLEND", "0.3"))
+    MODEL_MIN_SAMPLES = int(os.getenv("MODEL_MIN_SAMPLES", "50"))
+    # Cache-Control max-age for responses that are the same for every student
+    STATIC_CACHE_MAX_AGE = int(os.getenv("STATIC_CACHE_MAX_AGE", "300"))
+    # Post-submit pipeline (see post_submit.py): worker threads per process
+    # (0 runs it inline), and how old a pending result must be before a
+    # sweep re-queues it
+    POST_SUBMIT_WORKERS = int(os.getenv("POST_SUBMIT_WORKERS", "4"))
+    POST_SUBMIT_SWEEP_SECONDS = float(os.getenv("POST_SUBMIT_SWEEP_SECONDS", "60"))
+    # Background data wipes (see wipe_jobs.py): users per batch, rows per
+    # delete statement, where archived rows go, when a running job whose
+    # worker went away may be resumed, and how often each worker checks for
+    # wipes by other workers (its cached users are dropped after one)
+    WIPE_BATCH_SIZE = int(os.getenv("WIPE_BATCH_SIZE", "500"))
+    WIPE_CHUNK_SIZE = int(os.getenv("WIPE_CHUNK_SIZE", "1000"))
+    WIPE_ARCHIVE_DIR = os.getenv("WIPE_ARCHIVE_DIR", "instance/archive")
+    WIPE_JOB_STALE_SECONDS = float(os.getenv("WIPE_JOB_STALE_SECONDS", "300"))
+    WIPE_WATCH_INTERVAL = float(os.getenv("WIPE_WATCH_INTERVAL", "2"))
@@ -0,0 +1,80 @@
+"""Read-replica routing for the Flask-SQLAlchemy session.
+
+Views wrapped in ``replica_reads`` may send their SELECTs to the
+"replica" bind (SQLALCHEMY_REPLICA_URI). The choice is made after
+authentication, so the users lookup and anything it creates stay on the
+primary. Flushes and INSERT/UPDATE/DELETE statements always go to the
+primary, as does all work outside a request (CLI, background jobs).
+
+Read-your-writes: a successful POST/PUT/PATCH/DELETE pins its user to the
+primary for REPLICA_PIN_SECONDS. The pin is kept in this process and also
+returned in the X-DB-Pin header as its expiry (unix seconds); the frontend
+echoes it on its requests until then, so the next read sees the write
+whichever worker serves it. A header rather than a cookie, because the
+frontend calls the API cross-origin without credentials.
+"""
+import functools
+import math
+import time
+
+from flask import g, has_request_context, request
+from flask_sqlalchemy.session import Session
+
+from auth_cache import TTLCache
+
+REPLICA_BIND = 'replica'
+PIN_HEADER = 'X-DB-Pin'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and has_request_context() and g.get('db_route') == REPLICA_BIND
+                and not self._flushing and not getattr(clause, 'is_dml', False)):
+            engine = self._db.engines.get(REPLICA_BIND)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def replica_reads(view):
+    """Let a read-only view use the replica once its user is known."""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        g.replica_ok = True
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def _pinned(value) -> bool:
+    """True while a client-echoed pin has not expired."""
+    try:
+        return float(value) > time.time()
+    except (TypeError, ValueError):
+        return False
+
+
+class ReplicaRouter:
+    def __init__(self, enabled: bool, pin_seconds: float, max_entries: int):
+        self.enabled = enabled
+        self.pin_seconds = pin_seconds
+        self._pins = TTLCache(pin_seconds, max_entries)
+
+    def route(self, user_id: int):
+        """Called once the request's user is resolved."""
+        g.db_user_id = user_id
+        if (self.enabled and g.get('replica_ok') and self._pins.get(user_id) is None
+                and not _pinned(request.headers.get(PIN_HEADER))):
+            g.db_route = REPLICA_BIND
+
+    def pin(self, user_id: int, resp):
+        """Keep the user's reads on the primary; ``resp`` carries the pin to the client."""
+        if self.enabled and self.pin_seconds > 0:
+            self._pins.set(user_id, True)
+            resp.headers[PIN_HEADER] = str(math.ceil(time.time() + self.pin_seconds))
+
+    def after_request(self, resp):
+        user_id = g.get('db_user_id')
+        if user_id is not None and request.method not in SAFE_METHODS and resp.status_code < 400:
+            self.pin(user_id, resp)
+        return resp
@@ -0,0 +1,32 @@
+"""Gunicorn settings for the WSGI app.
+
+    gunicorn -c gunicorn.conf.py 'app:create_app()'
+
+With preload_app the master runs create_app() and warm_up() once and then
+forks. The workers inherit the loaded modules, the engine's weight
+matrices, the catalog and the question bank, and share those pages
+copy-on-write. gc.freeze() moves the warmed objects out of the
+collector's reach, so collections in the workers do not write to (and so
+copy) them. Pooled connections are reopened in each worker (see
+create_app() and rate_limit.py).
+
+Set GUNICORN_PRELOAD=0 to load the app in every worker instead, e.g. for
+--reload during development.
+"""
+import gc
+import multiprocessing
+import os
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5000")
+workers = int(os.getenv("WEB_CONCURRENCY", str(multiprocessing.cpu_count() * 2 + 1)))
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+preload_app = os.getenv("GUNICORN_PRELOAD", "1").lower() in ("1", "true", "yes")
+
+
+def when_ready(server):
+    if not preload_app:
+        return
+    from app import warm_up
+    warm_up(server.app.wsgi())
+    gc.freeze()
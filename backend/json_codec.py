@@ -0,0 +1,92 @@
+"""JSON encoding for responses and stored JSON columns.
+
+orjson is used when it is installed, with the standard library as the
+fallback; JSON_BACKEND=stdlib forces the fallback. Both produce the same
+documents as Flask's default provider: keys sorted, compact separators,
+and dates, UUIDs, dataclasses and Markup handled by Flask's ``default``.
+orjson additionally serializes NumPy scalars and arrays. Two byte-level
+differences remain with orjson:
+- non-ASCII text is sent as UTF-8 instead of \\u escapes;
+- NaN and infinities become null.
+
+``JSONProvider`` is installed as ``app.json``. The module-level ``dumps``
+and ``loads`` are for code without an app, such as the catalog's
+pre-serialized fragments and TestResult.breakdown parsing.
+"""
+import json
+import os
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pure-Python fallback
+    orjson = None
+
+BACKENDS = ('auto', 'orjson', 'stdlib')
+
+if orjson is not None:
+    _OPTIONS = (orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+                | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS)
+_fast = orjson is not None
+
+
+def use(backend: str = 'auto') -> str:
+    """Pick the encoder for this process; returns the one in effect."""
+    global _fast
+    if backend not in BACKENDS:
+        raise ValueError(f"JSON_BACKEND must be one of {', '.join(BACKENDS)}")
+    if backend == 'orjson' and orjson is None:
+        raise RuntimeError("JSON_BACKEND=orjson but orjson is not installed")
+    _fast = orjson is not None and backend != 'stdlib'
+    return 'orjson' if _fast else 'stdlib'
+
+
+def dumps_bytes(obj, indent: bool = False) -> bytes:
+    if _fast:
+        return orjson.dumps(obj, default=DefaultJSONProvider.default,
+                            option=(_OPTIONS | orjson.OPT_INDENT_2) if indent else _OPTIONS)
+    return _std_dumps(obj, indent).encode()
+
+
+def dumps(obj, indent: bool = False) -> str:
+    if _fast:
+        return dumps_bytes(obj, indent).decode()
+    return _std_dumps(obj, indent)
+
+
+def _std_dumps(obj, indent):
+    return json.dumps(obj, default=DefaultJSONProvider.default, sort_keys=True,
+                      **({"indent": 2} if indent else {"separators": (",", ":")}))
+
+
+def loads(raw):
+    """Parse str or bytes; errors are ValueError subclasses either way."""
+    return orjson.loads(raw) if _fast else json.loads(raw)
+
+
+class JSONProvider(DefaultJSONProvider):
+    """Flask provider using this module's encoder.
+
+    Calls with extra json.dumps/json.loads arguments fall back to Flask's
+    own implementation.
+    """
+
+    def dumps(self, obj, **kwargs) -> str:
+        if not kwargs or kwargs == {"separators": (",", ":")}:
+            return dumps(obj)
+        if kwargs == {"indent": 2}:
+            return dumps(obj, indent=True)
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        return loads(s) if not kwargs else super().loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(dumps_bytes(obj, indent) + b"\n", mimetype=self.mimetype)
+
+
+# modules serialize at import time (ml/catalog.py), before create_app() runs
+use(os.getenv("JSON_BACKEND", "auto"))
@@ -0,0 +1,25 @@
+"""Deferred imports for modules that only some requests need.
+
+``lazy_import('pandas')`` returns the module object at once, but only runs
+its import on the first attribute access. A worker that never serves those
+requests never pays for the import. Under a preloading server the master
+touches the module in warm_up() (app.py), so forked workers inherit it
+already loaded.
+"""
+import importlib.util
+import sys
+
+
+def lazy_import(name: str):
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ImportError(f"No module named {name!r}", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
@@ -0,0 +1,203 @@
+"""Request and SQL instrumentation, exported at /metrics.
+
+Each request gets a small stats object in a context variable. SQLAlchemy
+cursor events add to it: query count, DB time and rows. (Rows are as
+reported by the DB-API cursor; buffered MySQL cursors report the result
+size, SQLite reports nothing for SELECTs.) When the request ends, one
+locked update folds it into per-endpoint histograms. The cost is two
+perf_counter() calls per query and one lock per request.
+
+Queries outside a request (post-submit workers, wipe jobs, CLI) are
+counted under endpoint="background". With SLOW_QUERY_MS set, statements
+at or above it are logged without their parameters.
+
+Series are per process. Under gunicorn each worker exports its own, so
+scrape workers individually or sum per instance.
+"""
+import bisect
+import contextvars
+import threading
+import time
+from typing import Dict, Tuple
+
+from sqlalchemy import event
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+BACKGROUND = 'background'
+# per-endpoint SQL counters, in RequestStats/_db_totals order
+DB_TOTALS = (
+    ('nextstep_db_queries_total', 'SQL statements executed.'),
+    ('nextstep_db_query_seconds_total', 'Time spent in SQL.'),
+    ('nextstep_db_rows_fetched_total', 'Rows reported by the cursor.'),
+    ('nextstep_db_slow_queries_total', 'Statements at or above SLOW_QUERY_MS.'),
+)
+
+_current = contextvars.ContextVar('request_stats', default=None)
+
+
+def query_budget(n: int):
+    """Declare the most SQL statements one request to a view may issue.
+
+    Checked by query_budget.py, not at runtime.
+    """
+    def decorate(view):
+        view.query_budget = n
+        return view
+    return decorate
+
+
+class RequestStats:
+    __slots__ = ('endpoint', 'queries', 'db_time', 'rows', 'slow')
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.queries = 0
+        self.db_time = 0.0
+        self.rows = 0
+        self.slow = 0
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _labels(names, values) -> str:
+    def esc(v):
+        return str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return ','.join(f'{n}="{esc(v)}"' for n, v in zip(names, values))
+
+
+class Metrics:
+    def __init__(self, slow_query_seconds: float = 0.0, logger=None):
+        self.slow_query_seconds = slow_query_seconds
+        self.logger = logger
+        self._lock = threading.Lock()
+        self._requests: Dict[Tuple[str, str, int], int] = {}
+        self._latency: Dict[Tuple[str, str], Histogram] = {}
+        self._db_time: Dict[str, Histogram] = {}
+        self._queries: Dict[str, Histogram] = {}
+        # endpoint -> [queries, seconds, rows, slow]
+        self._db_totals: Dict[str, list] = {}
+
+    # -- request side --------------------------------------------------
+    def begin(self, endpoint: str):
+        """Start collecting for the current request; returns a reset token."""
+        return _current.set(RequestStats(endpoint))
+
+    def end(self, token, method: str, status: int, seconds: float):
+        stats = _current.get()
+        _current.reset(token)
+        if stats is None:
+            return
+        ep = stats.endpoint
+        with self._lock:
+            key = (ep, method, status)
+            self._requests[key] = self._requests.get(key, 0) + 1
+            h = self._latency.get((ep, method))
+            if h is None:
+                h = self._latency[(ep, method)] = Histogram(LATENCY_BUCKETS)
+            h.observe(seconds)
+            h = self._db_time.get(ep)
+            if h is None:
+                h = self._db_time[ep] = Histogram(LATENCY_BUCKETS)
+            h.observe(stats.db_time)
+            h = self._queries.get(ep)
+            if h is None:
+                h = self._queries[ep] = Histogram(QUERY_BUCKETS)
+            h.observe(stats.queries)
+            self._add_db(ep, stats.queries, stats.db_time, stats.rows, stats.slow)
+
+    def _add_db(self, ep, queries, seconds, rows, slow):
+        t = self._db_totals.get(ep)
+        if t is None:
+            t = self._db_totals[ep] = [0, 0.0, 0, 0]
+        t[0] += queries
+        t[1] += seconds
+        t[2] += rows
+        t[3] += slow
+
+    # -- SQL side ------------------------------------------------------
+    def instrument_engine(self, engine):
+        """Attach cursor hooks to a (sync) Engine; async engines pass .sync_engine."""
+        event.listen(engine, 'before_cursor_execute', self._before_cursor)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor)
+
+    @staticmethod
+    def _before_cursor(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('metrics_start', []).append(time.perf_counter())
+
+    def _after_cursor(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['metrics_start'].pop()
+        rows = cursor.rowcount if cursor.rowcount and cursor.rowcount > 0 and cursor.description else 0
+        slow = int(0 < self.slow_query_seconds <= elapsed)
+        stats = _current.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_time += elapsed
+            stats.rows += rows
+            stats.slow += slow
+        else:
+            with self._lock:
+                self._add_db(BACKGROUND, 1, elapsed, rows, slow)
+        if slow and self.logger is not None:
+            self.logger.warning("slow query %.1fms [%s] %s", elapsed * 1000,
+                                stats.endpoint if stats is not None else BACKGROUND, ' '.join(statement.split())[:1000])
+
+    # -- export --------------------------------------------------------
+    def snapshot(self) -> Dict[str, dict]:
+        """Per-endpoint request and SQL totals, for scripts that diff them."""
+        with self._lock:
+            out = {ep: {"requests": 0, "queries": t[0], "db_seconds": t[1], "rows": t[2], "slow": t[3]}
+                   for ep, t in self._db_totals.items()}
+            for (ep, _, _), n in self._requests.items():
+                out.setdefault(ep, {"requests": 0, "queries": 0, "db_seconds": 0.0, "rows": 0, "slow": 0})["requests"] += n
+        return out
+
+    def render(self) -> str:
+        """Prometheus text exposition format (0.0.4)."""
+        out = []
+        with self._lock:
+            out.append('# HELP nextstep_http_requests_total Requests served, by endpoint, method and status.')
+            out.append('# TYPE nextstep_http_requests_total counter')
+            for (ep, method, status), n in sorted(self._requests.items()):
+                out.append(f'nextstep_http_requests_total{{{_labels(("endpoint", "method", "status"), (ep, method, status))}}} {n}')
+            self._render_histograms(out, 'nextstep_http_request_duration_seconds', 'Time to build the response.',
+                                    ('endpoint', 'method'), self._latency)
+            self._render_histograms(out, 'nextstep_db_time_per_request_seconds', 'Time spent in SQL per request.',
+                                    ('endpoint',), {(k,): v for k, v in self._db_time.items()})
+            self._render_histograms(out, 'nextstep_db_queries_per_request', 'SQL statements per request.',
+                                    ('endpoint',), {(k,): v for k, v in self._queries.items()})
+            totals = sorted(self._db_totals.items())
+            for i, (name, help_) in enumerate(DB_TOTALS):
+                out.append(f'# HELP {name} {help_}')
+                out.append(f'# TYPE {name} counter')
+                for ep, t in totals:
+                    out.append(f'{name}{{{_labels(("endpoint",), (ep,))}}} {t[i]}')
+        return '\n'.join(out) + '\n'
+
+    @staticmethod
+    def _render_histograms(out, name, help_, label_names, series):
+        out.append(f'# HELP {name} {help_}')
+        out.append(f'# TYPE {name} histogram')
+        for key, h in sorted(series.items()):
+            base = _labels(label_names, key)
+            cumulative = 0
+            for bound, n in zip(h.buckets, h.counts):
+                cumulative += n
+                out.append(f'{name}_bucket{{{base},le="{bound:g}"}} {cumulative}')
+            out.append(f'{name}_bucket{{{base},le="+Inf"}} {h.count}')
+            out.append(f'{name}_sum{{{base}}} {h.sum}')
+            out.append(f'{name}_count{{{base}}} {h.count}')
+
@@ -0,0 +1,214 @@
+"""Versioned schema migrations.
+
+Run once per deploy, before starting workers:
+
+    flask migrate            # or: python migrations.py
+
+Applied versions are recorded in schema_migrations, so each step runs once.
+Steps must stay idempotent (check before altering) because a database
+created from schema.sql or db.create_all() may already have their changes.
+"""
+from typing import Callable, List, Tuple
+
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import SQLAlchemyError
+
+from models import db, SchemaMigration, AptitudeTest, AptitudeQuestion, TestResult, ScoreRollup, PortfolioRollup, WipeJob, INDEXES, SCORE_INDEXES
+
+MIGRATIONS: List[Tuple[int, str, Callable[[], None]]] = []
+
+
+def migration(version: int, name: str):
+    def register(fn):
+        MIGRATIONS.append((version, name, fn))
+        return fn
+    return register
+
+
+def _columns(inspector, table: str) -> List[str]:
+    return [c['name'] for c in inspector.get_columns(table)]
+
+
+@migration(1, 'baseline schema')
+def _baseline():
+    # Former startup probing in create_app(), kept for legacy databases
+    inspector = inspect(db.engine)
+    if inspector.has_table('users'):
+        cols = _columns(inspector, 'users')
+        # Ensure 'uid' exists and is NOT NULL UNIQUE
+        if 'uid' not in cols:
+            db.session.execute(text("ALTER TABLE users ADD COLUMN uid VARCHAR(128) NULL AFTER id"))
+            db.session.execute(text("UPDATE users SET uid = email WHERE uid IS NULL AND email IS NOT NULL"))
+            db.session.execute(text("ALTER TABLE users MODIFY COLUMN uid VARCHAR(128) NOT NULL"))
+            db.session.execute(text("ALTER TABLE users ADD UNIQUE (uid)"))
+            db.session.commit()
+        # Handle legacy 'firebase_uid' column that is NOT NULL
+        if 'firebase_uid' in cols:
+            # Backfill firebase_uid from uid (preferred) or email
+            db.session.execute(text("UPDATE users SET firebase_uid = COALESCE(uid, email) WHERE (firebase_uid IS NULL OR firebase_uid = '')"))
+            # Relax NOT NULL to allow inserts that don't set this legacy column
+            try:
+                db.session.execute(text("ALTER TABLE users MODIFY COLUMN firebase_uid VARCHAR(128) NULL"))
+            except Exception:
+                pass
+            db.session.commit()
+
+    # Ensure portfolio_items has expected columns
+    if inspector.has_table('portfolio_items'):
+        pcols = _columns(inspector, 'portfolio_items')
+        if 'name' not in pcols:
+            db.session.execute(text("ALTER TABLE portfolio_items ADD COLUMN name VARCHAR(200) NULL AFTER user_id"))
+        if 'url' not in pcols:
+            db.session.execute(text("ALTER TABLE portfolio_items ADD COLUMN url TEXT NULL"))
+        if 'created_at' not in pcols:
+            db.session.execute(text("ALTER TABLE portfolio_items ADD COLUMN created_at DATETIME DEFAULT CURRENT_TIMESTAMP"))
+        if 'description' not in pcols:
+            db.session.execute(text("ALTER TABLE portfolio_items ADD COLUMN description VARCHAR(255) NULL"))
+        if 'tags' not in pcols:
+            db.session.execute(text("ALTER TABLE portfolio_items ADD COLUMN tags VARCHAR(255) NULL"))
+        db.session.commit()
+
+    # Ensure aptitude_questions has the multiple-choice columns
+    if inspector.has_table('aptitude_questions'):
+        qcols = _columns(inspector, 'aptitude_questions')
+        if 'level' not in qcols:
+            db.session.execute(text("ALTER TABLE aptitude_questions ADD COLUMN level VARCHAR(20) NULL"))
+        if 'options' not in qcols:
+            db.session.execute(text("ALTER TABLE aptitude_questions ADD COLUMN options TEXT NULL"))
+        if 'answer' not in qcols:
+            db.session.execute(text("ALTER TABLE aptitude_questions ADD COLUMN answer INT NULL"))
+        db.session.commit()
+
+    # Create any missing tables (learning_goals, career_bookmarks, ...)
+    db.create_all()
+
+
+@migration(2, 'per-user access indexes')
+def _indexes():
+    for index in INDEXES:
+        index.create(bind=db.engine, checkfirst=True)
+
+
+@migration(3, 'seed default test and question bank')
+def _seed():
+    from question_bank import builtin_questions, import_questions
+    # Ensure at least one aptitude test exists for foreign key references
+    t = AptitudeTest.query.order_by(AptitudeTest.id.asc()).first()
+    if not t:
+        t = AptitudeTest(name='General Aptitude')
+        db.session.add(t)
+        db.session.commit()
+    # Seed the question bank with the built-in samples while it has no multiple-choice rows
+    if AptitudeQuestion.query.filter(AptitudeQuestion.options.isnot(None)).first() is None:
+        import_questions(builtin_questions(), t.id)
+
+
+@migration(4, 'report rollups')
+def _report_rollups():
+    from reports import backfill
+    ScoreRollup.__table__.create(bind=db.engine, checkfirst=True)
+    PortfolioRollup.__table__.create(bind=db.engine, checkfirst=True)
+    backfill()
+
+
+@migration(5, 'wipe jobs')
+def _wipe_jobs():
+    WipeJob.__table__.create(bind=db.engine, checkfirst=True)
+
+
+@migration(6, 'post-submit processing marker')
+def _post_submit_marker():
+    if 'processed_at' not in _columns(inspect(db.engine), 'test_results'):
+        db.session.execute(text("ALTER TABLE test_results ADD COLUMN processed_at DATETIME NULL"))
+        # everything submitted so far was processed in the request
+        db.session.execute(text("UPDATE test_results SET processed_at = COALESCE(created_at, CURRENT_TIMESTAMP)"))
+        db.session.commit()
+    for index in TestResult.__table__.indexes:
+        if index.name == 'ix_test_results_processed_at':
+            index.create(bind=db.engine, checkfirst=True)
+
+
+@migration(7, 'typed subject scores')
+def _subject_scores():
+    from ml.engine import Engine
+    from subject_scores import SUBJECT_COLUMNS, backfill
+    cols = _columns(inspect(db.engine), 'test_results')
+    for column in SUBJECT_COLUMNS.values():
+        if column.name not in cols:
+            db.session.execute(text(f"ALTER TABLE test_results ADD COLUMN {column.name} FLOAT NULL"))
+    if 'stream' not in cols:
+        db.session.execute(text("ALTER TABLE test_results ADD COLUMN stream VARCHAR(20) NULL"))
+    db.session.commit()
+    # streams come from the fixed stream weights, so a bare Engine (no
+    # trained model, no app) scores them the same as the app's
+    backfill(Engine())
+    for index in SCORE_INDEXES:
+        index.create(bind=db.engine, checkfirst=True)
+
+
+@migration(8, 'wipe job batches')
+def _wipe_job_batches():
+    if 'batch' not in _columns(inspect(db.engine), 'wipe_jobs'):
+        db.session.execute(text("ALTER TABLE wipe_jobs ADD COLUMN batch TEXT NULL"))
+        db.session.commit()
+
+
+@migration(9, 'wipe job slot')
+def _wipe_job_slot():
+    if 'active' not in _columns(inspect(db.engine), 'wipe_jobs'):
+        db.session.execute(text("ALTER TABLE wipe_jobs ADD COLUMN active BOOLEAN NULL"))
+        db.session.commit()
+    for index in WipeJob.__table__.indexes:
+        index.create(bind=db.engine, checkfirst=True)
+
+
+@migration(10, 'wipe job chunk counter')
+def _wipe_job_chunks():
+    if 'chunks' not in _columns(inspect(db.engine), 'wipe_jobs'):
+        db.session.execute(text("ALTER TABLE wipe_jobs ADD COLUMN chunks INT NOT NULL DEFAULT 0"))
+        db.session.commit()
+
+
+def applied_versions() -> set:
+    SchemaMigration.__table__.create(bind=db.engine, checkfirst=True)
+    return {v for (v,) in db.session.query(SchemaMigration.version)}
+
+
+def current_version() -> int:
+    """Highest applied version, or 0 when migrations have never run."""
+    # one query instead of a has_table() probe; a missing table just errors
+    try:
+        return db.session.query(db.func.max(SchemaMigration.version)).scalar() or 0
+    except SQLAlchemyError:
+        db.session.rollback()
+        return 0
+
+
+def latest_version() -> int:
+    return max(v for v, _, _ in MIGRATIONS)
+
+
+def run_migrations(echo=print) -> List[int]:
+    """Apply pending migrations in order; must run inside an app context."""
+    # Steps run and are recorded in order, so the latest version on record
+    # means nothing is pending; skip the schema inspection below
+    if current_version() >= latest_version():
+        return []
+    done = applied_versions()
+    ran = []
+    for version, name, fn in sorted(MIGRATIONS):
+        if version in done:
+            continue
+        echo(f"applying {version:04d} {name}")
+        fn()
+        db.session.add(SchemaMigration(version=version, name=name))
+        db.session.commit()
+        ran.append(version)
+    return ran
+
+
+if __name__ == '__main__':
+    from app import create_app
+    with create_app().app_context():
+        applied = run_migrations()
+        print(f"schema at version {current_version()} ({len(applied)} applied)")
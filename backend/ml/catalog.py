@@ -0,0 +1,137 @@
+"""Career catalog loaded once from careers.json.
+
+All career data lives in this one place: titles, domains, salaries, the
+subject weights behind the fit, recommendation and trend scores, and the
+per-stream steps, resources and guidance. The Engine builds its score
+columns from it, and the careers/trends/dashboard views read their static
+parts from it.
+
+Everything is immutable after load: records are NamedTuples, lookups are
+read-only mappings, and weight matrices are read-only arrays. The JSON
+fragments the careers response needs are serialized once here, so a
+request only formats the personalized numbers.
+"""
+import hashlib
+import os
+from types import MappingProxyType
+from typing import Dict, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+import json_codec
+from ml.engine import SUBJECTS, STREAMS, SUBJECT_INDEX, PCM, PCB, HUM, COM
+
+CATALOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "careers.json")
+
+_AGGREGATES = {"pcm": PCM, "pcb": PCB, "hum": HUM, "com": COM}
+
+
+def _dumps(obj) -> str:
+    # same encoder as the JSON responses these fragments are spliced into
+    return json_codec.dumps(obj)
+
+
+def _readonly(a: np.ndarray) -> np.ndarray:
+    a.setflags(write=False)
+    return a
+
+
+class Career(NamedTuple):
+    index: int
+    title: str
+    domain: str
+    median_salary: float
+    # "...,"suitability":" and ',"title":...}' around the personalized number
+    head: str
+    tail: str
+
+
+class StreamInfo(NamedTuple):
+    steps: Tuple[str, ...]
+    resources: Tuple[MappingProxyType, ...]
+    why: Tuple[str, ...]
+    suggested_subjects: Tuple[str, ...]
+    # indices into Catalog.careers for this stream, in catalog order
+    careers: np.ndarray
+
+
+class Catalog:
+    __slots__ = (
+        "version", "careers", "by_title", "streams", "emerging", "guidance_next_steps",
+        "career_weights", "recommend_titles", "recommend_domains", "recommend_weights",
+        "trend_titles", "trend_salaries", "trend_weights",
+    )
+
+    def __init__(self, doc: dict, version: str):
+        aggregates = dict(_AGGREGATES)
+        for name, spec in doc.get("aggregates", {}).items():
+            aggregates[name] = self._vector(spec, aggregates)
+
+        stream_docs = doc["streams"]
+        fragments = {
+            s: (_dumps(list(stream_docs[s]["resources"])), _dumps(list(stream_docs[s]["steps"])))
+            for s in STREAMS
+        }
+        careers, fit, recommend, trend = [], [], {}, {}
+        for i, c in enumerate(doc["careers"]):
+            resources, steps = fragments[c["domain"]]
+            head = (f'{{"domain":{_dumps(c["domain"])},"median_salary":{_dumps(float(c["median_salary"]))},'
+                    f'"resources":{resources},"steps":{steps},"suitability":')
+            careers.append(Career(i, c["title"], c["domain"], float(c["median_salary"]), head, f',"title":{_dumps(c["title"])}}}'))
+            fit.append(self._vector(c["fit"], aggregates))
+            if "recommend" in c:
+                recommend[c["title"]] = (c["domain"], self._vector(c["recommend"], aggregates))
+            if "trend" in c:
+                trend[c["title"]] = (float(c["median_salary"]), self._vector(c["trend"], aggregates))
+
+        self.version = version
+        self.careers = tuple(careers)
+        self.by_title = MappingProxyType({c.title: c for c in careers})
+        self.career_weights = _readonly(np.column_stack(fit))
+
+        rec_order = doc.get("recommend_order") or list(recommend)
+        self.recommend_titles = tuple(rec_order)
+        self.recommend_domains = tuple(recommend[t][0] for t in rec_order)
+        self.recommend_weights = _readonly(np.column_stack([recommend[t][1] for t in rec_order]))
+
+        trend_order = doc.get("trend_order") or list(trend)
+        self.trend_titles = tuple(trend_order)
+        self.trend_salaries = tuple(trend[t][0] for t in trend_order)
+        self.trend_weights = _readonly(np.column_stack([trend[t][1] for t in trend_order]))
+
+        self.streams = MappingProxyType({
+            s: StreamInfo(
+                steps=tuple(stream_docs[s]["steps"]),
+                resources=tuple(MappingProxyType(dict(r)) for r in stream_docs[s]["resources"]),
+                why=tuple(stream_docs[s]["guidance"]["why"]),
+                suggested_subjects=tuple(stream_docs[s]["guidance"]["suggested_subjects"]),
+                careers=_readonly(np.array([c.index for c in careers if c.domain == s], dtype=np.intp)),
+            )
+            for s in STREAMS
+        })
+        self.emerging = tuple(doc.get("emerging", ()))
+        self.guidance_next_steps = tuple(doc.get("guidance_next_steps", ()))
+
+    @staticmethod
+    def _vector(spec: Dict[str, float], aggregates: Dict[str, np.ndarray]) -> np.ndarray:
+        """Weight vector over SUBJECTS; keys are subjects or aggregate names."""
+        v = np.zeros(len(SUBJECTS))
+        for k, c in spec.items():
+            if k in aggregates:
+                v = v + c * aggregates[k]
+            else:
+                v[SUBJECT_INDEX[k]] += c
+        return v
+
+    def career_json(self, career: Career, suitability: int) -> str:
+        return f"{career.head}{int(suitability)}{career.tail}"
+
+
+def load_catalog(path: Optional[str] = None) -> Catalog:
+    path = path or CATALOG_PATH
+    with open(path, "rb") as fh:
+        raw = fh.read()
+    return Catalog(json_codec.loads(raw), hashlib.sha256(raw).hexdigest()[:16])
+
+
+CATALOG = load_catalog(os.getenv("CAREER_CATALOG_PATH"))
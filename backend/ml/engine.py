@@ -1,7 +1,9 @@
 from dataclasses import dataclass
-from typing import List, Dict
+from typing import List, Dict, Iterable, Optional
 import numpy as np
 
+import json_codec
+
 @dataclass
 class SkillGapResult:
     skills: List[str]
@@ -14,7 +16,169 @@ class CareerRecommendation:
     suitability: float
     details: str
 
+# Canonical subject vector. Every endpoint reads breakdowns through this layout
+# so the same student always gets the same numbers.
+SUBJECTS = (
+    "maths", "physics", "chemistry", "biology", "english", "economics",
+    "accountancy", "history", "social", "science", "business", "logical", "creative",
+)
+STREAMS = ("engineering", "biology", "humanities", "commerce")
+SUBJECT_INDEX = {s: i for i, s in enumerate(SUBJECTS)}
+
+# Accepted breakdown keys per subject, first hit wins
+SUBJECT_ALIASES = {
+    "maths": ("maths", "mathematics", "Maths"),
+    "physics": ("physics", "Physics"),
+    "chemistry": ("chemistry", "Chemistry"),
+    "biology": ("biology", "Biology"),
+    "english": ("english", "English"),
+    "economics": ("economics", "Economics"),
+    "accountancy": ("accountancy", "accounts"),
+    "history": ("history", "History"),
+    "social": ("social", "Social"),
+    "science": ("science", "Science"),
+    "business": ("business", "Business"),
+    "logical": ("logical", "Logical"),
+    "creative": ("creative", "Creative"),
+}
+DEFAULT_SCORE = 50.0
+
+
+def _v(**coefs) -> np.ndarray:
+    """Weight vector over SUBJECTS from keyword coefficients."""
+    v = np.zeros(len(SUBJECTS))
+    for k, c in coefs.items():
+        v[SUBJECT_INDEX[k]] += c
+    return v
+
+# Stream aggregates
+PCM = _v(physics=1/3, chemistry=1/3, maths=1/3)
+PCB = _v(physics=1/3, chemistry=1/3, biology=1/3)
+HUM = _v(history=1/3, english=1/3, economics=1/3)
+COM = _v(accountancy=1/3, economics=1/3, maths=1/3)
+STREAM_WEIGHTS = (
+    ("engineering", PCM),
+    ("biology", PCB),
+    # Include social in humanities calculation
+    ("humanities", _v(history=0.25, english=0.25, economics=0.25, social=0.25)),
+    ("commerce", COM),
+)
+
+# Dashboard skill fit proxies per stream (gap = 100 - fit)
+SKILL_FITS = {
+    "engineering": (
+        ("Programming", 0.7*PCM + _v(logical=0.3)),
+        ("Data Analysis", 0.6*PCM + _v(logical=0.4)),
+        ("Problem Solving", _v(logical=0.5, english=0.3, creative=0.2)),
+    ),
+    "biology": (
+        ("Biology Lab", 0.7*PCB + _v(logical=0.3)),
+        ("Chemistry Basics", _v(chemistry=1.0)),
+        ("Scientific Communication", _v(english=0.6, creative=0.4)),
+    ),
+    "humanities": (
+        ("Writing", _v(english=0.7, creative=0.3)),
+        ("Research", _v(history=0.5, social=0.3, economics=0.2)),
+        ("Critical Thinking", _v(logical=0.5, creative=0.5)),
+    ),
+    "commerce": (
+        ("Accounting", _v(accountancy=0.7, maths=0.3)),
+        ("Business Analysis", _v(economics=0.6, logical=0.4)),
+        ("Quantitative Aptitude", _v(maths=0.7, logical=0.3)),
+    ),
+}
+
+# Skill-gap current estimates on a 0-10 scale: (skill, weights, target base)
+SKILL_ESTIMATES = {
+    "engineering": (
+        ("Programming", _v(maths=0.5, logical=0.3, creative=0.2), 8.5),
+        ("Data Analysis", _v(maths=0.45, physics=0.2, logical=0.15, english=0.2), 8.0),
+        ("Problem Solving", _v(logical=0.5, maths=0.2, creative=0.3), 8.0),
+        ("Physics Fundamentals", _v(physics=0.7, maths=0.3), 7.5),
+        ("Communication", _v(creative=0.5, english=0.2, logical=0.1), 7.0),
+    ),
+    "biology": (
+        ("Biology Lab", _v(biology=0.7, chemistry=0.2, english=0.1), 8.5),
+        ("Chemistry Basics", _v(chemistry=0.6, physics=0.2, maths=0.2), 8.0),
+        ("Scientific Reasoning", _v(logical=0.45, biology=0.25, chemistry=0.15, english=0.15), 8.0),
+        ("Data Recording", _v(maths=0.4, biology=0.3, english=0.2, logical=0.1), 7.5),
+        ("Communication", _v(english=0.5, creative=0.3, logical=0.2), 7.0),
+    ),
+    "humanities": (
+        ("Writing", _v(english=0.6, creative=0.3, logical=0.1), 8.5),
+        ("Research", _v(history=0.35, social=0.25, english=0.2, economics=0.15, logical=0.05), 8.0),
+        ("Critical Thinking", _v(logical=0.5, english=0.2, history=0.15, social=0.15), 8.0),
+        ("Economics Basics", _v(economics=0.6, maths=0.2, english=0.2), 7.5),
+        ("Communication", _v(english=0.5, creative=0.2, social=0.15, logical=0.15), 7.5),
+    ),
+    "commerce": (
+        ("Accounting", _v(accountancy=0.6, maths=0.3, english=0.1), 8.5),
+        ("Business Analysis", _v(economics=0.5, english=0.2, logical=0.3), 8.0),
+        ("Quantitative Aptitude", _v(maths=0.7, logical=0.3), 8.0),
+        ("Excel/Spreadsheets", _v(maths=0.5, economics=0.2, logical=0.3), 7.5),
+        ("Communication", _v(english=0.5, creative=0.2, logical=0.3), 7.0),
+    ),
+}
+
+
+def load_breakdown(raw) -> dict:
+    """Return a TestResult breakdown as a dict, whether stored as JSON text or not."""
+    if isinstance(raw, dict):
+        return raw
+    try:
+        br = json_codec.loads(raw) if raw else {}
+    except Exception:
+        return {}
+    return br if isinstance(br, dict) else {}
+
+
+@dataclass
+class ProfileScores:
+    """One student's row of the engine's score matrix, keyed by name."""
+    subjects: Dict[str, float]
+    streams: Dict[str, float]
+    best_stream: str
+    roles: List[CareerRecommendation]
+    career_fit: Dict[str, float]
+    trend_base: Dict[str, float]
+    skill_fit: Dict[str, float]
+    skill_estimate: Dict[str, float]
+    skill_target_base: Dict[str, float]
+
+
 class Engine:
+    def __init__(self, catalog=None):
+        if catalog is None:
+            # career weights come from the catalog data file (ml/catalog.py)
+            from ml.catalog import CATALOG as catalog
+        self.catalog = catalog
+        # One weight matrix (subjects x outputs); each block is a column slice.
+        blocks = [
+            ("stream", [w for _, w in STREAM_WEIGHTS]),
+            ("role", list(catalog.recommend_weights.T)),
+            ("career", list(catalog.career_weights.T)),
+            ("trend", list(catalog.trend_weights.T)),
+            ("fit", [w for s in STREAMS for _, w in SKILL_FITS[s]]),
+            ("estimate", [w / 10.0 for s in STREAMS for _, w, _ in SKILL_ESTIMATES[s]]),
+        ]
+        cols = []
+        self.blocks = {}
+        for name, ws in blocks:
+            self.blocks[name] = slice(len(cols), len(cols) + len(ws))
+            cols.extend(ws)
+        self.weights = np.column_stack(cols)
+        self.role_titles = list(catalog.recommend_titles)
+        self.role_domains = list(catalog.recommend_domains)
+        self.career_titles = [c.title for c in catalog.careers]
+        # Optional trained career-affinity model (see ml/model.py)
+        self.model_store = None
+        self.model_blend = 0.0
+
+    def use_model(self, store, blend: float):
+        """Blend a trained model's affinities into the role and career blocks."""
+        self.model_store = store
+        self.model_blend = blend
+
     def analyze(self, answers: Dict[str, int]):
         # normalize keys
         logical = float(answers.get("logical", answers.get("Logical", 0)))
@@ -24,18 +188,120 @@ class Engine:
         breakdown = {"logical": logical, "creative": creative}
         return score, breakdown
 
+    def observed_subjects(self, breakdown) -> Dict[str, float]:
+        """Subjects actually present in a breakdown, by canonical name (no defaults)."""
+        br = load_breakdown(breakdown)
+        found = {}
+        for subject, keys in SUBJECT_ALIASES.items():
+            for k in keys:
+                if k in br:
+                    try:
+                        found[subject] = float(br[k])
+                    except (TypeError, ValueError):
+                        pass
+                    break
+        return found
+
+    def subject_vector(self, breakdown) -> np.ndarray:
+        """Map a breakdown (dict or JSON text) onto the SUBJECTS layout.
+
+        Missing subjects default to 50. Physics/Chemistry fall back to Science,
+        then Maths; Logical/Creative fall back to subject proxies (PCM vs
+        language/social averages).
+        """
+        found = self.observed_subjects(breakdown)
+        x = np.full(len(SUBJECTS), DEFAULT_SCORE)
+        for subject, value in found.items():
+            x[SUBJECT_INDEX[subject]] = value
+        maths = x[SUBJECT_INDEX["maths"]]
+        proxy = found.get("science", maths)
+        for subject in ("physics", "chemistry"):
+            if subject not in found:
+                x[SUBJECT_INDEX[subject]] = proxy
+        if not found.get("logical") and not found.get("creative"):
+            # Logical ~ PCM average (or maths+science), Creative ~ language/social average
+            lp = [v for v in (found.get("maths", 0), found.get("physics", 0), found.get("chemistry", 0)) if v > 0]
+            if not lp:
+                lp = [v for v in (found.get("maths", 0), found.get("science", 0)) if v > 0]
+            cp = [v for v in (found.get("english", 0), found.get("social", 0)) if v > 0]
+            if not cp and found.get("biology", 0) > 0:
+                cp = [found.get("english", 0), found["biology"]]
+            if lp:
+                x[SUBJECT_INDEX["logical"]] = sum(lp) / len(lp)
+            if cp:
+                x[SUBJECT_INDEX["creative"]] = sum(cp) / len(cp)
+        return x
+
+    def subject_matrix(self, breakdowns: Iterable) -> np.ndarray:
+        """Stack many breakdowns into an (n, len(SUBJECTS)) matrix."""
+        rows = [self.subject_vector(b) for b in breakdowns]
+        if not rows:
+            return np.zeros((0, len(SUBJECTS)))
+        return np.vstack(rows)
+
+    def score_matrix(self, X: np.ndarray) -> np.ndarray:
+        """Score every student row of X against every output column at once."""
+        X = np.atleast_2d(X)
+        S = X @ self.weights
+        model = self.model_store.get() if self.model_store is not None and self.model_blend > 0 else None
+        if model is not None and len(S):
+            w = self.model_blend
+            for block, titles in (("role", self.role_titles), ("career", self.career_titles)):
+                A = model.affinity(X, titles)
+                view = S[:, self.blocks[block]]
+                known = ~np.isnan(A)
+                view[known] = (1.0 - w) * view[known] + w * 100.0 * A[known]
+        return S
+
+    def best_streams(self, S: np.ndarray) -> List[str]:
+        # round away float noise so exact ties resolve to the first stream
+        streams = np.round(S[:, self.blocks["stream"]], 6)
+        return [STREAMS[i] for i in np.argmax(streams, axis=1)]
+
+    def top_roles(self, S: np.ndarray, k: int = 6) -> List[List[CareerRecommendation]]:
+        """Top-k recommendation roles per row of a score matrix, best first."""
+        fits = np.minimum(100.0, S[:, self.blocks["role"]])
+        suit = np.rint(fits)
+        # stable sort keeps catalog order between equal scores
+        order = np.argsort(-suit, axis=1, kind="stable")[:, :k]
+        return [
+            [CareerRecommendation(self.role_titles[j], float(suit[i, j]), self.role_domains[j]) for j in row]
+            for i, row in enumerate(order)
+        ]
+
+    def profile(self, breakdown, x: Optional[np.ndarray] = None) -> ProfileScores:
+        """Score a single breakdown and unpack its row into named blocks."""
+        if x is None:
+            x = self.subject_vector(breakdown)
+        S = self.score_matrix(x)
+        row = S[0]
+        best = self.best_streams(S)[0]
+        b = self.blocks
+        # skill names repeat across streams (e.g. Communication), so slice by stream
+        off_fit = STREAMS.index(best) * 3
+        off_est = STREAMS.index(best) * 5
+        fit_vals = row[b["fit"]][off_fit:off_fit + 3]
+        est_vals = row[b["estimate"]][off_est:off_est + 5]
+        return ProfileScores(
+            subjects={s: float(v) for s, v in zip(SUBJECTS, x)},
+            streams={s: float(v) for s, v in zip(STREAMS, row[b["stream"]])},
+            best_stream=best,
+            roles=self.top_roles(S, k=len(self.role_titles))[0],
+            career_fit={t: float(v) for t, v in zip(self.career_titles, row[b["career"]])},
+            trend_base={t: float(v) for t, v in zip(self.catalog.trend_titles, row[b["trend"]])},
+            skill_fit={n: float(v) for (n, _), v in zip(SKILL_FITS[best], fit_vals)},
+            skill_estimate={n: float(v) for (n, _, _), v in zip(SKILL_ESTIMATES[best], est_vals)},
+            skill_target_base={n: t for n, _, t in SKILL_ESTIMATES[best]},
+        )
+
     def skill_gap(self) -> SkillGapResult:
         skills = ["Python", "SQL", "Statistics", "Machine Learning", "Communication"]
         user = [8, 6, 9, 5, 7]
         target = [9, 8, 8, 7, 9]
         return SkillGapResult(skills, user, target)
 
-    def recommend(self, breakdown: Dict[str, float]):
-        logical = breakdown.get("logical", breakdown.get("Logical", 0))
-        creative = breakdown.get("creative", breakdown.get("Creative", 0))
-        ux = 0.6*creative + 0.3*logical
-        pm = 0.5*logical + 0.3*creative
-        return [
-            CareerRecommendation("UX Designer", float(min(100, ux)), "Design and research"),
-            CareerRecommendation("Product Manager", float(min(100, pm)), "Strategy and delivery"),
-        ]
+    def recommend(self, breakdown: Dict[str, float], k: int = 6) -> List[CareerRecommendation]:
+        return self.top_roles(self.score_matrix(self.subject_vector(breakdown)), k)[0]
+
+    def recommend_many(self, breakdowns: Iterable, k: int = 6) -> List[List[CareerRecommendation]]:
+        return self.top_roles(self.score_matrix(self.subject_matrix(breakdowns)), k)
@@ -0,0 +1,135 @@
+"""Career-affinity model trained offline from bookmarks.
+
+``flask train-model`` fits a scikit-learn logistic regression that maps a
+student's subject vector (Engine.subject_vector) to the careers students
+with similar scores bookmarked. The fitted parameters are saved as plain
+NumPy arrays in a versioned joblib file under MODEL_DIR, and the LATEST
+file there names the active version.
+
+Serving never imports scikit-learn. The arrays are memory-mapped, so
+workers share one copy through the page cache. Inference is a single
+matrix product for any number of students. ModelStore watches LATEST and
+swaps in a new version without a restart.
+"""
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, Optional, Sequence
+
+import numpy as np
+
+from ml.engine import SUBJECTS
+
+LATEST = "LATEST"
+
+
+class CareerModel:
+    def __init__(self, params: Dict, version: str):
+        self.version = version
+        self.classes = [str(c) for c in params["classes"]]
+        self.class_index = {c: i for i, c in enumerate(self.classes)}
+        self.mean = params["mean"]
+        self.scale = params["scale"]
+        self.coef = params["coef"]
+        self.intercept = params["intercept"]
+        self.meta = params.get("meta", {})
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """Class probabilities for each row of an (n, len(SUBJECTS)) matrix."""
+        Z = ((np.atleast_2d(X) - self.mean) / self.scale) @ self.coef.T + self.intercept
+        if Z.shape[1] == 1:
+            # binary LogisticRegression keeps one row of coefficients
+            p = 1.0 / (1.0 + np.exp(-Z))
+            return np.hstack([1.0 - p, p])
+        Z = Z - Z.max(axis=1, keepdims=True)
+        E = np.exp(Z)
+        return E / E.sum(axis=1, keepdims=True)
+
+    def affinity(self, X: np.ndarray, titles: Sequence[str]) -> np.ndarray:
+        """(n, len(titles)) affinity in [0, 1], relative to each student's top
+        class; NaN for titles the model never saw."""
+        P = self.predict_proba(X)
+        P = P / np.maximum(P.max(axis=1, keepdims=True), 1e-12)
+        cols = np.array([self.class_index.get(t, -1) for t in titles])
+        A = np.full((P.shape[0], len(titles)), np.nan)
+        known = cols >= 0
+        A[:, known] = P[:, cols[known]]
+        return A
+
+
+def train(X: np.ndarray, y: Sequence[str], C: float = 1.0) -> Dict:
+    """Fit on (subject vector, bookmarked title) pairs; returns saveable params."""
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.preprocessing import StandardScaler
+    import sklearn
+
+    scaler = StandardScaler().fit(X)
+    clf = LogisticRegression(C=C, max_iter=1000).fit(scaler.transform(X), y)
+    return {
+        "classes": np.asarray(clf.classes_, dtype=str),
+        "mean": scaler.mean_,
+        # constant columns (e.g. an unused subject) have scale 0
+        "scale": np.where(scaler.scale_ > 0, scaler.scale_, 1.0),
+        "coef": np.ascontiguousarray(clf.coef_),
+        "intercept": clf.intercept_,
+        "meta": {
+            "subjects": list(SUBJECTS),
+            "samples": int(len(y)),
+            "trained_at": datetime.utcnow().isoformat(),
+            "sklearn": sklearn.__version__,
+        },
+    }
+
+
+def save(params: Dict, model_dir: str) -> str:
+    """Write a new version and point LATEST at it; returns the version."""
+    os.makedirs(model_dir, exist_ok=True)
+    version = datetime.utcnow().strftime("%Y%m%d%H%M%S")
+    path = os.path.join(model_dir, f"career-model-{version}.joblib")
+    import joblib
+    # uncompressed, so arrays can be memory-mapped on load
+    joblib.dump(params, path)
+    tmp = os.path.join(model_dir, LATEST + ".tmp")
+    with open(tmp, "w") as fh:
+        fh.write(version)
+    os.replace(tmp, os.path.join(model_dir, LATEST))
+    return version
+
+
+class ModelStore:
+    def __init__(self, model_dir: str, check_interval: float = 30.0, on_reload: Optional[Callable[[], None]] = None):
+        self.model_dir = model_dir
+        self.check_interval = check_interval
+        self.on_reload = on_reload
+        self._lock = threading.Lock()
+        self._model = None
+        self._checked = None
+
+    def get(self) -> Optional[CareerModel]:
+        now = time.monotonic()
+        if self._checked is not None and now - self._checked < self.check_interval:
+            return self._model
+        with self._lock:
+            if self._checked is None or now - self._checked >= self.check_interval:
+                self._checked = now
+                self._maybe_reload()
+        return self._model
+
+    def _maybe_reload(self):
+        try:
+            with open(os.path.join(self.model_dir, LATEST)) as fh:
+                version = fh.read().strip()
+        except OSError:
+            version = None
+        current = self._model.version if self._model is not None else None
+        if version == current:
+            return
+        model = None
+        if version:
+            import joblib
+            params = joblib.load(os.path.join(self.model_dir, f"career-model-{version}.joblib"), mmap_mode="r")
+            model = CareerModel(params, version)
+        self._model = model
+        if self.on_reload is not None:
+            self.on_reload()
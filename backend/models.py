@@ -1,7 +1,10 @@
 from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
 
-db = SQLAlchemy()
+from db_routing import RoutingSession
+from ml.engine import SUBJECTS
+
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 
 class User(db.Model):
     __tablename__ = "users"
@@ -33,6 +36,10 @@ class AptitudeQuestion(db.Model):
     text = db.Column(db.Text, nullable=False)
     topic = db.Column(db.String(80))
     correct = db.Column(db.String(40))
+    # Multiple-choice fields served by /api/questions ('secondary' = class 9-10, 'senior' = 11-12)
+    level = db.Column(db.String(20))
+    options = db.Column(db.Text)
+    answer = db.Column(db.Integer)
 
 class TestResult(db.Model):
     __tablename__ = "test_results"
@@ -42,6 +49,25 @@ class TestResult(db.Model):
     score = db.Column(db.Float)
     breakdown = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # set once post_submit.py has applied the result (rollups, recommendations)
+    processed_at = db.Column(db.DateTime, index=True)
+    # Typed copy of breakdown (see subject_scores.py): one column per
+    # ml.engine.SUBJECTS entry, NULL when the sheet lacked that subject, and
+    # the best stream when the result was stored
+    maths_score = db.Column(db.Float)
+    physics_score = db.Column(db.Float)
+    chemistry_score = db.Column(db.Float)
+    biology_score = db.Column(db.Float)
+    english_score = db.Column(db.Float)
+    economics_score = db.Column(db.Float)
+    accountancy_score = db.Column(db.Float)
+    history_score = db.Column(db.Float)
+    social_score = db.Column(db.Float)
+    science_score = db.Column(db.Float)
+    business_score = db.Column(db.Float)
+    logical_score = db.Column(db.Float)
+    creative_score = db.Column(db.Float)
+    stream = db.Column(db.String(20))
 
 class Recommendation(db.Model):
     __tablename__ = "recommendations"
@@ -78,3 +104,74 @@ class CareerBookmark(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
     title = db.Column(db.String(200), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class SchemaMigration(db.Model):
+    __tablename__ = "schema_migrations"
+    version = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    name = db.Column(db.String(120), nullable=False)
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+# Composite indexes for the per-user lookups the API runs on every request
+# (latest result, ranked recommendations, portfolio/goal/bookmark lists,
+# admin class filters). Created by migration 2 in migrations.py.
+INDEXES = (
+    db.Index("ix_test_results_user_id_id", TestResult.user_id, TestResult.id.desc()),
+    db.Index("ix_recommendations_user_suitability", Recommendation.user_id, Recommendation.suitability),
+    db.Index("ix_portfolio_items_user_created", PortfolioItem.user_id, PortfolioItem.created_at),
+    db.Index("ix_learning_goals_user_id", LearningGoal.user_id, LearningGoal.id),
+    db.Index("ix_career_bookmarks_user_id", CareerBookmark.user_id, CareerBookmark.id),
+    db.Index("ix_student_profiles_user_id", StudentProfile.user_id),
+    db.Index("ix_student_profiles_class_id", StudentProfile.student_class, StudentProfile.id),
+)
+
+# Typed subject scores (see subject_scores.py): stream with id for the
+# per-stream counts and the backfill's NULL-stream scan, and one index per
+# subject column for the cohort filters on /api/admin/students. Created by
+# migration 7.
+SCORE_INDEXES = (
+    db.Index("ix_test_results_stream_id", TestResult.stream, TestResult.id),
+    *(db.Index(f"ix_test_results_{s}_score", getattr(TestResult, f"{s}_score")) for s in SUBJECTS),
+)
+
+# Per-user daily rollups behind /api/reports, kept current on every write
+# (see reports.py) so reports never scan raw history.
+class ScoreRollup(db.Model):
+    __tablename__ = "score_rollups"
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Float, nullable=False, default=0)
+    min_score = db.Column(db.Float)
+    max_score = db.Column(db.Float)
+
+class PortfolioRollup(db.Model):
+    __tablename__ = "portfolio_rollups"
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    items = db.Column(db.Integer, nullable=False, default=0)
+
+class WipeJob(db.Model):
+    __tablename__ = "wipe_jobs"
+    # a unique index on active lets at most one job hold the wipe slot
+    __table_args__ = (db.Index("ux_wipe_jobs_active", "active", unique=True),)
+    id = db.Column(db.Integer, primary_key=True)
+    # 'all', 'class' (student_profiles.student_class) or 'school' (users.email domain)
+    scope = db.Column(db.String(20), nullable=False, default="all")
+    scope_value = db.Column(db.String(255))
+    archive = db.Column(db.Boolean, nullable=False, default=False)
+    status = db.Column(db.String(20), nullable=False, default="pending")
+    # True while the job holds the wipe slot (pending or running), NULL otherwise
+    active = db.Column(db.Boolean)
+    # users.id of the last batch fully deleted; a resumed job continues after it
+    cursor = db.Column(db.Integer, nullable=False, default=0)
+    # JSON list of the users.id values in the batch being deleted, set before
+    # its first delete and cleared with the cursor; a resumed job finishes it
+    batch = db.Column(db.Text)
+    # delete chunks committed so far; workers watch the sum to drop caches (see WipeWatch)
+    chunks = db.Column(db.Integer, nullable=False, default=0)
+    deleted = db.Column(db.Text)
+    error = db.Column(db.Text)
+    requested_by = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
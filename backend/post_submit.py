@@ -0,0 +1,121 @@
+"""Post-submit pipeline for aptitude results.
+
+/api/aptitude/submit commits the TestResult with processed_at NULL and
+responds. Everything that only derives from that row runs here afterwards:
+the score rollup, the user's regenerated recommendations and the warmed
+profile cache entry.
+
+Processing is keyed on the result id. A worker claims a result by setting
+its processed_at in the same transaction as the rollup and recommendation
+writes, so every result is applied exactly once, however often it is
+queued. Results whose task was lost (a restart, a crash) are still
+pending in the table; the queue sweeps them up, and so does
+``flask process-submissions``.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional
+
+from models import db, TestResult, Recommendation
+from profile_cache import DerivedProfile
+from reports import record_scores
+from subject_scores import result_subjects
+
+# recommendations stored per result
+TOP_K = 6
+
+
+def recommendation_rows(scores) -> List[dict]:
+    """Recommendation rows for a profile, in insert order."""
+    return [{"title": r.title, "suitability": int(r.suitability), "details": r.details} for r in scores.roles[:TOP_K]]
+
+
+class PostSubmitQueue:
+    def __init__(self, app, engine, workers: int = 4, sweep_after: float = 60.0,
+                 on_processed: Optional[Callable[[DerivedProfile], None]] = None):
+        self.app = app
+        self.engine = engine
+        self.workers = workers
+        self.sweep_after = sweep_after
+        self.on_processed = on_processed
+        self._lock = threading.Lock()
+        self._executor = None
+        self._swept = None
+
+    def submit(self, result_id: int):
+        """Queue a committed result; with no workers it is processed inline."""
+        if self.workers <= 0:
+            self.process(result_id)
+            return
+        self._pool().submit(self._run_in_context, result_id)
+        self._maybe_sweep()
+
+    def _pool(self) -> ThreadPoolExecutor:
+        # created on first use, so forked workers each get their own threads
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="post-submit")
+        return self._executor
+
+    def _run_in_context(self, result_id: int):
+        with self.app.app_context():
+            try:
+                self.process(result_id)
+            except Exception:
+                self.app.logger.exception("post-submit processing failed for result %s", result_id)
+            finally:
+                db.session.remove()
+
+    def _maybe_sweep(self):
+        now = time.monotonic()
+        if self._swept is not None and now - self._swept < self.sweep_after:
+            return
+        with self._lock:
+            if self._swept is not None and now - self._swept < self.sweep_after:
+                return
+            self._swept = now
+        for result_id in self.pending(older_than=self.sweep_after):
+            self._pool().submit(self._run_in_context, result_id)
+
+    def pending(self, older_than: float = 0.0, limit: int = 1000) -> List[int]:
+        """Ids of unprocessed results created more than ``older_than`` seconds ago."""
+        cutoff = datetime.utcnow() - timedelta(seconds=older_than)
+        q = (db.session.query(TestResult.id)
+             .filter(TestResult.processed_at.is_(None), TestResult.created_at <= cutoff)
+             .order_by(TestResult.id).limit(limit))
+        return [rid for (rid,) in q]
+
+    def process(self, result_id: int) -> bool:
+        """Apply one result; False if it is gone or was already processed."""
+        tr = db.session.get(TestResult, result_id)
+        if tr is None or tr.processed_at is not None:
+            return False
+        claimed = (db.session.query(TestResult)
+                   .filter(TestResult.id == result_id, TestResult.processed_at.is_(None))
+                   .update({TestResult.processed_at: datetime.utcnow()}, synchronize_session=False))
+        if not claimed:
+            db.session.rollback()
+            return False
+        record_scores([(tr.user_id, tr.created_at, tr.score)])
+        # a newer result owns the user's recommendations
+        newer = (db.session.query(TestResult.id)
+                 .filter(TestResult.user_id == tr.user_id, TestResult.id > tr.id).limit(1).scalar())
+        profile = None
+        if newer is None:
+            subjects = result_subjects(self.engine, tr)
+            scores = self.engine.profile(subjects)
+            Recommendation.query.filter_by(user_id=tr.user_id).delete()
+            for row in recommendation_rows(scores):
+                db.session.add(Recommendation(user_id=tr.user_id, is_active=True, **row))
+            profile = DerivedProfile(tr.user_id, tr.id, tr.score, subjects, scores)
+        db.session.commit()
+        if profile is not None and self.on_processed is not None:
+            self.on_processed(profile)
+        return True
+
+    def shutdown(self, wait: bool = True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
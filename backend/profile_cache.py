@@ -0,0 +1,121 @@
+"""Per-user cache of profiles derived from the latest TestResult.
+
+Entries are keyed by (user_id, result_id) so a new submission can never be
+served from an older result. Each user also has a pointer to their latest
+cached result; while it is younger than ``ttl`` seconds the read endpoints
+skip the database entirely, afterwards one id-only probe revalidates it.
+Submissions in this process replace the entry immediately; the TTL bounds
+staleness for writes handled by other workers. An entry is never replaced
+by an older result, such as one read from a lagging replica.
+"""
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, fields, is_dataclass
+from typing import Optional, Tuple
+
+from ml.engine import ProfileScores
+
+
+@dataclass
+class DerivedProfile:
+    user_id: int
+    result_id: int
+    score: Optional[float]
+    # canonical subject scores (see subject_scores.py)
+    subjects: dict
+    scores: ProfileScores
+
+
+def _approx_size(obj, _depth=0) -> int:
+    """Rough deep size in bytes; computed once per entry for the memory cap."""
+    size = sys.getsizeof(obj)
+    if _depth > 4:
+        return size
+    if isinstance(obj, dict):
+        size += sum(_approx_size(k, _depth + 1) + _approx_size(v, _depth + 1) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple)):
+        size += sum(_approx_size(v, _depth + 1) for v in obj)
+    elif is_dataclass(obj):
+        size += sum(_approx_size(getattr(obj, f.name), _depth + 1) for f in fields(obj))
+    return size
+
+
+class ProfileCache:
+    def __init__(self, max_entries: int = 10000, max_bytes: int = 64 * 1024 * 1024, ttl: float = 10.0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # (user_id, result_id) -> (profile, size), least recently used first
+        self._entries = OrderedDict()
+        # user_id -> (result_id, last verified at)
+        self._latest = {}
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, user_id: int) -> Optional[Tuple[DerivedProfile, bool]]:
+        """Return (profile, fresh) for the user's latest cached result, if any.
+
+        ``fresh`` is False once the pointer is older than the TTL; the caller
+        should then confirm the result id with the database and call touch().
+        """
+        with self._lock:
+            ptr = self._latest.get(user_id)
+            if ptr is None:
+                self.misses += 1
+                return None
+            key = (user_id, ptr[0])
+            hit = self._entries.get(key)
+            if hit is None:
+                self._latest.pop(user_id, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return hit[0], (time.monotonic() - ptr[1]) < self.ttl
+
+    def touch(self, user_id: int):
+        with self._lock:
+            ptr = self._latest.get(user_id)
+            if ptr is not None:
+                self._latest[user_id] = (ptr[0], time.monotonic())
+
+    def put(self, profile: DerivedProfile):
+        size = _approx_size(profile)
+        with self._lock:
+            ptr = self._latest.get(profile.user_id)
+            if ptr is not None and ptr[0] > profile.result_id:
+                return
+            self._drop_user(profile.user_id)
+            key = (profile.user_id, profile.result_id)
+            self._entries[key] = (profile, size)
+            self._latest[profile.user_id] = (profile.result_id, time.monotonic())
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                (uid, _), (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+                self._latest.pop(uid, None)
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._drop_user(user_id)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._latest.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, "hits": self.hits, "misses": self.misses}
+
+    def _drop_user(self, user_id: int):
+        ptr = self._latest.pop(user_id, None)
+        if ptr is not None:
+            hit = self._entries.pop((user_id, ptr[0]), None)
+            if hit is not None:
+                self._bytes -= hit[1]
@@ -0,0 +1,111 @@
+"""Check SQL statements per request against the budgets declared on the views.
+
+    python query_budget.py                 # exits 1 if a route is over budget
+    python query_budget.py --users 50 --grow 10 --routes dashboard,admin_students
+
+Budgets are declared next to the routes in app.py with
+``@query_budget(n)`` (see metrics.py). This script builds the app on a
+throwaway SQLite file and seeds it with the benchmark data (see
+benchmark.py). It then calls every route --calls times, one request at a
+time and with the user and profile caches cleared first, so each call
+takes its cold path. The statements a call issues are read from the
+per-endpoint /metrics counters.
+
+The whole pass runs twice: once on the initial seed, and again after
+--grow times as many students, each with --grow times as many rows, have
+been added. A route fails when:
+- it has no budget;
+- any call goes over its budget; or
+- its worst call issues more statements on the grown data than on the
+  initial data, which usually means a query per row (N+1).
+"""
+import argparse
+import json
+import random
+import sys
+from types import SimpleNamespace
+
+import benchmark
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    p.add_argument('--users', type=int, default=20, help='students in the initial seed')
+    p.add_argument('--grow', type=int, default=5, help='growth factor for the second pass')
+    p.add_argument('--calls', type=int, default=10, help='calls per route and pass')
+    p.add_argument('--routes', help='comma-separated endpoint names to check (default: all)')
+    p.add_argument('--seed', type=int, default=1)
+    p.add_argument('--out', help='write the JSON report here')
+    return p.parse_args(argv)
+
+
+def seed_args(users, per_user):
+    return SimpleNamespace(users=users, results=per_user * 2, portfolio=per_user * 2,
+                           bookmarks=per_user, goals=max(per_user, 2))
+
+
+def worst_calls(app, endpoints, pool, calls, rng):
+    """Most statements any single call to each endpoint issued."""
+    metrics = app.extensions['metrics']
+    caches = (app.extensions['user_cache'], app.extensions['profile_cache'])
+    wipe_runner = app.extensions['wipe_runner']
+    client = app.test_client()
+    worst = {}
+    for ep in endpoints:
+        admin, scenario = benchmark.SCENARIOS[ep]
+        for _ in range(calls):
+            for cache in caches:
+                cache.clear()
+            before = metrics.snapshot().get(ep, {})
+            scenario(benchmark.Session(client, pool, rng, admin))
+            wipe_runner.join()
+            after = metrics.snapshot().get(ep, {})
+            if after.get("requests", 0) > before.get("requests", 0):
+                worst[ep] = max(worst.get(ep, 0), after["queries"] - before.get("queries", 0))
+    return worst
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    benchmark.configure_env(SimpleNamespace(db=None))
+    from app import create_app
+
+    rng = random.Random(args.seed)
+    app = create_app()
+    views = app.view_functions
+    endpoints = sorted(ep for ep in benchmark.SCENARIOS if ep in views
+                       and (not args.routes or ep in args.routes.split(',')))
+
+    pool = benchmark.seed(app, seed_args(args.users, 1), rng)
+    small = worst_calls(app, endpoints, pool, args.calls, rng)
+    pool = benchmark.seed(app, seed_args(args.users * args.grow, args.grow), rng, first=args.users)
+    large = worst_calls(app, endpoints, pool, args.calls, rng)
+    app.extensions['post_submit'].shutdown()
+
+    report, failed = {}, []
+    for ep in endpoints:
+        budget = getattr(views[ep], 'query_budget', None)
+        row = {"budget": budget, "initial": small.get(ep), "grown": large.get(ep), "problems": []}
+        worst = max(row["initial"] or 0, row["grown"] or 0)
+        if budget is None:
+            row["problems"].append("no @query_budget")
+        elif worst > budget:
+            row["problems"].append(f"{worst} statements, budget {budget}")
+        if row["initial"] is not None and row["grown"] is not None and row["grown"] > row["initial"]:
+            row["problems"].append(f"grew from {row['initial']} to {row['grown']} with the data")
+        report[ep] = row
+        if row["problems"]:
+            failed.append(ep)
+        print(f"{'FAIL' if row['problems'] else 'ok':4s} {ep:26s} budget={budget} initial={row['initial']} "
+              f"grown={row['grown']} {'; '.join(row['problems'])}", file=sys.stderr)
+    unchecked = sorted(ep for ep in views if ep not in benchmark.SCENARIOS)
+    if unchecked:
+        print(f"not exercised: {', '.join(unchecked)}", file=sys.stderr)
+    if args.out:
+        with open(args.out, 'w') as fh:
+            json.dump({"endpoints": report, "failed": failed, "not_exercised": unchecked}, fh, indent=2, sort_keys=True)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
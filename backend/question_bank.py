@@ -0,0 +1,470 @@
+"""Aptitude question bank served by /api/questions.
+
+Questions live in the aptitude_questions table. Each worker keeps a warm
+in-memory index by level (class 9-10 vs 11-12) and subject, so a request
+samples only the subjects it needs. The index is rebuilt after admin writes
+in this process, and otherwise when a cheap (count, max id) signature of the
+table changes. The samples below seed an empty table.
+"""
+import csv
+import hashlib
+import json
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import func, insert
+
+from models import db, AptitudeQuestion
+
+STREAMS = ('engineering', 'biology', 'humanities', 'commerce')
+SECONDARY_GRADES = ('9', '10')
+SECONDARY_SUBJECTS = ('maths', 'science', 'social', 'english')
+STREAM_SUBJECTS = {
+    'engineering': ('physics', 'chemistry', 'maths', 'english'),
+    'biology': ('biology', 'chemistry', 'physics', 'english'),
+    'humanities': ('history', 'economics', 'english', 'social'),
+    'commerce': ('accountancy', 'business', 'economics', 'maths'),
+}
+
+# Built-in seed questions: (text, options, index of correct option) per subject
+SECONDARY_SAMPLES = {
+    'maths': [
+        ("What is the value of 3x when x=7?", ["10","14","21","28"], 2),
+        ("The HCF of 24 and 36 is", ["6","12","18","24"], 1),
+        ("Solve: 2x + 5 = 15", ["x = 5","x = 10","x = 7.5","x = 20"], 0),
+        ("What is 25% of 80?", ["20","15","25","30"], 0),
+        ("Simplify: (x + 3)(x + 4)", ["x² + 7x + 12","x² + 7x + 7","x² + 12","x² + 7"], 0),
+        ("If a² + b² = 100 and ab = 48, what is (a + b)?", ["12","14","10","16"], 1),
+        ("The area of a circle with radius 7 cm is (π = 22/7)", ["154 cm²","144 cm²","176 cm²","196 cm²"], 0),
+        ("Square root of 625 is", ["20","25","30","35"], 1),
+        ("What is 15% of 200?", ["25","30","35","40"], 1),
+        ("Factorize: x² - 9", ["(x - 3)(x + 3)","(x - 3)²","(x + 3)²","(x - 9)(x + 1)"], 0),
+        ("If 3x = 12, then x equals", ["3","4","5","6"], 1),
+        ("The LCM of 12 and 18 is", ["36","54","72","90"], 0),
+        ("The sum of interior angles of a triangle is", ["90°","180°","270°","360°"], 1),
+        ("Which is a prime number?", ["15","17","21","25"], 1),
+        ("The value of (2³) × (2²) is", ["32","64","128","256"], 0),
+    ],
+    'science': [
+        ("Which gas is essential for photosynthesis?", ["CO2","O2","N2","H2"], 0),
+        ("Force is measured in", ["Joule","Newton","Pascal","Watt"], 1),
+        ("What is the SI unit of force?", ["Newton","Joule","Watt","Pascal"], 0),
+        ("What is the chemical formula of water?", ["H2O","CO2","O2","H2O2"], 0),
+        ("Which organelle is known as the powerhouse of the cell?", ["Mitochondria","Nucleus","Ribosome","Chloroplast"], 0),
+        ("The process by which plants make food is called", ["Respiration","Photosynthesis","Transpiration","Digestion"], 1),
+        ("What is the speed of light?", ["3 × 10⁸ m/s","3 × 10⁶ m/s","3 × 10⁵ m/s","3 × 10⁷ m/s"], 0),
+        ("Which planet is known as the Red Planet?", ["Venus","Mars","Jupiter","Saturn"], 1),
+        ("The pH value of pure water is", ["5","7","9","11"], 1),
+        ("Which gas is most abundant in Earth's atmosphere?", ["Oxygen","Nitrogen","Carbon dioxide","Hydrogen"], 1),
+        ("The smallest unit of life is", ["Atom","Cell","Tissue","Organ"], 1),
+        ("What type of energy does a moving car possess?", ["Potential","Kinetic","Chemical","Nuclear"], 1),
+        ("The boiling point of water is", ["90°C","95°C","100°C","105°C"], 2),
+        ("Which vitamin is produced by the skin in sunlight?", ["Vitamin A","Vitamin B","Vitamin C","Vitamin D"], 3),
+        ("The process of conversion of solid to gas is called", ["Melting","Evaporation","Sublimation","Condensation"], 2),
+    ],
+    'social': [
+        ("The Indus Valley Civilization is known for", ["Vedas","Urban planning","Gunpowder","Pyramids"], 1),
+        ("Panchayati Raj relates to", ["Rural governance","National defense","Foreign policy","Banking"], 0),
+        ("Who was the first Prime Minister of India?", ["Jawaharlal Nehru","Mahatma Gandhi","Sardar Patel","Dr. Rajendra Prasad"], 0),
+        ("What is GDP?", ["Gross Domestic Product","General Domestic Product","Gross Development Product","Global Domestic Product"], 0),
+        ("When did India gain independence?", ["1947","1950","1945","1942"], 0),
+        ("The capital of India is", ["Mumbai","Delhi","Kolkata","Chennai"], 1),
+        ("Who wrote the Indian National Anthem?", ["Rabindranath Tagore","Bankim Chandra","Sarojini Naidu","Subhash Chandra Bose"], 0),
+        ("The longest river in India is", ["Yamuna","Ganga","Brahmaputra","Godavari"], 1),
+        ("Which movement was started by Mahatma Gandhi in 1942?", ["Non-Cooperation","Civil Disobedience","Quit India","Khilafat"], 2),
+        ("The Battle of Plassey was fought in", ["1757","1764","1857","1947"], 0),
+        ("The first Indian to go to space was", ["Rakesh Sharma","Kalpana Chawla","Sunita Williams","APJ Abdul Kalam"], 0),
+        ("Which is the largest state in India by area?", ["Maharashtra","Rajasthan","Madhya Pradesh","Uttar Pradesh"], 1),
+        ("The Indian Constitution was adopted on", ["15 Aug 1947","26 Jan 1950","26 Nov 1949","2 Oct 1950"], 2),
+        ("Which ocean lies to the south of India?", ["Atlantic","Pacific","Indian","Arctic"], 2),
+        ("Who is known as the Iron Man of India?", ["Nehru","Patel","Gandhi","Bose"], 1),
+    ],
+    'english': [
+        ("Choose the correct synonym of 'Rapid'", ["Slow","Quick","Dull","Calm"], 1),
+        ("Identify the adjective: 'She wore a beautiful dress'", ["She","wore","beautiful","dress"], 2),
+        ("Choose the correct antonym for 'Abundant'", ["Plenty","Scarce","Sufficient","Excess"], 1),
+        ("Correct passive: 'She writes a letter'", ["A letter is written by her","A letter was written by her","A letter is being written","She is writing a letter"], 0),
+        ("Figure of speech: 'The stars danced in the sky'", ["Simile","Metaphor","Personification","Alliteration"], 2),
+        ("Choose the correct form: 'He ___ to school every day'", ["go","goes","going","gone"], 1),
+        ("Which word is a noun?", ["Run","Quickly","Happiness","Beautiful"], 2),
+        ("The plural of 'child' is", ["Childs","Childes","Children","Childer"], 2),
+        ("Identify the verb: 'They play cricket'", ["They","play","cricket","None"], 1),
+        ("A sentence that asks a question is called", ["Declarative","Interrogative","Imperative","Exclamatory"], 1),
+        ("Choose the correct spelling", ["Recieve","Receive","Recive","Receeve"], 1),
+        ("The past tense of 'go' is", ["Goed","Gone","Went","Going"], 2),
+        ("An antonym of 'ancient' is", ["Old","Modern","Historical","Traditional"], 1),
+        ("Which punctuation mark ends a statement?", ["Question mark","Period","Exclamation","Comma"], 1),
+        ("'The cat sat on the mat' - what is 'on'?", ["Noun","Verb","Preposition","Adjective"], 2),
+    ],
+}
+
+SENIOR_SAMPLES = {
+    'physics': [
+        ("Unit of electric current is", ["Volt","Ampere","Ohm","Tesla"], 1),
+        ("What is the unit of magnetic flux?", ["Weber","Tesla","Henry","Gauss"], 0),
+        ("Escape velocity from Earth is", ["11.2 km/s","7.9 km/s","15.0 km/s","9.8 km/s"], 0),
+        ("Newton's second law relates force to", ["Mass","Acceleration","Mass × Acceleration","Velocity"], 2),
+        ("The SI unit of work is", ["Newton","Joule","Watt","Pascal"], 1),
+        ("Ohm's law states V =", ["I/R","IR","R/I","I + R"], 1),
+        ("The frequency of AC supply in India is", ["50 Hz","60 Hz","100 Hz","120 Hz"], 0),
+        ("An object in motion continues in motion due to", ["Inertia","Force","Acceleration","Momentum"], 0),
+        ("The universal gravitational constant G is approximately", ["6.67 × 10⁻¹¹","9.8","3 × 10⁸","1.6 × 10⁻¹⁹"], 0),
+        ("Which lens is used to correct myopia?", ["Convex","Concave","Bifocal","Cylindrical"], 1),
+        ("The unit of electric charge is", ["Ampere","Coulomb","Volt","Ohm"], 1),
+        ("Kinetic energy formula is", ["mv","½mv²","mv²","m²v"], 1),
+        ("The refractive index of glass is approximately", ["1.0","1.5","2.0","2.5"], 1),
+        ("What does LED stand for?", ["Light Emitting Diode","Low Energy Device","Large Electronic Display","None"], 0),
+        ("The phenomenon of light bending is called", ["Reflection","Refraction","Diffraction","Polarization"], 1),
+    ],
+    'chemistry': [
+        ("Atomic number represents", ["Neutrons","Electrons","Protons","Mass number"], 2),
+        ("pH of pure water is", ["7","0","14","10"], 0),
+        ("Common salt formula is", ["NaCl","H2O","CO2","O2"], 0),
+        ("The noble gas with atomic number 10 is", ["Helium","Neon","Argon","Krypton"], 1),
+        ("Avogadro's number is approximately", ["6.02 × 10²³","3 × 10⁸","9.8","1.6 × 10⁻¹⁹"], 0),
+        ("The process of rusting is an example of", ["Reduction","Oxidation","Neutralization","Sublimation"], 1),
+        ("Which element has the symbol Fe?", ["Fluorine","Iron","Francium","Fermium"], 1),
+        ("The pH scale ranges from", ["0 to 7","0 to 14","1 to 10","1 to 14"], 1),
+        ("An acid turns blue litmus paper", ["Blue","Red","Green","Yellow"], 1),
+        ("The molecular formula of glucose is", ["C₆H₁₂O₆","C₁₂H₂₂O₁₁","CH₄","H₂O"], 0),
+        ("Which gas is released during photosynthesis?", ["CO₂","O₂","N₂","H₂"], 1),
+        ("The periodic table was created by", ["Dalton","Mendeleev","Bohr","Rutherford"], 1),
+        ("Diamond and graphite are allotropes of", ["Oxygen","Carbon","Silicon","Phosphorus"], 1),
+        ("The bond between two hydrogen atoms is", ["Ionic","Covalent","Metallic","Hydrogen"], 1),
+        ("Catalyst changes the", ["Product","Reactant","Rate of reaction","Equilibrium"], 2),
+    ],
+    'maths': [
+        ("Derivative of x^2 is", ["2x","x","x^2","1"], 0),
+        ("What is sin 45°?", ["1/√2","√3/2","1/2","1"], 0),
+        ("∫ 1/x dx =", ["ln|x| + C","x + C","1/x^2 + C","x^2 + C"], 0),
+        ("The value of cos 60° is", ["½","1","√3/2","1/√2"], 0),
+        ("Determinant of a 2×2 identity matrix is", ["0","1","2","-1"], 1),
+        ("The slope of line 2x + 3y = 6 is", ["-2/3","2/3","3/2","-3/2"], 0),
+        ("If f(x) = 3x + 2, then f(5) is", ["15","17","13","19"], 1),
+        ("The sum of first n natural numbers is", ["n(n+1)","n(n+1)/2","n²","(n+1)/2"], 1),
+        ("A quadratic equation has at most how many real roots?", ["1","2","3","4"], 1),
+        ("tan 90° is", ["0","1","Undefined","∞"], 2),
+        ("The distance formula is", ["√[(x₂-x₁)² + (y₂-y₁)²]","(x₂-x₁) + (y₂-y₁)","x₂+y₂","None"], 0),
+        ("If log₁₀(100) = x, then x is", ["1","2","10","100"], 1),
+        ("The graph of y = x² is a", ["Line","Circle","Parabola","Hyperbola"], 2),
+        ("The area under a curve is found by", ["Differentiation","Integration","Substitution","Addition"], 1),
+        ("Factorial of 5 (5!) is", ["20","60","120","150"], 2),
+    ],
+    'english': [
+        ("Choose antonym of 'Transparent'", ["Clear","Opaque","Lucid","Sheer"], 1),
+        ("A synonym for 'Benevolent' is", ["Kind","Cruel","Neutral","Angry"], 0),
+        ("Identify the tense: 'She has been working'", ["Simple present","Present continuous","Present perfect continuous","Past perfect"], 2),
+        ("'To break the ice' means", ["To start conversation","To freeze water","To be cold","To stop talking"], 0),
+        ("Shakespeare wrote", ["War and Peace","Hamlet","1984","Great Expectations"], 1),
+        ("The plural of 'criterion' is", ["Criterions","Criteria","Criterias","Criteries"], 1),
+        ("An autobiography is written by", ["Someone else","The subject themselves","A historian","A journalist"], 1),
+        ("The opposite of 'expand' is", ["Contract","Increase","Grow","Inflate"], 0),
+        ("Which is a collective noun?", ["Dog","Team","Run","Happy"], 1),
+        ("'As brave as a lion' is an example of", ["Metaphor","Simile","Personification","Hyperbole"], 1),
+        ("The correct spelling is", ["Occassion","Occasion","Ocasion","Occation"], 1),
+        ("An oxymoron is", ["Same meaning words","Opposite meaning words together","Exaggeration","Sound repetition"], 1),
+        ("The prefix 'un-' means", ["Not","Very","Again","Before"], 0),
+        ("'The wind howled' is an example of", ["Simile","Personification","Alliteration","Onomatopoeia"], 1),
+        ("A haiku is a form of", ["Novel","Drama","Poetry","Essay"], 2),
+    ],
+    'biology': [
+        ("Site of photosynthesis is", ["Ribosome","Chloroplast","Mitochondria","Nucleus"], 1),
+        ("Which blood group is universal donor?", ["O negative","AB positive","A positive","B positive"], 0),
+        ("DNA stands for", ["Deoxyribonucleic acid","Dinitrogen acid","Double nitrogen acid","Deoxyribonitric acid"], 0),
+        ("The human heart has how many chambers?", ["2","3","4","5"], 2),
+        ("Insulin is produced by", ["Liver","Pancreas","Kidney","Heart"], 1),
+        ("The basic unit of nervous system is", ["Neuron","Nephron","Axon","Dendrite"], 0),
+        ("Mendel is known as the father of", ["Biology","Genetics","Botany","Zoology"], 1),
+        ("The process of cell division is called", ["Osmosis","Mitosis","Photosynthesis","Respiration"], 1),
+        ("Which organ filters blood?", ["Heart","Liver","Kidney","Lung"], 2),
+        ("The molecule that carries genetic information is", ["RNA","DNA","Protein","Lipid"], 1),
+        ("Hemoglobin is found in", ["White blood cells","Red blood cells","Platelets","Plasma"], 1),
+        ("Plants take in CO₂ through", ["Roots","Stem","Stomata","Flowers"], 2),
+        ("The study of birds is called", ["Ornithology","Entomology","Herpetology","Ichthyology"], 0),
+        ("Humans belong to the class", ["Reptilia","Aves","Mammalia","Amphibia"], 2),
+        ("The smallest bone in human body is in the", ["Hand","Foot","Ear","Nose"], 2),
+    ],
+    'history': [
+        ("Father of Indian Constitution", ["Gandhi","Nehru","Ambedkar","Patel"], 2),
+        ("The Quit India Movement was launched in", ["1942","1947","1930","1920"], 0),
+        ("The First World War started in", ["1914","1918","1939","1945"], 0),
+        ("Who founded the Maurya Empire?", ["Ashoka","Chandragupta Maurya","Bindusara","Samudragupta"], 1),
+        ("The French Revolution began in", ["1789","1776","1804","1815"], 0),
+        ("The Battle of Waterloo was fought in", ["1805","1815","1825","1835"], 1),
+        ("Who was the first Mughal emperor?", ["Akbar","Humayun","Babur","Aurangzeb"], 2),
+        ("The Russian Revolution occurred in", ["1905","1917","1920","1930"], 1),
+        ("The Treaty of Versailles ended which war?", ["World War I","World War II","Cold War","Vietnam War"], 0),
+        ("The ancient civilization of Mesopotamia was in modern-day", ["Egypt","Iraq","India","China"], 1),
+        ("Martin Luther King Jr. fought for", ["Women's rights","Civil rights","Labor rights","Animal rights"], 1),
+        ("The Berlin Wall fell in", ["1985","1989","1991","1995"], 1),
+        ("Who discovered America?", ["Magellan","Columbus","Vasco da Gama","Marco Polo"], 1),
+        ("The Renaissance began in", ["France","England","Italy","Spain"], 2),
+        ("The Industrial Revolution started in", ["France","Germany","Britain","USA"], 2),
+    ],
+    'economics': [
+        ("Demand law states", ["Price↓ ⇒ Demand↓","Price↑ ⇒ Demand↑","Price↑ ⇒ Demand↓","No relation"], 2),
+        ("GDP stands for", ["Gross Domestic Product","General Domestic Product","Gross Development Product","Global Domestic Product"], 0),
+        ("A market with a single seller is called", ["Monopoly","Oligopoly","Perfect competition","Duopoly"], 0),
+        ("Inflation means", ["Rise in prices","Fall in prices","Stable prices","Zero prices"], 0),
+        ("The central bank of India is", ["SBI","RBI","ICICI","HDFC"], 1),
+        ("Supply curve generally slopes", ["Upward","Downward","Horizontal","Vertical"], 0),
+        ("Opportunity cost is", ["Monetary cost","Next best alternative","Total cost","Fixed cost"], 1),
+        ("Fiscal policy deals with", ["Money supply","Government spending and tax","Interest rates","Exchange rates"], 1),
+        ("Elasticity of demand measures", ["Quantity change","Price change","Responsiveness to price change","Income"], 2),
+        ("An indirect tax is", ["Income tax","GST","Corporate tax","Wealth tax"], 1),
+        ("In perfect competition, firms are", ["Price makers","Price takers","Price fixers","Price leaders"], 1),
+        ("The WTO stands for", ["World Trade Organization","World Tax Organization","World Transfer Organization","None"], 0),
+        ("Recession means", ["Economic growth","Economic decline","Stable economy","High inflation"], 1),
+        ("Budget deficit occurs when", ["Revenue > Expenditure","Revenue < Expenditure","Revenue = Expenditure","None"], 1),
+        ("Human capital refers to", ["Money","Skills and knowledge","Machines","Buildings"], 1),
+    ],
+    'accountancy': [
+        ("Assets =", ["Liabilities","Capital","Liabilities + Capital","Income"], 2),
+        ("Double entry system means", ["One entry","Two entries per transaction","Three entries","Multiple entries"], 1),
+        ("Debit is on which side?", ["Left","Right","Top","Bottom"], 0),
+        ("Depreciation is charged on", ["Current assets","Fixed assets","Liabilities","Capital"], 1),
+        ("Which is a current asset?", ["Machinery","Building","Cash","Goodwill"], 2),
+        ("The trial balance checks", ["Profit","Loss","Arithmetical accuracy","Cash balance"], 2),
+        ("Revenue expenditure is", ["Capital nature","Recurring nature","One-time","None"], 1),
+        ("Goodwill is", ["Tangible asset","Intangible asset","Liability","Expense"], 1),
+        ("Closing stock appears in", ["Trading account","Profit & loss","Balance sheet","Both A and C"], 3),
+        ("A journal is also called", ["Ledger","Book of original entry","Trial balance","Cash book"], 1),
+        ("Accrual basis recognizes", ["Cash transactions","Credit transactions","When earned/incurred","When cash moves"], 2),
+        ("Provision for bad debts is", ["Asset","Liability","Expense","Revenue"], 2),
+        ("Retained earnings are", ["Distributed","Kept in business","Given to creditors","Paid as tax"], 1),
+        ("The accounting equation is", ["A = L + E","A + L = E","A = L - E","A - L = E"], 0),
+        ("Going concern concept assumes", ["Business will close","Business will continue","Business sold","None"], 1),
+    ],
+    'business': [
+        ("Marketing mix includes", ["4Ps","5Ps","6Ps","7Ps"], 0),
+        ("The 4Ps are Product, Price, Place and", ["People","Promotion","Packaging","Process"], 1),
+        ("SWOT analysis includes Strengths, Weaknesses, Opportunities and", ["Threats","Tactics","Trends","Targets"], 0),
+        ("A business plan is", ["Financial statement","Blueprint for business","Marketing tool","Legal document"], 1),
+        ("Sole proprietorship is owned by", ["One person","Two persons","Many persons","Government"], 0),
+        ("A stakeholder is", ["Owner","Interested party","Employee","Customer"], 1),
+        ("CSR stands for", ["Corporate Social Responsibility","Corporate Sales Report","Company Security Rules","None"], 0),
+        ("Break-even point is where", ["Profit = Loss","Revenue = Cost","Sales = Production","None"], 1),
+        ("E-commerce means", ["Electronic commerce","Easy commerce","European commerce","None"], 0),
+        ("Branding helps in", ["Cost reduction","Differentiation","Production","None"], 1),
+        ("A franchise is", ["Full ownership","License to use brand","Partnership","Sole proprietorship"], 1),
+        ("Market segmentation divides market by", ["Geography","Demography","Behavior","All of these"], 3),
+        ("IPO stands for", ["Initial Public Offering","Internal Private Offering","International Public Offering","None"], 0),
+        ("Working capital is", ["Fixed assets","Current assets - Current liabilities","Total assets","Capital + Reserves"], 1),
+        ("Blue ocean strategy focuses on", ["Competition","Creating new demand","Cost cutting","Market share"], 1),
+    ],
+    'social': [
+        ("GDP measures", ["Total income","Population","Exports","Inflation"], 0),
+        ("Democracy means", ["Rule by one","Rule by few","Rule by people","Rule by military"], 2),
+        ("The UN headquarters is in", ["Geneva","Paris","New York","London"], 2),
+        ("Human rights are", ["Universal","Regional","National","Local"], 0),
+        ("Sustainable development focuses on", ["Present needs","Future needs","Both present and future","None"], 2),
+        ("Globalization means", ["Isolation","Integration of economies","Local trade","None"], 1),
+        ("Gender equality means", ["Men superior","Women superior","Equal rights","None"], 2),
+        ("The Right to Education is a", ["Fundamental right","Legal right","Directive principle","None"], 0),
+        ("Climate change is caused primarily by", ["Deforestation","Greenhouse gases","Pollution","All of these"], 3),
+        ("Poverty line measures", ["Minimum income","Maximum income","Average income","None"], 0),
+        ("Urbanization means", ["Moving to cities","Moving to villages","No movement","Migration"], 0),
+        ("A federal system has", ["One government","Two levels of government","Three levels","No government"], 1),
+        ("The judiciary is", ["Legislative","Executive","Judicial","None"], 2),
+        ("Secularism means", ["One religion","No religion","All religions equal","None"], 2),
+        ("Public goods are", ["Rival and excludable","Non-rival and non-excludable","Rival only","Excludable only"], 1),
+    ],
+}
+
+
+LEVELS = ('secondary', 'senior')
+
+
+def builtin_questions() -> Iterator[dict]:
+    for level, samples in (('secondary', SECONDARY_SAMPLES), ('senior', SENIOR_SAMPLES)):
+        for subject, items in samples.items():
+            for text, options, answer in items:
+                yield {"level": level, "subject": subject, "text": text, "options": options, "answer": answer}
+
+
+def normalize_question(raw: dict) -> dict:
+    """Validate one imported question. Raises ValueError on bad input.
+
+    options may be a list or a '|'-separated string; answer may be a 0-based
+    index or the text of the correct option.
+    """
+    text = (raw.get('text') or '').strip()
+    subject = (raw.get('subject') or raw.get('topic') or '').strip().lower()
+    level = (raw.get('level') or '').strip().lower()
+    options = raw.get('options')
+    if isinstance(options, str):
+        options = [o.strip() for o in options.split('|')]
+    if not text or not subject:
+        raise ValueError("text and subject required")
+    if level not in LEVELS:
+        raise ValueError(f"level must be one of {', '.join(LEVELS)}")
+    if not isinstance(options, list) or len(options) < 2:
+        raise ValueError("at least two options required")
+    options = [str(o) for o in options]
+    answer = raw.get('answer')
+    if isinstance(answer, str) and answer.strip() in options:
+        answer = options.index(answer.strip())
+    try:
+        answer = int(answer)
+    except (TypeError, ValueError):
+        raise ValueError("answer must be an option index or option text")
+    if not 0 <= answer < len(options):
+        raise ValueError("answer out of range")
+    return {"level": level, "subject": subject, "text": text, "options": options, "answer": answer}
+
+
+def read_questions(stream, fmt: str) -> Iterator[dict]:
+    """Stream raw question records from a CSV or JSONL text stream."""
+    if fmt == 'jsonl':
+        for n, line in enumerate(stream, 1):
+            line = line.strip()
+            if line:
+                try:
+                    yield json.loads(line)
+                except ValueError as e:
+                    raise ValueError(f"line {n}: {e}") from e
+    elif fmt == 'csv':
+        yield from csv.DictReader(stream)
+    else:
+        raise ValueError(f"unsupported format: {fmt}")
+
+
+def import_questions(records: Iterable[dict], test_id: int, batch_size: int = 1000) -> Tuple[int, List[dict]]:
+    """Insert questions in batches of batch_size, in one transaction.
+
+    Batches bound memory; the single commit means input that turns out to
+    be unreadable part-way (bad encoding, JSON or CSV) leaves nothing
+    behind, so the fixed file can simply be loaded again. Reads the
+    records once, so any stream works, stdin included.
+
+    Returns (inserted, errors) where errors lists rejected record numbers.
+    """
+    inserted = 0
+    errors = []
+    batch = []
+
+    def flush():
+        nonlocal inserted
+        if batch:
+            db.session.execute(insert(AptitudeQuestion), batch)
+            inserted += len(batch)
+            batch.clear()
+
+    try:
+        for i, raw in enumerate(records):
+            try:
+                q = normalize_question(raw)
+            except (ValueError, AttributeError) as e:
+                errors.append({"record": i, "error": str(e)})
+                continue
+            batch.append({
+                "test_id": test_id,
+                "text": q['text'],
+                "topic": q['subject'],
+                "level": q['level'],
+                "options": json.dumps(q['options']),
+                "answer": q['answer'],
+                "correct": q['options'][q['answer']][:40],
+            })
+            if len(batch) >= batch_size:
+                flush()
+        flush()
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return inserted, errors
+
+
+class QuestionBank:
+    def __init__(self, rows: Iterable[tuple] = (), version: int = 0):
+        # (level, subject) -> list of (id, text, options, answer) tuples
+        self.version = version
+        self.loaded_at = datetime.now(timezone.utc)
+        self.index: Dict[Tuple[str, str], list] = {}
+        # content digest: the same bank gets the same ETag in every worker
+        digest = hashlib.sha1()
+        for qid, level, subject, text, options, answer in rows:
+            self.index.setdefault((level, subject), []).append((qid, text, options, answer))
+            digest.update(repr((qid, level, subject, text, options, answer)).encode())
+        self.etag = digest.hexdigest()
+
+    def __len__(self):
+        return sum(len(v) for v in self.index.values())
+
+    @staticmethod
+    def subjects_for(grade: str, stream) -> Tuple[str, tuple]:
+        """Level and subject list for a class, defaulting 11-12 to engineering."""
+        if grade in SECONDARY_GRADES:
+            return 'secondary', SECONDARY_SUBJECTS
+        stream = (stream or 'engineering').lower()
+        if stream not in STREAM_SUBJECTS:
+            stream = 'engineering'
+        return 'senior', STREAM_SUBJECTS[stream]
+
+    def sample(self, grade: str, stream, n: int, seed: str) -> List[dict]:
+        """Up to n questions per subject, interleaved in a seeded order."""
+        level, subjects = self.subjects_for(grade, stream)
+        rng = random.Random(seed)
+        picked = []
+        for subject in subjects:
+            pool = self.index.get((level, subject), ())
+            for qid, text, options, answer in rng.sample(pool, min(n, len(pool))):
+                picked.append({"id": qid, "text": text, "domain": subject, "options": options, "answer": answer})
+        rng.shuffle(picked)
+        return picked
+
+
+class QuestionIndex:
+    """Warm, lazily refreshed QuestionBank for this process."""
+
+    def __init__(self, check_interval: float = 30.0, on_reload=None):
+        self.check_interval = check_interval
+        self.on_reload = on_reload
+        self._lock = threading.Lock()
+        self._bank: Optional[QuestionBank] = None
+        self._signature = None
+        self._checked_at = 0.0
+        self._dirty = True
+        self._version = 0
+
+    def mark_dirty(self):
+        """Call after admin writes so the next request reloads."""
+        self._dirty = True
+
+    def get(self) -> QuestionBank:
+        now = time.monotonic()
+        if self._bank is not None and not self._dirty and now - self._checked_at < self.check_interval:
+            return self._bank
+        with self._lock:
+            signature = self._table_signature()
+            self._checked_at = now
+            if self._bank is None or self._dirty or signature != self._signature:
+                self._dirty = False
+                self._signature = signature
+                self._version += 1
+                self._bank = QuestionBank(self._load_rows(), self._version)
+                if self.on_reload:
+                    self.on_reload()
+            return self._bank
+
+    @staticmethod
+    def _table_signature():
+        return db.session.query(func.count(AptitudeQuestion.id), func.max(AptitudeQuestion.id)).one()
+
+    @staticmethod
+    def _load_rows() -> Iterator[tuple]:
+        q = (db.session.query(AptitudeQuestion.id, AptitudeQuestion.level, AptitudeQuestion.topic,
+                              AptitudeQuestion.text, AptitudeQuestion.options, AptitudeQuestion.answer)
+             .filter(AptitudeQuestion.options.isnot(None), AptitudeQuestion.answer.isnot(None))
+             .order_by(AptitudeQuestion.id)
+             .execution_options(yield_per=2000))
+        for qid, level, topic, text, options, answer in q:
+            try:
+                opts = json.loads(options)
+            except ValueError:
+                continue
+            yield qid, level, (topic or '').lower(), text, opts, answer
@@ -0,0 +1,162 @@
+"""Per-client request limiters.
+
+Both backends use a sliding-window counter: the count for the current
+fixed window plus the previous window's count weighted by how much of it
+still overlaps the sliding window. That is O(1) per request and per key,
+and close to an exact log of timestamps in practice.
+
+``MemoryRateLimiter`` is per process and evicts least recently seen keys.
+``SQLiteRateLimiter`` keeps the counters in a local SQLite file so every
+gunicorn worker on the host shares one budget per client.
+"""
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+
+class MemoryRateLimiter:
+    def __init__(self, limit: int, window: float = 60.0, max_keys: int = 100000):
+        self.limit = limit
+        self.window = window
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        # key -> [window number, current count, previous count], least recently seen first
+        self._counters = OrderedDict()
+
+    def hit(self, key: str) -> Optional[int]:
+        """Count a request for ``key``; return seconds to wait if it is over the limit."""
+        now = time.time()
+        win, offset = divmod(now, self.window)
+        win = int(win)
+        with self._lock:
+            c = self._counters.get(key)
+            if c is None:
+                c = [win, 0, 0]
+                self._counters[key] = c
+                while len(self._counters) > self.max_keys:
+                    self._counters.popitem(last=False)
+            else:
+                self._counters.move_to_end(key)
+                if c[0] != win:
+                    c[2] = c[1] if c[0] == win - 1 else 0
+                    c[0], c[1] = win, 0
+            if _estimate(c[1], c[2], offset, self.window) >= self.limit:
+                return _retry_after(c[1], c[2], offset, self.window, self.limit)
+            c[1] += 1
+            return None
+
+    def clear(self):
+        with self._lock:
+            self._counters.clear()
+
+
+class SQLiteRateLimiter:
+    # Drop windows older than the previous one every this many hits
+    PURGE_EVERY = 1000
+
+    def __init__(self, path: str, limit: int, window: float = 60.0):
+        self.path = path
+        self.limit = limit
+        self.window = window
+        self._local = threading.local()
+        self._hits = 0
+        # SQLite connections must not cross a fork; each worker opens its own
+        os.register_at_fork(after_in_child=self._forget_connections)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_counters ("
+                " key TEXT NOT NULL, win INTEGER NOT NULL, n INTEGER NOT NULL,"
+                " PRIMARY KEY (key, win)) WITHOUT ROWID"
+            )
+
+    def _forget_connections(self):
+        self._local = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            d = os.path.dirname(self.path)
+            if d:
+                os.makedirs(d, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def hit(self, key: str) -> Optional[int]:
+        now = time.time()
+        win, offset = divmod(now, self.window)
+        win = int(win)
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            counts = dict(conn.execute(
+                "SELECT win, n FROM rate_counters WHERE key = ? AND win IN (?, ?)", (key, win, win - 1)
+            ).fetchall())
+            cur, prev = counts.get(win, 0), counts.get(win - 1, 0)
+            if _estimate(cur, prev, offset, self.window) >= self.limit:
+                conn.execute("COMMIT")
+                return _retry_after(cur, prev, offset, self.window, self.limit)
+            conn.execute(
+                "INSERT INTO rate_counters (key, win, n) VALUES (?, ?, 1)"
+                " ON CONFLICT (key, win) DO UPDATE SET n = n + 1",
+                (key, win),
+            )
+            self._hits += 1
+            if self._hits % self.PURGE_EVERY == 0:
+                conn.execute("DELETE FROM rate_counters WHERE win < ?", (win - 1,))
+            conn.execute("COMMIT")
+            return None
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def clear(self):
+        self._connect().execute("DELETE FROM rate_counters")
+
+
+def _estimate(cur: int, prev: int, offset: float, window: float) -> float:
+    return cur + prev * (1.0 - offset / window)
+
+
+def _retry_after(cur: int, prev: int, offset: float, window: float, limit: int) -> int:
+    # Seconds until the weighted count drops below the limit, assuming no more
+    # requests are admitted meanwhile.
+    if cur >= limit:
+        # this window is full: wait for it to end and its weight to decay
+        t = (window - offset) + window * (1.0 - limit / cur)
+    else:
+        t = window * (1.0 - (limit - cur) / prev) - offset
+    return max(1, math.ceil(t))
+
+
+def make_limiter(config):
+    """Build the limiter selected by RATE_LIMIT_BACKEND, or None when disabled."""
+    backend = config['RATE_LIMIT_BACKEND']
+    limit, window = config['RATE_LIMIT_PER_WINDOW'], config['RATE_LIMIT_WINDOW']
+    if backend == 'off':
+        return None
+    if backend == 'sqlite':
+        return SQLiteRateLimiter(config['RATE_LIMIT_SQLITE_PATH'], limit, window)
+    if backend == 'memory':
+        return MemoryRateLimiter(limit, window, config['RATE_LIMIT_MAX_KEYS'])
+    raise ValueError(f"unknown RATE_LIMIT_BACKEND {backend!r}")
+
+
+def throttle(limiter, client: Optional[str]) -> Optional[Tuple[dict, dict]]:
+    """Count a request from ``client``; the 429 body and headers once it is
+    over the limit, else None. A failing limiter lets the request through."""
+    if limiter is None:
+        return None
+    try:
+        retry_after = limiter.hit(client or 'unknown')
+    except Exception:
+        return None
+    if retry_after is None:
+        return None
+    return {"error": "rate_limited", "retry_after": retry_after}, {"Retry-After": str(retry_after)}
@@ -0,0 +1,190 @@
+"""Daily rollups for /api/reports.
+
+Every TestResult and PortfolioItem write also bumps one (user_id, day) row
+in score_rollups / portfolio_rollups inside the same transaction, so a
+report reads at most one row per day in the requested range, however many
+attempts the student has made. Week and month buckets are merged from the
+daily rows.
+"""
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy import func, select, update
+
+from models import db, ScoreRollup, PortfolioRollup, TestResult, PortfolioItem
+
+BUCKETS = ('day', 'week', 'month')
+
+
+def _day(ts) -> date:
+    if isinstance(ts, datetime):
+        return ts.date()
+    if isinstance(ts, str):
+        return date.fromisoformat(ts[:10])
+    return ts
+
+
+def _upsert(model, rows: List[dict], add: Tuple[str, ...], low: Tuple[str, ...] = (), high: Tuple[str, ...] = ()):
+    """Insert rows, or fold them into existing ones: ``add`` columns are summed,
+    ``low``/``high`` keep the min/max."""
+    if not rows:
+        return
+    table = model.__table__
+    dialect = db.engine.dialect.name
+    if dialect == 'mysql':
+        from sqlalchemy.dialects.mysql import insert as dialect_insert
+        stmt = dialect_insert(table)
+        new = stmt.inserted
+    elif dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        stmt = dialect_insert(table)
+        new = stmt.excluded
+    else:
+        for row in rows:
+            _merge_row(model, row, add, low, high)
+        return
+    least = func.min if dialect == 'sqlite' else func.least
+    greatest = func.max if dialect == 'sqlite' else func.greatest
+    values = {c: table.c[c] + new[c] for c in add}
+    values.update({c: func.coalesce(least(table.c[c], new[c]), new[c]) for c in low})
+    values.update({c: func.coalesce(greatest(table.c[c], new[c]), new[c]) for c in high})
+    if dialect == 'mysql':
+        stmt = stmt.on_duplicate_key_update(**values)
+    else:
+        stmt = stmt.on_conflict_do_update(index_elements=['user_id', 'day'], set_=values)
+    db.session.execute(stmt, rows)
+
+
+def _merge_row(model, row: dict, add, low, high):
+    current = db.session.get(model, (row['user_id'], row['day']))
+    if current is None:
+        db.session.add(model(**row))
+        return
+    for c in add:
+        setattr(current, c, getattr(current, c) + row[c])
+    for c in low:
+        if row[c] is not None:
+            setattr(current, c, row[c] if getattr(current, c) is None else min(getattr(current, c), row[c]))
+    for c in high:
+        if row[c] is not None:
+            setattr(current, c, row[c] if getattr(current, c) is None else max(getattr(current, c), row[c]))
+
+
+def record_scores(entries: Iterable[Tuple[int, datetime, Optional[float]]]):
+    """Fold (user_id, created_at, score) entries into score_rollups; the caller commits."""
+    acc = {}
+    for user_id, created_at, score in entries:
+        if score is None:
+            continue
+        key = (user_id, _day(created_at))
+        a = acc.get(key)
+        if a is None:
+            acc[key] = [1, score, score, score]
+        else:
+            a[0] += 1
+            a[1] += score
+            a[2] = min(a[2], score)
+            a[3] = max(a[3], score)
+    _upsert(ScoreRollup, [
+        {"user_id": u, "day": d, "attempts": n, "total": t, "min_score": lo, "max_score": hi}
+        for (u, d), (n, t, lo, hi) in acc.items()
+    ], add=('attempts', 'total'), low=('min_score',), high=('max_score',))
+
+
+def record_portfolio(user_id: int, created_at: datetime, delta: int = 1):
+    """Count a portfolio item added (or removed, with delta=-1) on its creation day."""
+    day = _day(created_at)
+    if delta < 0:
+        db.session.execute(
+            update(PortfolioRollup)
+            .where(PortfolioRollup.user_id == user_id, PortfolioRollup.day == day, PortfolioRollup.items > 0)
+            .values(items=PortfolioRollup.items + delta)
+        )
+        return
+    _upsert(PortfolioRollup, [{"user_id": user_id, "day": day, "items": delta}], add=('items',))
+
+
+def clear_rollups():
+    PortfolioRollup.query.delete()
+    ScoreRollup.query.delete()
+
+
+def backfill(batch_size: int = 5000):
+    """Rebuild both rollup tables from test_results and portfolio_items."""
+    clear_rollups()
+    d = func.date(TestResult.created_at)
+    rows = db.session.execute(
+        select(TestResult.user_id, d, func.count(TestResult.score), func.sum(TestResult.score),
+               func.min(TestResult.score), func.max(TestResult.score))
+        .where(TestResult.score.isnot(None))
+        .group_by(TestResult.user_id, d)
+    )
+    _insert_batches(ScoreRollup, (
+        {"user_id": u, "day": _day(day), "attempts": n, "total": t, "min_score": lo, "max_score": hi}
+        for u, day, n, t, lo, hi in rows
+    ), batch_size)
+    d = func.date(PortfolioItem.created_at)
+    rows = db.session.execute(
+        select(PortfolioItem.user_id, d, func.count())
+        .where(PortfolioItem.created_at.isnot(None))
+        .group_by(PortfolioItem.user_id, d)
+    )
+    _insert_batches(PortfolioRollup, ({"user_id": u, "day": _day(day), "items": n} for u, day, n in rows), batch_size)
+    db.session.commit()
+
+
+def _insert_batches(model, rows, batch_size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            db.session.execute(model.__table__.insert(), batch)
+            batch = []
+    if batch:
+        db.session.execute(model.__table__.insert(), batch)
+
+
+def bucket_start(day: date, bucket: str) -> date:
+    if bucket == 'week':
+        return day - timedelta(days=day.weekday())
+    if bucket == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def score_series(user_id: int, start: date, end: date, bucket: str) -> List[dict]:
+    """Average score per bucket with min/max and attempt counts (downsampled history)."""
+    rows = (ScoreRollup.query
+            .filter(ScoreRollup.user_id == user_id, ScoreRollup.day >= start, ScoreRollup.day <= end)
+            .order_by(ScoreRollup.day))
+    merged = OrderedDict()
+    for r in rows:
+        key = bucket_start(r.day, bucket)
+        m = merged.get(key)
+        if m is None:
+            merged[key] = [r.attempts, r.total, r.min_score, r.max_score]
+        else:
+            m[0] += r.attempts
+            m[1] += r.total
+            m[2] = min(m[2], r.min_score)
+            m[3] = max(m[3], r.max_score)
+    return [
+        {"t": k.isoformat(), "score": round(t / n, 2), "min": lo, "max": hi, "attempts": n}
+        for k, (n, t, lo, hi) in merged.items() if n
+    ]
+
+
+def portfolio_series(user_id: int, start: date, end: date, bucket: str) -> List[dict]:
+    rows = (PortfolioRollup.query
+            .filter(PortfolioRollup.user_id == user_id, PortfolioRollup.day >= start, PortfolioRollup.day <= end,
+                    PortfolioRollup.items > 0)
+            .order_by(PortfolioRollup.day))
+    merged = OrderedDict()
+    for r in rows:
+        key = bucket_start(r.day, bucket)
+        merged[key] = merged.get(key, 0) + r.items
+    return [{"t": k.isoformat(), "count": c} for k, c in merged.items()]
@@ -13,7 +13,9 @@ CREATE TABLE IF NOT EXISTS student_profiles (
   last_name VARCHAR(100),
   student_class VARCHAR(10),
   parent_phone VARCHAR(30),
-  FOREIGN KEY (user_id) REFERENCES users(id)
+  FOREIGN KEY (user_id) REFERENCES users(id),
+  INDEX ix_student_profiles_user_id (user_id),
+  INDEX ix_student_profiles_class_id (student_class, id)
 );
 
 CREATE TABLE IF NOT EXISTS aptitude_tests (
@@ -28,6 +30,9 @@ CREATE TABLE IF NOT EXISTS aptitude_questions (
   text TEXT NOT NULL,
   topic VARCHAR(80),
   correct VARCHAR(40),
+  level VARCHAR(20),
+  options TEXT,
+  answer INT,
   FOREIGN KEY (test_id) REFERENCES aptitude_tests(id)
 );
 
@@ -38,8 +43,39 @@ CREATE TABLE IF NOT EXISTS test_results (
   score FLOAT,
   breakdown TEXT,
   created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+  processed_at DATETIME NULL,
+  maths_score FLOAT NULL,
+  physics_score FLOAT NULL,
+  chemistry_score FLOAT NULL,
+  biology_score FLOAT NULL,
+  english_score FLOAT NULL,
+  economics_score FLOAT NULL,
+  accountancy_score FLOAT NULL,
+  history_score FLOAT NULL,
+  social_score FLOAT NULL,
+  science_score FLOAT NULL,
+  business_score FLOAT NULL,
+  logical_score FLOAT NULL,
+  creative_score FLOAT NULL,
+  stream VARCHAR(20) NULL,
   FOREIGN KEY (user_id) REFERENCES users(id),
-  FOREIGN KEY (test_id) REFERENCES aptitude_tests(id)
+  FOREIGN KEY (test_id) REFERENCES aptitude_tests(id),
+  INDEX ix_test_results_user_id_id (user_id, id DESC),
+  INDEX ix_test_results_processed_at (processed_at),
+  INDEX ix_test_results_stream_id (stream, id),
+  INDEX ix_test_results_maths_score (maths_score),
+  INDEX ix_test_results_physics_score (physics_score),
+  INDEX ix_test_results_chemistry_score (chemistry_score),
+  INDEX ix_test_results_biology_score (biology_score),
+  INDEX ix_test_results_english_score (english_score),
+  INDEX ix_test_results_economics_score (economics_score),
+  INDEX ix_test_results_accountancy_score (accountancy_score),
+  INDEX ix_test_results_history_score (history_score),
+  INDEX ix_test_results_social_score (social_score),
+  INDEX ix_test_results_science_score (science_score),
+  INDEX ix_test_results_business_score (business_score),
+  INDEX ix_test_results_logical_score (logical_score),
+  INDEX ix_test_results_creative_score (creative_score)
 );
 
 CREATE TABLE IF NOT EXISTS recommendations (
@@ -48,7 +84,9 @@ CREATE TABLE IF NOT EXISTS recommendations (
   title VARCHAR(200),
   suitability FLOAT,
   details TEXT,
-  FOREIGN KEY (user_id) REFERENCES users(id)
+  is_active BOOLEAN NOT NULL DEFAULT 1,
+  FOREIGN KEY (user_id) REFERENCES users(id),
+  INDEX ix_recommendations_user_suitability (user_id, suitability)
 );
 
 CREATE TABLE IF NOT EXISTS portfolio_items (
@@ -56,6 +94,78 @@ CREATE TABLE IF NOT EXISTS portfolio_items (
   user_id INT NOT NULL,
   name VARCHAR(200),
   url TEXT,
+  description VARCHAR(255),
+  tags VARCHAR(255),
+  created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+  FOREIGN KEY (user_id) REFERENCES users(id),
+  INDEX ix_portfolio_items_user_created (user_id, created_at)
+);
+
+CREATE TABLE IF NOT EXISTS learning_goals (
+  id INT AUTO_INCREMENT PRIMARY KEY,
+  user_id INT NOT NULL,
+  skill VARCHAR(120) NOT NULL,
+  task VARCHAR(255) NOT NULL,
+  week INT DEFAULT 1,
+  done BOOLEAN DEFAULT 0,
+  created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+  FOREIGN KEY (user_id) REFERENCES users(id),
+  INDEX ix_learning_goals_user_id (user_id, id)
+);
+
+CREATE TABLE IF NOT EXISTS career_bookmarks (
+  id INT AUTO_INCREMENT PRIMARY KEY,
+  user_id INT NOT NULL,
+  title VARCHAR(200) NOT NULL,
   created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+  FOREIGN KEY (user_id) REFERENCES users(id),
+  INDEX ix_career_bookmarks_user_id (user_id, id)
+);
+
+-- Per-user daily aggregates behind /api/reports (see reports.py)
+CREATE TABLE IF NOT EXISTS score_rollups (
+  user_id INT NOT NULL,
+  day DATE NOT NULL,
+  attempts INT NOT NULL DEFAULT 0,
+  total FLOAT NOT NULL DEFAULT 0,
+  min_score FLOAT,
+  max_score FLOAT,
+  PRIMARY KEY (user_id, day),
+  FOREIGN KEY (user_id) REFERENCES users(id)
+);
+
+CREATE TABLE IF NOT EXISTS portfolio_rollups (
+  user_id INT NOT NULL,
+  day DATE NOT NULL,
+  items INT NOT NULL DEFAULT 0,
+  PRIMARY KEY (user_id, day),
   FOREIGN KEY (user_id) REFERENCES users(id)
 );
+
+-- Background data wipes (see wipe_jobs.py); the unique index on active lets
+-- at most one job hold the wipe slot
+CREATE TABLE IF NOT EXISTS wipe_jobs (
+  id INT AUTO_INCREMENT PRIMARY KEY,
+  scope VARCHAR(20) NOT NULL DEFAULT 'all',
+  scope_value VARCHAR(255),
+  archive BOOLEAN NOT NULL DEFAULT 0,
+  status VARCHAR(20) NOT NULL DEFAULT 'pending',
+  active BOOLEAN NULL,
+  `cursor` INT NOT NULL DEFAULT 0,
+  batch TEXT NULL,
+  chunks INT NOT NULL DEFAULT 0,
+  deleted TEXT,
+  error TEXT,
+  requested_by INT,
+  created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+  updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+  finished_at DATETIME NULL,
+  UNIQUE INDEX ux_wipe_jobs_active (active)
+);
+
+-- Applied versions from migrations.py; run `flask migrate` after loading this file
+CREATE TABLE IF NOT EXISTS schema_migrations (
+  version INT PRIMARY KEY,
+  name VARCHAR(120) NOT NULL,
+  applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
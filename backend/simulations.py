@@ -0,0 +1,90 @@
+"""Career simulation scenarios and their scorer.
+
+The registry is built once per app. Each scenario's answer key is compiled
+into a small integer array, so grading a whole class means comparing one
+(students x questions) matrix against the key in a single NumPy operation.
+"""
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+SCENARIOS = (
+    {
+        "id": "ux_wireframe",
+        "title": "Design a login screen wireframe",
+        "career": "UX Designer",
+        "questions": [
+            {"id": "a", "text": "Best first step?", "options": ["Pick a font","Sketch user flow","Choose colors","Write code"], "answer": 1},
+            {"id": "b", "text": "Essential element?", "options": ["Logo","Forgot Password","Ads","Auto-video"], "answer": 1},
+        ]
+    },
+    {
+        "id": "pm_prioritize",
+        "title": "Prioritize product backlog",
+        "career": "Product Manager",
+        "questions": [
+            {"id": "a", "text": "Prioritization framework?", "options": ["RICE","RGB","CRUD","DNS"], "answer": 0},
+            {"id": "b", "text": "Valuable first?", "options": ["Low impact/High effort","High impact/Low effort","Low/Low","High/High"], "answer": 1},
+        ]
+    },
+    {
+        "id": "ds_choose_model",
+        "title": "Choose a model for classification",
+        "career": "Data Scientist",
+        "questions": [
+            {"id": "a", "text": "Imbalanced classes technique?", "options": ["SMOTE","RGB","CDN","CORS"], "answer": 0},
+            {"id": "b", "text": "Baseline model?", "options": ["Random Forest","Neural Net","Logistic Regression","GAN"], "answer": 2},
+        ]
+    },
+)
+
+# marks a missing or non-integer answer; never equal to a key entry
+NO_ANSWER = -1
+
+
+class Simulation(NamedTuple):
+    id: str
+    title: str
+    career: str
+    question_ids: Tuple[str, ...]
+    key: np.ndarray
+
+
+class SimulationRegistry:
+    def __init__(self, scenarios: Iterable[dict] = SCENARIOS):
+        self.scenarios = [dict(s) for s in scenarios]
+        self._by_id: Dict[str, Simulation] = {}
+        for s in self.scenarios:
+            key = np.array([q["answer"] for q in s["questions"]], dtype=np.int64)
+            key.setflags(write=False)
+            self._by_id[s["id"]] = Simulation(s["id"], s["title"], s["career"], tuple(q["id"] for q in s["questions"]), key)
+
+    def get(self, sim_id) -> Optional[Simulation]:
+        return self._by_id.get(sim_id)
+
+    @staticmethod
+    def answer_matrix(sim: Simulation, answers: List[dict]) -> np.ndarray:
+        """(submissions x questions) matrix of selected option indices."""
+        A = np.full((len(answers), len(sim.question_ids)), NO_ANSWER, dtype=np.int64)
+        for i, given in enumerate(answers):
+            if not isinstance(given, dict):
+                continue
+            for j, qid in enumerate(sim.question_ids):
+                sel = given.get(qid)
+                if isinstance(sel, int):
+                    A[i, j] = sel
+        return A
+
+    def grade(self, sim: Simulation, answers: List[dict]) -> Tuple[np.ndarray, np.ndarray]:
+        """Scores (0-100) per submission and the boolean correctness matrix."""
+        correct = self.answer_matrix(sim, answers) == sim.key
+        total = len(sim.question_ids)
+        if not total:
+            return np.zeros(len(answers), dtype=np.int64), correct
+        scores = np.rint(correct.sum(axis=1) / total * 100).astype(np.int64)
+        return scores, correct
+
+    @staticmethod
+    def recommendations(sim: Simulation, score: int) -> List[dict]:
+        # Recommend roles weighted by simulation's primary career
+        return [{"title": sim.career, "suitability": min(100, int(score) + 20)}]
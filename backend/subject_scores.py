@@ -0,0 +1,112 @@
+"""Typed subject scores stored on test_results.
+
+TestResult.breakdown keeps the sheet as submitted. Next to it, each result
+carries one Float column per canonical subject (``maths_score`` and so on,
+following ml.engine.SUBJECTS). A column is NULL when the sheet had no score
+for that subject. The row also stores the best stream at the time it was
+written.
+
+Every insert site fills these columns through ``score_fields``.
+Migration 7 backfills older rows, and ``flask backfill-scores`` fills rows
+written since by an older worker mid-deploy. Readers (derived profiles,
+cohort analytics, model training, cohort filters) select the columns and
+never write; ``result_subjects`` and the analytics frame only fall back
+to the breakdown for a row the backfill has not reached yet, and the SQL
+statistics below leave such rows out.
+
+Cohort statistics over each student's newest result run in SQL on the
+same columns: ``stream_counts`` groups by stream and
+``subject_percentiles`` ranks each subject with window functions (SQLite
+3.25+, MySQL 8). Indexes are in models.SCORE_INDEXES.
+"""
+from typing import Dict, Iterable, List, Sequence
+
+from sqlalchemy import and_, func, literal, or_, select, union_all, update
+
+from ml.engine import SUBJECTS
+from models import db, TestResult
+
+SUBJECT_COLUMNS = {s: getattr(TestResult, f"{s}_score") for s in SUBJECTS}
+PERCENTILES = (25, 50, 75, 90)
+
+
+def score_fields(engine, breakdowns: Iterable) -> List[dict]:
+    """Typed column values for each breakdown, in order, scored in one pass."""
+    observed = [engine.observed_subjects(b) for b in breakdowns]
+    if not observed:
+        return []
+    streams = engine.best_streams(engine.score_matrix(engine.subject_matrix(observed)))
+    return [{**{f"{s}_score": found.get(s) for s in SUBJECTS}, "stream": stream}
+            for found, stream in zip(observed, streams)]
+
+
+def observed_from_row(row) -> Dict[str, float]:
+    """Subjects present on a result row, like Engine.observed_subjects()."""
+    return {s: getattr(row, f"{s}_score") for s in SUBJECTS if getattr(row, f"{s}_score") is not None}
+
+
+def result_subjects(engine, tr) -> Dict[str, float]:
+    """Subjects of a TestResult, from the breakdown only if its columns are unset."""
+    if tr.stream is not None:
+        return observed_from_row(tr)
+    return engine.observed_subjects(tr.breakdown)
+
+
+def latest_result_id(user_id_column):
+    """Correlated subquery: the id of that user's newest result."""
+    return (select(func.max(TestResult.id)).where(TestResult.user_id == user_id_column)
+            .correlate_except(TestResult).scalar_subquery())
+
+
+def newest_results():
+    """CTE of each user's newest result: id, stream and one column per subject."""
+    newest = select(func.max(TestResult.id)).group_by(TestResult.user_id)
+    return (select(TestResult.id, TestResult.stream, *(c.label(s) for s, c in SUBJECT_COLUMNS.items()))
+            .where(TestResult.id.in_(newest)).cte('newest_results'))
+
+
+def stream_counts() -> Dict[str, int]:
+    """Students per best stream of their newest result."""
+    newest = newest_results()
+    rows = db.session.execute(select(newest.c.stream, func.count()).group_by(newest.c.stream))
+    return {stream: n for stream, n in rows if stream is not None}
+
+
+def _at_rank(rank, n, p):
+    # nearest rank: the smallest rank with rank / n >= p / 100, in integers
+    return and_(rank * 100 >= p * n, (rank - 1) * 100 < p * n)
+
+
+def subject_percentiles(percentiles: Sequence[int] = PERCENTILES) -> Dict[str, Dict[str, float]]:
+    """Nearest-rank percentiles of every subject over newest results, in one statement."""
+    newest = newest_results()
+    parts = []
+    for s in SUBJECTS:
+        col = newest.c[s]
+        ranked = (select(col.label('value'), func.row_number().over(order_by=col).label('rank'),
+                         func.count().over().label('n'))
+                  .where(col.isnot(None)).subquery())
+        parts.append(select(literal(s).label('subject'), ranked.c.rank, ranked.c.n, ranked.c.value)
+                     .where(or_(*(_at_rank(ranked.c.rank, ranked.c.n, p) for p in percentiles))))
+    out = {}
+    for subject, rank, n, value in db.session.execute(union_all(*parts)):
+        for p in percentiles:
+            if rank * 100 >= p * n > (rank - 1) * 100:
+                out.setdefault(subject, {})[f"p{p}"] = round(float(value), 2)
+    return out
+
+
+def backfill(engine, batch_size: int = 1000) -> int:
+    """Fill the typed columns of results stored before they existed."""
+    done = last = 0
+    while True:
+        rows = (db.session.query(TestResult.id, TestResult.breakdown)
+                .filter(TestResult.stream.is_(None), TestResult.id > last)
+                .order_by(TestResult.id).limit(batch_size).all())
+        if not rows:
+            return done
+        fields = score_fields(engine, [b for _, b in rows])
+        db.session.execute(update(TestResult), [{"id": rid, **f} for (rid, _), f in zip(rows, fields)])
+        db.session.commit()
+        last = rows[-1][0]
+        done += len(rows)
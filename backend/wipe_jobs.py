@@ -0,0 +1,307 @@
+"""Background wipe jobs for user data.
+
+A job walks the users in its scope in users.id order, WIPE_BATCH_SIZE at a
+time. For each batch it deletes the children first (rollups,
+recommendations, results, goals, portfolio, bookmarks, profiles), then the
+users, each in bounded primary-key chunks that commit separately. No
+transaction holds more than one chunk of locks.
+
+Progress lives in the wipe_jobs row: per-table counts, the ids of the
+batch in flight and a cursor, the last users.id fully removed. The batch
+is recorded before its first delete, because the scope query may stop
+matching its users part-way (a class scope goes through student_profiles,
+which are deleted before the users). The status endpoint can be served by
+any worker, and an interrupted job finishes its recorded batch, then
+resumes after its cursor. With archive on, every chunk is appended as
+JSON lines under WIPE_ARCHIVE_DIR/job-<id>/ before it is deleted.
+
+Only one job runs at a time. A job takes the wipe slot by writing
+active=True, which a unique index allows on one row only, so two admins
+(or workers) starting wipes at once cannot both succeed. The slot is
+given back when the job finishes or fails. A holder whose heartbeat is
+older than WIPE_JOB_STALE_SECONDS is marked failed by the next claim; it
+can be resumed later.
+
+Every committed chunk also bumps wipe_jobs.chunks. Workers cache users,
+tokens, profiles and cohort frames; a WipeWatch thread in each worker
+compares the sum of that counter across jobs with the last one it saw, so
+each worker drops those caches shortly after a wipe by any process.
+"""
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional
+
+from sqlalchemy import func, inspect as sa_inspect, or_, select, tuple_
+from sqlalchemy.exc import IntegrityError
+
+from models import (db, User, StudentProfile, TestResult, Recommendation, PortfolioItem, LearningGoal,
+                    CareerBookmark, ScoreRollup, PortfolioRollup, WipeJob)
+
+SCOPES = ('all', 'class', 'school')
+
+# Children of users, in delete order
+CHILD_MODELS = (ScoreRollup, PortfolioRollup, Recommendation, TestResult, LearningGoal,
+                PortfolioItem, CareerBookmark, StudentProfile)
+
+
+def job_json(job: WipeJob) -> dict:
+    return {
+        "id": job.id,
+        "scope": job.scope,
+        "value": job.scope_value,
+        "archive": job.archive,
+        "status": job.status,
+        "cursor": job.cursor,
+        "deleted": json.loads(job.deleted) if job.deleted else {},
+        "error": job.error,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "updated_at": job.updated_at.isoformat() if job.updated_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+def scope_users(scope: str, value: Optional[str]):
+    """users.id query for a scope; a school is identified by its email domain."""
+    q = db.session.query(User.id)
+    if scope == 'class':
+        q = q.filter(User.id.in_(db.session.query(StudentProfile.user_id).filter(StudentProfile.student_class == value)))
+    elif scope == 'school':
+        q = q.filter(User.email.like('%@' + value.lstrip('@')))
+    return q
+
+
+class WipeWatch:
+    """Notices wipe progress committed by any worker.
+
+    A daemon thread reads the sum of wipe_jobs.chunks every ``interval``
+    seconds, off the request path; ``on_change`` runs when it differs from
+    the last value seen (and on the first probe, since nothing was seen
+    before it).
+    """
+    statement = select(func.coalesce(func.sum(WipeJob.chunks), 0))
+
+    def __init__(self, app, interval: float, on_change: Callable[[], None]):
+        self.app = app
+        self.interval = interval
+        self.on_change = on_change
+        self._lock = threading.Lock()
+        self._seen = None
+        self._thread = None
+
+    def ensure_running(self):
+        """Start the probe thread in this process; cheap once it runs.
+
+        Called per request rather than at startup, so a forked worker
+        (gunicorn --preload) starts its own thread.
+        """
+        t = self._thread
+        if t is not None and t.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name="wipe-watch", daemon=True)
+                self._thread.start()
+
+    def check(self) -> bool:
+        """Probe once, inside an app context; True if the caches were dropped."""
+        generation = db.session.execute(self.statement).scalar()
+        with self._lock:
+            changed, self._seen = generation != self._seen, generation
+        if changed:
+            self.on_change()
+        return changed
+
+    def _loop(self):
+        while True:
+            with self.app.app_context():
+                try:
+                    self.check()
+                except Exception:
+                    self.app.logger.exception("wipe watch probe failed")
+                finally:
+                    db.session.remove()
+            time.sleep(self.interval)
+
+
+class WipeRunner:
+    def __init__(self, app, batch_size: int = 500, chunk_size: int = 1000, archive_dir: str = 'instance/archive',
+                 stale_after: float = 300.0, on_progress: Optional[Callable[[], None]] = None):
+        self.app = app
+        self.batch_size = batch_size
+        self.chunk_size = chunk_size
+        self.archive_dir = archive_dir
+        self.stale_after = stale_after
+        self.on_progress = on_progress
+        self._lock = threading.Lock()
+        self._threads = {}
+
+    def is_active(self, job: WipeJob) -> bool:
+        """Running here, or queued or running elsewhere with a recent heartbeat."""
+        t = self._threads.get(job.id)
+        if t is not None and t.is_alive():
+            return True
+        return (job.status in ('pending', 'running') and job.updated_at is not None
+                and datetime.utcnow() - job.updated_at < timedelta(seconds=self.stale_after))
+
+    def holder(self) -> Optional[WipeJob]:
+        """The job holding the wipe slot, if any."""
+        return WipeJob.query.filter(WipeJob.active.is_(True)).first()
+
+    def create(self, scope: str, value: Optional[str], archive: bool, requested_by: Optional[int] = None) -> Optional[WipeJob]:
+        """Insert a job that holds the wipe slot; None while another job is active."""
+        def insert():
+            job = WipeJob(scope=scope, scope_value=value, archive=archive, requested_by=requested_by, active=True)
+            db.session.add(job)
+            db.session.commit()
+            return job
+        return self._claim(insert)
+
+    def claim(self, job: WipeJob) -> bool:
+        """Take the wipe slot for an existing job before resuming it.
+
+        Fails if the job is done, if another job is active, or if the job
+        moved since it was read (someone else resumed it, or it is still
+        running somewhere).
+        """
+        seen = job.updated_at
+
+        def update():
+            n = (db.session.query(WipeJob)
+                 .filter(WipeJob.id == job.id, WipeJob.status != 'done',
+                         or_(WipeJob.active.is_(None), WipeJob.updated_at == seen))
+                 .update({WipeJob.active: True, WipeJob.status: 'pending', WipeJob.updated_at: datetime.utcnow()},
+                         synchronize_session=False))
+            db.session.commit()
+            return n
+        claimed = bool(self._claim(update))
+        db.session.refresh(job)
+        return claimed
+
+    def _claim(self, write):
+        """Run ``write``, which commits active=True; on a conflict with a
+        stale holder, fail that holder and try once more."""
+        for _ in range(2):
+            try:
+                return write()
+            except IntegrityError:
+                db.session.rollback()
+            holder = self.holder()
+            if holder is not None and (self.is_active(holder) or not self._release(holder)):
+                return None
+        return None
+
+    def _release(self, holder: WipeJob) -> bool:
+        """Mark a stale holder failed; False if it moved in the meantime."""
+        n = (db.session.query(WipeJob)
+             .filter(WipeJob.id == holder.id, WipeJob.active.is_(True), WipeJob.updated_at == holder.updated_at)
+             .update({WipeJob.active: None, WipeJob.status: 'failed', WipeJob.updated_at: datetime.utcnow(),
+                      WipeJob.error: 'interrupted: no progress within WIPE_JOB_STALE_SECONDS'},
+                     synchronize_session=False))
+        db.session.commit()
+        return n == 1
+
+    def start(self, job_id: int):
+        with self._lock:
+            t = self._threads.get(job_id)
+            if t is not None and t.is_alive():
+                return
+            t = threading.Thread(target=self._run_in_context, args=(job_id,), name=f"wipe-job-{job_id}", daemon=True)
+            self._threads[job_id] = t
+            t.start()
+
+    def join(self, timeout: Optional[float] = None):
+        """Wait for the jobs this process started."""
+        with self._lock:
+            threads = list(self._threads.values())
+        for t in threads:
+            t.join(timeout)
+
+    def _run_in_context(self, job_id: int):
+        with self.app.app_context():
+            try:
+                self.run(job_id)
+            finally:
+                db.session.remove()
+
+    def run(self, job_id: int):
+        """Run (or resume) a job to completion in the calling thread."""
+        job = db.session.get(WipeJob, job_id)
+        if job is None or job.status == 'done':
+            return
+        counts = json.loads(job.deleted) if job.deleted else {}
+        job.status = 'running'
+        job.error = None
+        job.updated_at = datetime.utcnow()
+        db.session.commit()
+        try:
+            while True:
+                ids = json.loads(job.batch) if job.batch else None
+                if ids is None:
+                    ids = [uid for (uid,) in scope_users(job.scope, job.scope_value)
+                           .filter(User.id > job.cursor).order_by(User.id).limit(self.batch_size)]
+                    if not ids:
+                        break
+                    job.batch = json.dumps(ids)
+                    db.session.commit()
+                for model in CHILD_MODELS:
+                    counts[model.__tablename__] = counts.get(model.__tablename__, 0) + self._delete(job, model, model.user_id.in_(ids))
+                counts['users'] = counts.get('users', 0) + self._delete(job, User, User.id.in_(ids))
+                job.cursor = ids[-1]
+                job.batch = None
+                job.deleted = json.dumps(counts)
+                job.updated_at = datetime.utcnow()
+                db.session.commit()
+                if self.on_progress:
+                    self.on_progress()
+            job.status = 'done'
+            job.active = None
+            job.finished_at = datetime.utcnow()
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            job = db.session.get(WipeJob, job_id)
+            job.status = 'failed'
+            job.active = None
+            job.error = str(e)[:2000]
+            job.updated_at = datetime.utcnow()
+            db.session.commit()
+        finally:
+            if self.on_progress:
+                self.on_progress()
+
+    def _delete(self, job: WipeJob, model, where) -> int:
+        """Delete matching rows in primary-key chunks, one commit per chunk."""
+        pk = sa_inspect(model).primary_key
+        total = 0
+        while True:
+            if job.archive:
+                rows = db.session.query(model).filter(where).order_by(*pk).limit(self.chunk_size).all()
+                keys = [tuple(getattr(r, c.key) for c in pk) for r in rows]
+                if rows:
+                    self._archive(job, model, rows)
+                for r in rows:
+                    db.session.expunge(r)
+            else:
+                keys = [tuple(k) for k in db.session.query(*pk).filter(where).order_by(*pk).limit(self.chunk_size)]
+            if not keys:
+                return total
+            if len(pk) == 1:
+                match = pk[0].in_([k[0] for k in keys])
+            else:
+                match = tuple_(*pk).in_(keys)
+            db.session.query(model).filter(match).delete(synchronize_session=False)
+            total += len(keys)
+            job.chunks = (job.chunks or 0) + 1
+            job.updated_at = datetime.utcnow()
+            db.session.commit()
+
+    def _archive(self, job: WipeJob, model, rows: List):
+        path = os.path.join(self.archive_dir, f"job-{job.id}")
+        os.makedirs(path, exist_ok=True)
+        cols = [c.key for c in sa_inspect(model).mapper.column_attrs]
+        with open(os.path.join(path, f"{model.__tablename__}.jsonl"), 'a', encoding='utf-8') as fh:
+            for r in rows:
+                fh.write(json.dumps({c: getattr(r, c) for c in cols}, default=str) + "\n")
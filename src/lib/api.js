@@ -21,32 +21,45 @@ function authHeaders(extra = {}) {
   return baseHeaders({ ...hdrs, ...extra })
 }
 
+// After a write the backend returns X-DB-Pin, a unix time until which this
+// user's reads must come from the primary database; echo it until then
+const PIN_HEADER = 'X-DB-Pin'
+
+async function apiFetch(url, options = {}) {
+  const pin = Number(sessionStorage.getItem('db_pin') || 0)
+  const headers = pin * 1000 > Date.now() ? { ...options.headers, [PIN_HEADER]: String(pin) } : options.headers
+  const res = await fetch(url, { ...options, headers })
+  const next = res.headers.get(PIN_HEADER)
+  if (next) sessionStorage.setItem('db_pin', next)
+  return res
+}
+
 export async function getDashboard() {
-  const res = await fetch(`${API_BASE}/api/dashboard`, { headers: authHeaders() })
+  const res = await apiFetch(`${API_BASE}/api/dashboard`, { headers: authHeaders() })
   if (!res.ok) throw new Error('Failed to load dashboard')
   return res.json()
 }
 
 export async function getSkillGap() {
-  const res = await fetch(`${API_BASE}/api/skill-gap`, { headers: authHeaders() })
+  const res = await apiFetch(`${API_BASE}/api/skill-gap`, { headers: authHeaders() })
   if (!res.ok) throw new Error('Failed to load skill gap')
   return res.json()
 }
 
 export async function getAdminStudents() {
-  const res = await fetch(`${API_BASE}/api/admin/students`, { headers: authHeaders({ 'X-Admin': 'true' }) })
+  const res = await apiFetch(`${API_BASE}/api/admin/students`, { headers: authHeaders({ 'X-Admin': 'true' }) })
   if (!res.ok) throw new Error('Failed to load students')
   return res.json()
 }
 
 export async function listPortfolio() {
-  const res = await fetch(`${API_BASE}/api/portfolio`, { headers: authHeaders() })
+  const res = await apiFetch(`${API_BASE}/api/portfolio`, { headers: authHeaders() })
   if (!res.ok) throw new Error('Failed to load portfolio')
   return res.json()
 }
 
 export async function addPortfolio({ name, url, description, tags }) {
-  const res = await fetch(`${API_BASE}/api/portfolio`, {
+  const res = await apiFetch(`${API_BASE}/api/portfolio`, {
     method: 'POST',
     headers: authHeaders(),
     body: JSON.stringify({ name, url, description, tags })
@@ -56,7 +69,7 @@ export async function addPortfolio({ name, url, description, tags }) {
 }
 
 export async function updatePortfolio(id, payload) {
-  const res = await fetch(`${API_BASE}/api/portfolio/${id}`, {
+  const res = await apiFetch(`${API_BASE}/api/portfolio/${id}`, {
     method: 'PATCH',
     headers: authHeaders(),
     body: JSON.stringify(payload)
@@ -66,7 +79,7 @@ export async function updatePortfolio(id, payload) {
 }
 
 export async function deletePortfolio(id) {
-  const res = await fetch(`${API_BASE}/api/portfolio/${id}`, {
+  const res = await apiFetch(`${API_BASE}/api/portfolio/${id}`, {
     method: 'DELETE',
     headers: authHeaders()
   })
@@ -76,7 +89,7 @@ export async function deletePortfolio(id) {
 
 export async function submitAptitude(payload) {
   // payload can be { answers } or { score, breakdown }
-  const res = await fetch(`${API_BASE}/api/aptitude/submit`, {
+  const res = await apiFetch(`${API_BASE}/api/aptitude/submit`, {
     method: 'POST',
     headers: authHeaders(),
     body: JSON.stringify(payload)
@@ -86,7 +99,7 @@ export async function submitAptitude(payload) {
 }
 
 export async function saveProfile(data) {
-  const res = await fetch(`${API_BASE}/api/register`, {
+  const res = await apiFetch(`${API_BASE}/api/register`, {
     method: 'POST',
     headers: authHeaders(),
     body: JSON.stringify(data)
@@ -96,19 +109,19 @@ export async function saveProfile(data) {
 }
 
 export async function getCareers() {
-  const res = await fetch(`${API_BASE}/api/careers`, { headers: authHeaders() })
+  const res = await apiFetch(`${API_BASE}/api/careers`, { headers: authHeaders() })
   if (!res.ok) throw new Error('Failed to load careers')
   return res.json()
 }
 
 export async function getTrends() {
-  const res = await fetch(`${API_BASE}/api/trends`, { headers: authHeaders() })
+  const res = await apiFetch(`${API_BASE}/api/trends`, { headers: authHeaders() })
   if (!res.ok) throw new Error('Failed to load trends')
   return res.json()
 }
 
 export async function getProfile() {
-  const res = await fetch(`${API_BASE}/api/profile`, { headers: authHeaders() })
+  const res = await apiFetch(`${API_BASE}/api/profile`, { headers: authHeaders() })
   if (!res.ok) throw new Error('Failed to load profile')
   return res.json()
 }
@@ -117,19 +130,19 @@ export async function getQuestions(studentClass, stream) {
   const url = new URL(`${API_BASE}/api/questions`)
   if (studentClass) url.searchParams.set('class', String(studentClass))
   if (stream) url.searchParams.set('stream', String(stream))
-  const res = await fetch(url, { headers: authHeaders() })
+  const res = await apiFetch(url, { headers: authHeaders() })
   if (!res.ok) throw new Error('Failed to load questions')
   return res.json()
 }
 
 export async function getSimulations() {
-  const res = await fetch(`${API_BASE}/api/simulations`, { headers: authHeaders() })
+  const res = await apiFetch(`${API_BASE}/api/simulations`, { headers: authHeaders() })
   if (!res.ok) throw new Error('Failed to load simulations')
   return res.json()
 }
 
 export async function scoreSimulation(id, answers) {
-  const res = await fetch(`${API_BASE}/api/simulations/score`, {
+  const res = await apiFetch(`${API_BASE}/api/simulations/score`, {
     method: 'POST',
     headers: authHeaders(),
     body: JSON.stringify({ id, answers })
@@ -140,44 +153,44 @@ export async function scoreSimulation(id, answers) {
 
 // Planner
 export async function getPlan() {
-  const res = await fetch(`${API_BASE}/api/plan`, { headers: authHeaders() })
+  const res = await apiFetch(`${API_BASE}/api/plan`, { headers: authHeaders() })
   if (!res.ok) throw new Error('Failed to load plan')
   return res.json()
 }
 
 export async function generatePlan() {
-  const res = await fetch(`${API_BASE}/api/plan/generate`, { method: 'POST', headers: authHeaders() })
+  const res = await apiFetch(`${API_BASE}/api/plan/generate`, { method: 'POST', headers: authHeaders() })
   if (!res.ok) throw new Error('Failed to generate plan')
   return res.json()
 }
 
 export async function addGoal(payload) {
-  const res = await fetch(`${API_BASE}/api/goals`, { method: 'POST', headers: authHeaders(), body: JSON.stringify(payload) })
+  const res = await apiFetch(`${API_BASE}/api/goals`, { method: 'POST', headers: authHeaders(), body: JSON.stringify(payload) })
   if (!res.ok) throw new Error('Failed to add goal')
   return res.json()
 }
 
 export async function updateGoal(id, payload) {
-  const res = await fetch(`${API_BASE}/api/goals/${id}`, { method: 'PATCH', headers: authHeaders(), body: JSON.stringify(payload) })
+  const res = await apiFetch(`${API_BASE}/api/goals/${id}`, { method: 'PATCH', headers: authHeaders(), body: JSON.stringify(payload) })
   if (!res.ok) throw new Error('Failed to update goal')
   return res.json()
 }
 
 export async function deleteGoal(id) {
-  const res = await fetch(`${API_BASE}/api/goals/${id}`, { method: 'DELETE', headers: authHeaders() })
+  const res = await apiFetch(`${API_BASE}/api/goals/${id}`, { method: 'DELETE', headers: authHeaders() })
   if (!res.ok) throw new Error('Failed to delete goal')
   return res.json()
 }
 
 // Admin helpers (protected by backend role gate; dev header X-Admin used in local)
 export async function adminListTests() {
-  const res = await fetch(`${API_BASE}/api/admin/tests`, { headers: authHeaders({ 'X-Admin': 'true' }) })
+  const res = await apiFetch(`${API_BASE}/api/admin/tests`, { headers: authHeaders({ 'X-Admin': 'true' }) })
   if (!res.ok) throw new Error('Failed to load tests')
   return res.json()
 }
 
 export async function adminCreateTest(name) {
-  const res = await fetch(`${API_BASE}/api/admin/tests`, {
+  const res = await apiFetch(`${API_BASE}/api/admin/tests`, {
     method: 'POST',
     headers: authHeaders({ 'X-Admin': 'true' }),
     body: JSON.stringify({ name })
@@ -189,13 +202,13 @@ export async function adminCreateTest(name) {
 export async function adminListQuestions(test_id) {
   const url = new URL(`${API_BASE}/api/admin/questions`)
   if (test_id) url.searchParams.set('test_id', test_id)
-  const res = await fetch(url, { headers: authHeaders({ 'X-Admin': 'true' }) })
+  const res = await apiFetch(url, { headers: authHeaders({ 'X-Admin': 'true' }) })
   if (!res.ok) throw new Error('Failed to load questions')
   return res.json()
 }
 
 export async function adminCreateQuestion(payload) {
-  const res = await fetch(`${API_BASE}/api/admin/questions`, {
+  const res = await apiFetch(`${API_BASE}/api/admin/questions`, {
     method: 'POST',
     headers: authHeaders({ 'X-Admin': 'true' }),
     body: JSON.stringify(payload)
@@ -205,7 +218,7 @@ export async function adminCreateQuestion(payload) {
 }
 
 export async function adminDeleteTest(id) {
-  const res = await fetch(`${API_BASE}/api/admin/tests/${id}`, {
+  const res = await apiFetch(`${API_BASE}/api/admin/tests/${id}`, {
     method: 'DELETE',
     headers: authHeaders({ 'X-Admin': 'true' })
   })
@@ -214,7 +227,7 @@ export async function adminDeleteTest(id) {
 }
 
 export async function adminDeleteQuestion(id) {
-  const res = await fetch(`${API_BASE}/api/admin/questions/${id}`, {
+  const res = await apiFetch(`${API_BASE}/api/admin/questions/${id}`, {
     method: 'DELETE',
     headers: authHeaders({ 'X-Admin': 'true' })
   })
@@ -224,26 +237,26 @@ export async function adminDeleteQuestion(id) {
 
 // Bookmarks
 export async function listBookmarks() {
-  const res = await fetch(`${API_BASE}/api/bookmarks`, { headers: authHeaders() })
+  const res = await apiFetch(`${API_BASE}/api/bookmarks`, { headers: authHeaders() })
   if (!res.ok) throw new Error('Failed to load bookmarks')
   return res.json()
 }
 
 export async function addBookmark(title) {
-  const res = await fetch(`${API_BASE}/api/bookmarks`, { method: 'POST', headers: authHeaders(), body: JSON.stringify({ title }) })
+  const res = await apiFetch(`${API_BASE}/api/bookmarks`, { method: 'POST', headers: authHeaders(), body: JSON.stringify({ title }) })
   if (!res.ok) throw new Error('Failed to add bookmark')
   return res.json()
 }
 
 export async function deleteBookmark(id) {
-  const res = await fetch(`${API_BASE}/api/bookmarks/${id}`, { method: 'DELETE', headers: authHeaders() })
+  const res = await apiFetch(`${API_BASE}/api/bookmarks/${id}`, { method: 'DELETE', headers: authHeaders() })
   if (!res.ok) throw new Error('Failed to delete bookmark')
   return res.json()
 }
 
 // Reports
 export async function getReports() {
-  const res = await fetch(`${API_BASE}/api/reports`, { headers: authHeaders() })
+  const res = await apiFetch(`${API_BASE}/api/reports`, { headers: authHeaders() })
   if (!res.ok) throw new Error('Failed to load reports')
   return res.json()
 }